@@ -17,7 +17,7 @@ def loadYamlFilesThatExist(*paths):
     return configs
 
 def loadYamlFile(path):
-    return yaml.load(readAllTextFromFile(path))
+    return yaml.load(readAllTextFromFile(path), Loader = yaml.Loader)
 
 def readAllTextFromFile(filePath):
     with open(filePath, 'r', encoding='utf-8') as f:
@@ -1,4 +1,4 @@
-import collections
+import collections.abc
 from mtm.util.Assert import *
 
 _providers = {}
@@ -40,7 +40,7 @@ def __init__(self, identifier):
         self.identifier = identifier
 
     def to(self, provider, *args, **kwargs):
-        if isinstance(provider, collections.Callable):
+        if isinstance(provider, collections.abc.Callable):
             def call():
                 return provider(*args, **kwargs)
         else:
@@ -57,7 +57,7 @@ def toSingle(self, provider, *args, **kwargs):
         '''
         assertThat(not type(provider) in (str, int, float))
 
-        if isinstance(provider, collections.Callable):
+        if isinstance(provider, collections.abc.Callable):
             # It is either a method or a class
             def call():
                 instance = _singletons.get(provider)
@@ -1,6 +1,6 @@
 
 from mtm.util.Assert import *
-import collections
+import collections.abc
 
 def IsInstanceOf(*classes):
    def test(obj):
@@ -20,7 +20,7 @@ def test(obj):
       for methodName in methods:
          assertThat(hasattr(obj, methodName), \
              "Unable to find method '{0}' on object with type '{1}'".format(methodName, type(obj).__name__))
-         assertThat(isinstance(getattr(obj, methodName), collections.Callable))
+         assertThat(isinstance(getattr(obj, methodName), collections.abc.Callable))
       return True
    return test
 
@@ -1,5 +1,6 @@
 
 
+import threading
 from datetime import datetime
 
 from mtm.util.VarManager import VarManager
@@ -42,7 +43,7 @@ def __enter__(self):
     def __exit__(self, type, value, traceback):
         assertThat(self._log.hasHeading)
 
-        assertIsEqual(self._log._headingBlocks.pop(), self)
+        assertIsEqual(self._log._getHeadingBlocks().pop(), self)
 
         delta = datetime.now() - self._startTime
         totalDelta = datetime.now() - self._log.totalStartTime
@@ -65,7 +66,10 @@ class Logger:
     ''' Simple log class to use with build scripts '''
     def __init__(self):
         self._totalStartTime = None
-        self._headingBlocks = []
+        # Headings are tracked per thread so that tasks running on worker threads do not
+        # close each others headings
+        self._threadState = threading.local()
+        self._lock = threading.RLock()
 
         self.goodPatterns = self._getPatterns('GoodPatterns')
         self.goodMaps = self._getPatternMaps('GoodPatternMaps')
@@ -87,12 +91,28 @@ def __init__(self):
     def totalStartTime(self):
         return self._totalStartTime
 
+    def _getHeadingBlocks(self):
+        blocks = getattr(self._threadState, 'headingBlocks', None)
+
+        if blocks == None:
+            blocks = []
+            self._threadState.headingBlocks = blocks
+
+        return blocks
+
     @property
     def hasHeading(self):
-        return any(self._headingBlocks)
+        return any(self._getHeadingBlocks())
 
     def getCurrentNumHeadings(self):
-        return len(self._headingBlocks)
+        return getattr(self._threadState, 'baseNumHeadings', 0) + len(self._getHeadingBlocks())
+
+    def setBaseNumHeadings(self, numHeadings):
+        """
+        Sets the number of headings that the current thread is nested inside of, which is used
+        by worker threads to indent their output the same as the thread that started them
+        """
+        self._threadState.baseNumHeadings = numHeadings
 
     def heading(self, message, *args):
 
@@ -104,7 +124,7 @@ def heading(self, message, *args):
             message = message.format(*args)
 
         block = HeadingBlock(self, message)
-        self._headingBlocks.append(block)
+        self._getHeadingBlocks().append(block)
         return block
 
     def noise(self, message, *args):
@@ -133,8 +153,9 @@ def _logInternal(self, message, logType, *args):
 
         newLogType, newMessage = self.classifyMessage(logType, message)
 
-        for stream in self._streams:
-            stream.log(newLogType, newMessage)
+        with self._lock:
+            for stream in self._streams:
+                stream.log(newLogType, newMessage)
 
     def _getPatternMaps(self, settingName):
         maps = self._config.tryGetDictionary({}, 'Log', settingName)
@@ -0,0 +1,244 @@
+import os
+import sys
+import time
+import errno
+import struct
+import select
+import ctypes
+import ctypes.util
+
+from mtm.util.Assert import *
+
+class FileWatcherBase:
+    """
+    Reports the paths of files and directories that were added, removed or changed inside a set of
+    watched directories.  Symlinked directories are never followed
+
+    Subclasses implement addDirectory(dirPath, recursive) and waitForChanges(timeout), which waits
+    up to timeout seconds and returns the set of changed paths (empty if nothing changed).  If events
+    were lost, the watched directories themselves are returned so that the caller re-checks everything
+    """
+    def __init__(self, ignoredDirNames = None):
+        self._ignoredDirNames = set(x.lower() for x in (ignoredDirNames or []))
+
+    def _shouldIgnoreDir(self, name):
+        return name.lower() in self._ignoredDirNames
+
+    def close(self):
+        pass
+
+class PollingFileWatcher(FileWatcherBase):
+    """
+    Detects changes by comparing a snapshot of the size and modification time of every watched
+    entry against the previous one.  Works everywhere but costs a full directory walk per poll
+    """
+    def __init__(self, pollInterval, ignoredDirNames = None):
+        FileWatcherBase.__init__(self, ignoredDirNames)
+        self._pollInterval = pollInterval
+        # (directory path, recursive) pairs
+        self._roots = []
+        self._snapshot = {}
+
+    def addDirectory(self, dirPath, recursive):
+        self._roots.append((dirPath, recursive))
+        self._snapshot.update(self._takeSnapshot([(dirPath, recursive)]))
+
+    def _takeSnapshot(self, roots):
+        result = {}
+
+        for rootPath, recursive in roots:
+            dirsToProcess = [rootPath]
+
+            while dirsToProcess:
+                currentDir = dirsToProcess.pop()
+
+                try:
+                    with os.scandir(currentDir) as entries:
+                        for entry in entries:
+                            info = entry.stat(follow_symlinks = False)
+                            isDir = entry.is_dir(follow_symlinks = False)
+
+                            result[entry.path] = (isDir, info.st_size, info.st_mtime_ns)
+
+                            if isDir and recursive and not self._shouldIgnoreDir(entry.name):
+                                dirsToProcess.append(entry.path)
+                except OSError:
+                    # The directory was removed while we were reading it, which the parent
+                    # directory entry already reports
+                    pass
+
+        return result
+
+    def waitForChanges(self, timeout):
+        endTime = time.monotonic() + timeout
+
+        while True:
+            newSnapshot = self._takeSnapshot(self._roots)
+
+            changedPaths = set(x for x in newSnapshot if self._snapshot.get(x) != newSnapshot[x])
+            changedPaths.update(x for x in self._snapshot if x not in newSnapshot)
+
+            self._snapshot = newSnapshot
+
+            if changedPaths:
+                return changedPaths
+
+            remaining = endTime - time.monotonic()
+
+            if remaining <= 0:
+                return changedPaths
+
+            time.sleep(min(self._pollInterval, remaining))
+
+# Constants from sys/inotify.h
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+InotifyWatchMask = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+    | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW)
+
+InotifyEventHeader = struct.Struct('iIII')
+
+class InotifyFileWatcher(FileWatcherBase):
+    """
+    Uses the linux inotify API (through ctypes) so that changes are reported as soon as they
+    happen without walking any directories
+    """
+    def __init__(self, ignoredDirNames = None):
+        FileWatcherBase.__init__(self, ignoredDirNames)
+
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno = True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+        # Watch descriptor -> (directory path, recursive)
+        self._watches = {}
+        self._roots = []
+
+    def addDirectory(self, dirPath, recursive):
+        self._roots.append(dirPath)
+        self._addWatches(dirPath, recursive)
+
+    def _addWatches(self, dirPath, recursive):
+        """
+        Returns the paths of everything that exists below the newly watched directories
+        """
+        existingPaths = set()
+        dirsToProcess = [dirPath]
+
+        while dirsToProcess:
+            currentDir = dirsToProcess.pop()
+
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(currentDir), InotifyWatchMask)
+
+            if wd < 0:
+                error = ctypes.get_errno()
+
+                if error in (errno.ENOENT, errno.ENOTDIR):
+                    continue
+
+                raise OSError(error, "Failed to watch directory '{0}'".format(currentDir))
+
+            self._watches[wd] = (currentDir, recursive)
+
+            if not recursive:
+                continue
+
+            try:
+                with os.scandir(currentDir) as entries:
+                    for entry in entries:
+                        existingPaths.add(entry.path)
+
+                        if entry.is_dir(follow_symlinks = False) and not self._shouldIgnoreDir(entry.name):
+                            dirsToProcess.append(entry.path)
+            except OSError:
+                pass
+
+        return existingPaths
+
+    def waitForChanges(self, timeout):
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+
+        if not readable:
+            return set()
+
+        changedPaths = set()
+
+        while True:
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+
+            if not buf:
+                break
+
+            self._processEvents(buf, changedPaths)
+
+        return changedPaths
+
+    def _processEvents(self, buf, changedPaths):
+        offset = 0
+
+        while offset < len(buf):
+            wd, mask, cookie, nameLength = InotifyEventHeader.unpack_from(buf, offset)
+            offset += InotifyEventHeader.size
+
+            name = os.fsdecode(buf[offset:offset + nameLength].rstrip(b'\0'))
+            offset += nameLength
+
+            if mask & IN_Q_OVERFLOW:
+                changedPaths.update(self._roots)
+                continue
+
+            watch = self._watches.get(wd)
+
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+
+            if watch == None:
+                continue
+
+            dirPath, recursive = watch
+            path = os.path.join(dirPath, name) if name else dirPath
+
+            changedPaths.add(path)
+
+            if recursive and (mask & IN_ISDIR) and (mask & (IN_CREATE | IN_MOVED_TO)) and not self._shouldIgnoreDir(name):
+                # Anything created inside the new directory before the watch was added would
+                # otherwise be missed
+                changedPaths.update(self._addWatches(path, True))
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+def createFileWatcher(usePolling, pollInterval, ignoredDirNames = None):
+    """
+    Returns an inotify based watcher when available, and otherwise falls back to polling
+    """
+    if not usePolling and sys.platform.startswith('linux'):
+        try:
+            return InotifyFileWatcher(ignoredDirNames)
+        except (OSError, AttributeError):
+            pass
+
+    return PollingFileWatcher(pollInterval, ignoredDirNames)
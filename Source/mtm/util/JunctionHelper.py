@@ -1,12 +1,15 @@
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 import mtm.ioc.Container as Container
 from mtm.ioc.Inject import Inject
 import mtm.ioc.IocAssertions as Assertions
-import mtm.util.JunctionUtil as JunctionUtil
+from mtm.util.LinkBackends import createLinkBackend, LinkBackendTypes
 
 from mtm.util.Assert import *
 
+DefaultLinkWorkerCount = 8
+
 class JunctionHelper:
     """
     Misc. helper functions related to windows junctions
@@ -14,16 +17,30 @@ class JunctionHelper:
     _varMgr = Inject('VarManager')
     _log = Inject('Logger')
     _sys = Inject('SystemHelper')
+    _config = Inject('Config')
 
     def __init__(self):
-        pass
+        self._backend = None
+
+    @property
+    def backend(self):
+        if self._backend == None:
+            self._backend = createLinkBackend(self._config.tryGetString(LinkBackendTypes.Native, 'Links', 'Backend'))
+
+        return self._backend
+
+    def setBackend(self, backend):
+        self._backend = backend
+
+    def isJunction(self, path):
+        # Note that symlinks to directories that no longer exist are still links
+        return (os.path.isdir(path) or os.path.islink(path)) and self.backend.islink(path)
 
     def removeJunction(self, linkDir):
         linkDir = self._varMgr.expand(linkDir)
-        if os.path.isdir(linkDir) and JunctionUtil.islink(linkDir):
+        if self.isJunction(linkDir):
             try:
-                # Use rmdir not python unlink to ensure we don't delete the link source
-                self._sys.executeShellCommand('rmdir "{0}"'.format(linkDir))
+                self.backend.removeLink(linkDir)
             except Exception as e:
                 raise Exception('Failed while attempting to delete junction "{0}":\n{1}'.format(linkDir, str(e))) from e
 
@@ -40,8 +57,195 @@ def makeJunction(self, actualPath, linkPath):
         self._sys.makeMissingDirectoriesInPath(linkPath)
 
         self._log.debug('Making junction with actual path ({0}) and new link path ({1})'.format(linkPath, actualPath))
-        # Note: mklink is a shell command and can't be executed otherwise
-        self._sys.executeShellCommand('mklink /J "{0}" "{1}"'.format(linkPath, actualPath))
+
+        try:
+            self.backend.makeLink(actualPath, linkPath)
+        except Exception as e:
+            raise Exception('Failed while attempting to create junction "{0}" -> "{1}":\n{2}'.format(linkPath, actualPath, str(e))) from e
+
+    def makeJunctions(self, links):
+        """
+        Creates all the given links, where links is a list of (actual path, link path) pairs.  The links
+        are created on a pool of worker threads (see Links: Workers) and every failure is collected
+        into one error that is raised after all of the other links were created
+        """
+        links = [(self._varMgr.expandPath(x), self._varMgr.expandPath(y)) for x, y in links]
+
+        for actualPath, linkPath in links:
+            assertThat(self._sys.directoryExists(actualPath))
+
+        # Many links share the same parent directory, so only create each parent once
+        for parentDir in set(os.path.dirname(x[1]) for x in links):
+            self._sys.makeMissingDirectoriesInPath(os.path.join(parentDir, 'placeholder'))
+
+        def makeLink(link):
+            actualPath, linkPath = link
+            self.backend.makeLink(actualPath, linkPath)
+
+        failures = self._runLinkOperations(makeLink, links)
+
+        if failures:
+            raise Exception('Failed while attempting to create {0} of {1} junctions:\n{2}'.format(
+                len(failures), len(links), '\n'.join('"{0}" -> "{1}": {2}'.format(x[1], x[0], str(e)) for x, e in failures)))
+
+        self._log.debug('Created {0} junctions'.format(len(links)))
+
+    def removeJunctions(self, linkPaths, removeMetaFiles = True):
+        """
+        Removes all the given links (and optionally their .meta files), using the same worker pool as makeJunctions
+        Returns the list of paths that were links
+        """
+        # Note that we can't use expandPath here since that would resolve the links themselves
+        linkPaths = [self._varMgr.expand(x) for x in linkPaths]
+
+        def removeLink(linkPath):
+            if not self.isJunction(linkPath):
+                return False
+
+            self.backend.removeLink(linkPath)
+
+            if removeMetaFiles and os.path.exists(linkPath + '.meta'):
+                os.remove(linkPath + '.meta')
+
+            return True
+
+        removedPaths = []
+
+        failures = self._runLinkOperations(removeLink, linkPaths, removedPaths)
+
+        if failures:
+            raise Exception('Failed while attempting to delete {0} of {1} junctions:\n{2}'.format(
+                len(failures), len(linkPaths), '\n'.join('"{0}": {1}'.format(x, str(e)) for x, e in failures)))
+
+        return removedPaths
+
+    def _getWorkerCount(self):
+        return max(1, self._config.tryGetInt(DefaultLinkWorkerCount, 'Links', 'Workers'))
+
+    def _runLinkOperations(self, operation, items, succeededItems = None):
+        """
+        Runs operation on every item and returns a list of (item, exception) for every item that failed
+        Items for which the operation returns something other than False are added to succeededItems
+        """
+        def tryRun(item):
+            try:
+                return (item, operation(item), None)
+            except Exception as e:
+                return (item, None, e)
+
+        workerCount = min(self._getWorkerCount(), len(items))
+
+        if workerCount <= 1:
+            results = [tryRun(x) for x in items]
+        else:
+            with ThreadPoolExecutor(max_workers = workerCount) as executor:
+                results = list(executor.map(tryRun, items))
+
+        failures = []
+
+        for item, result, error in results:
+            if error != None:
+                failures.append((item, error))
+            elif succeededItems != None and result != False:
+                succeededItems.append(item)
+
+        return failures
+
+    def tryGetJunctionTarget(self, linkDir):
+        try:
+            target = self.backend.readlink(linkDir)
+        except Exception:
+            return None
+
+        # Junction targets can be returned in NT form
+        if target.startswith('\\??\\'):
+            target = target[4:]
+
+        return os.path.join(os.path.dirname(linkDir), target)
+
+    def getJunctionsInDirectory(self, dirPath):
+        """
+        Returns a dictionary of link path -> target path for all links directly inside the given directory
+        """
+        fullDirPath = self._varMgr.expandPath(dirPath)
+        result = {}
+
+        if not os.path.isdir(fullDirPath):
+            return result
+
+        with os.scandir(fullDirPath) as entries:
+            for entry in entries:
+                if entry.is_symlink() or (entry.is_dir() and self.backend.islink(entry.path)):
+                    result[entry.path] = self.tryGetJunctionTarget(entry.path)
+
+        return result
+
+    def reconcileJunctions(self, desiredLinks, linkDirs):
+        """
+        Updates the links inside the given directories so that they match desiredLinks (a dictionary of
+        link path -> target path), by only adding, removing or re-targeting the links that differ
+
+        Returns a JunctionChanges object describing what was changed
+        """
+        changes = JunctionChanges()
+
+        desired = {}
+
+        for linkPath, targetPath in desiredLinks.items():
+            linkPath = self._varMgr.expand(linkPath)
+            # Only resolve the parent directory, since the link itself may already exist
+            linkPath = os.path.join(os.path.realpath(os.path.dirname(linkPath)), os.path.basename(linkPath))
+            desired[_normalizePath(linkPath)] = (linkPath, self._varMgr.expandPath(targetPath))
+
+        scanDirs = set(_normalizePath(self._varMgr.expandPath(x)) for x in linkDirs)
+        scanDirs.update(os.path.dirname(x) for x in desired)
+
+        existing = {}
+
+        for scanDir in scanDirs:
+            for linkPath, targetPath in self.getJunctionsInDirectory(scanDir).items():
+                existing[_normalizePath(linkPath)] = (linkPath, targetPath)
+
+        linksToRemove = []
+        linksToRetarget = []
+        linksToMake = []
+
+        for key, (linkPath, targetPath) in existing.items():
+            if key not in desired:
+                linksToRemove.append(linkPath)
+                changes.removed.append(linkPath)
+
+        for key, (linkPath, targetPath) in desired.items():
+            existingLink = existing.get(key)
+
+            if existingLink != None:
+                existingTarget = existingLink[1]
+
+                if existingTarget != None and _normalizePath(existingTarget) == _normalizePath(targetPath):
+                    changes.unchangedCount += 1
+                    continue
+
+                linksToRetarget.append(existingLink[0])
+                changes.retargeted.append(linkPath)
+            else:
+                assertThat(not os.path.exists(linkPath), "Did not expect this path to exist: '{0}'".format(linkPath))
+                changes.added.append(linkPath)
+
+            linksToMake.append((targetPath, linkPath))
+
+        if linksToRemove:
+            self.removeJunctions(linksToRemove)
+
+        if linksToRetarget:
+            self.removeJunctions(linksToRetarget, False)
+
+        if linksToMake:
+            self.makeJunctions(linksToMake)
+
+        for linkPath in changes.removed:
+            self._log.debug('Removed link "{0}"'.format(linkPath))
+
+        return changes
 
     def removeJunctionsInDirectory(self, dirPath, recursive):
         fullDirPath = self._varMgr.expandPath(dirPath)
@@ -49,18 +253,37 @@ def removeJunctionsInDirectory(self, dirPath, recursive):
         if not os.path.exists(fullDirPath):
             return
 
+        candidates = []
+
         for name in os.listdir(fullDirPath):
             fullPath = os.path.join(fullDirPath, name)
 
-            if not os.path.isdir(fullPath):
-                continue
+            if os.path.isdir(fullPath) or os.path.islink(fullPath):
+                candidates.append(fullPath)
 
-            if self.removeJunction(fullPath):
-                if os.path.exists(fullPath + '.meta'):
-                    os.remove(fullPath + '.meta')
+        removedPaths = self.removeJunctions(candidates)
 
-                self._log.debug('Removed directory for package "{0}"'.format(name))
-            else:
-                if recursive:
+        for fullPath in removedPaths:
+            self._log.debug('Removed directory for package "{0}"'.format(os.path.basename(fullPath)))
+
+        if recursive:
+            removedPaths = set(removedPaths)
+
+            for fullPath in candidates:
+                if fullPath not in removedPaths:
                     self.removeJunctionsInDirectory(fullPath, True)
 
+
+class JunctionChanges:
+    def __init__(self):
+        self.added = []
+        self.removed = []
+        self.retargeted = []
+        self.unchangedCount = 0
+
+    @property
+    def hasChanges(self):
+        return len(self.added) > 0 or len(self.removed) > 0 or len(self.retargeted) > 0
+
+def _normalizePath(path):
+    return os.path.normcase(os.path.normpath(path))
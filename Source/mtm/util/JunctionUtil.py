@@ -1,48 +1,55 @@
+import os
+import struct
 from ctypes import *
 from ctypes.wintypes import *
 
-kernel32 = WinDLL('kernel32')
 LPDWORD = POINTER(DWORD)
 UCHAR = c_ubyte
 
-GetFileAttributesW = kernel32.GetFileAttributesW
-GetFileAttributesW.restype = DWORD
-GetFileAttributesW.argtypes = (LPCWSTR,) #lpFileName In
-
-INVALID_FILE_ATTRIBUTES = 0xFFFFFFFF
-FILE_ATTRIBUTE_REPARSE_POINT = 0x00400
-
-CreateFileW = kernel32.CreateFileW
-CreateFileW.restype = HANDLE
-CreateFileW.argtypes = (LPCWSTR, #lpFileName In
-                        DWORD,   #dwDesiredAccess In
-                        DWORD,   #dwShareMode In
-                        LPVOID,  #lpSecurityAttributes In_opt
-                        DWORD,   #dwCreationDisposition In
-                        DWORD,   #dwFlagsAndAttributes In
-                        HANDLE)  #hTemplateFile In_opt
-
-CloseHandle = kernel32.CloseHandle
-CloseHandle.restype = BOOL
-CloseHandle.argtypes = (HANDLE,) #hObject In
-
-INVALID_HANDLE_VALUE = HANDLE(-1).value
-OPEN_EXISTING = 3
-FILE_FLAG_BACKUP_SEMANTICS = 0x02000000
-FILE_FLAG_OPEN_REPARSE_POINT = 0x00200000
-
-DeviceIoControl = kernel32.DeviceIoControl
-DeviceIoControl.restype = BOOL
-DeviceIoControl.argtypes = (HANDLE,  #hDevice In
-                            DWORD,   #dwIoControlCode In
-                            LPVOID,  #lpInBuffer In_opt
-                            DWORD,   #nInBufferSize In
-                            LPVOID,  #lpOutBuffer Out_opt
-                            DWORD,   #nOutBufferSize In
-                            LPDWORD, #lpBytesReturned Out_opt
-                            LPVOID)  #lpOverlapped Inout_opt
+# Junctions only exist on windows, see the bottom of this file for other platforms
+if os.name == 'nt':
+    kernel32 = WinDLL('kernel32')
+
+    GetFileAttributesW = kernel32.GetFileAttributesW
+    GetFileAttributesW.restype = DWORD
+    GetFileAttributesW.argtypes = (LPCWSTR,) #lpFileName In
+
+    INVALID_FILE_ATTRIBUTES = 0xFFFFFFFF
+    FILE_ATTRIBUTE_REPARSE_POINT = 0x00400
+
+    CreateFileW = kernel32.CreateFileW
+    CreateFileW.restype = HANDLE
+    CreateFileW.argtypes = (LPCWSTR, #lpFileName In
+                            DWORD,   #dwDesiredAccess In
+                            DWORD,   #dwShareMode In
+                            LPVOID,  #lpSecurityAttributes In_opt
+                            DWORD,   #dwCreationDisposition In
+                            DWORD,   #dwFlagsAndAttributes In
+                            HANDLE)  #hTemplateFile In_opt
+
+    CloseHandle = kernel32.CloseHandle
+    CloseHandle.restype = BOOL
+    CloseHandle.argtypes = (HANDLE,) #hObject In
+
+    INVALID_HANDLE_VALUE = HANDLE(-1).value
+    GENERIC_WRITE = 0x40000000
+    OPEN_EXISTING = 3
+    FILE_FLAG_BACKUP_SEMANTICS = 0x02000000
+    FILE_FLAG_OPEN_REPARSE_POINT = 0x00200000
+
+    DeviceIoControl = kernel32.DeviceIoControl
+    DeviceIoControl.restype = BOOL
+    DeviceIoControl.argtypes = (HANDLE,  #hDevice In
+                                DWORD,   #dwIoControlCode In
+                                LPVOID,  #lpInBuffer In_opt
+                                DWORD,   #nInBufferSize In
+                                LPVOID,  #lpOutBuffer Out_opt
+                                DWORD,   #nOutBufferSize In
+                                LPDWORD, #lpBytesReturned Out_opt
+                                LPVOID)  #lpOverlapped Inout_opt
 
 FSCTL_GET_REPARSE_POINT = 0x000900A8
+FSCTL_SET_REPARSE_POINT = 0x000900A4
 IO_REPARSE_TAG_MOUNT_POINT = 0xA0000003
 IO_REPARSE_TAG_SYMLINK = 0xA000000C
 MAXIMUM_REPARSE_DATA_BUFFER_SIZE = 0x4000
@@ -128,6 +135,62 @@ def readlink(path):
         return rdb.MountPointReparseBuffer.PrintName
     raise ValueError("not a link")
 
+def createMountPointReparseData(targetPath):
+    """
+    Returns the REPARSE_DATA_BUFFER that turns an empty directory into a junction to the given
+    absolute path.  This is built by hand since WCHAR is not two bytes on every platform
+    """
+    substituteName = ('\\??\\' + targetPath).encode('utf-16-le')
+    printName = targetPath.encode('utf-16-le')
+
+    # Both names are followed by a null character that is not included in their lengths
+    pathBuffer = substituteName + b'\0\0' + printName + b'\0\0'
+
+    # The data length does not include the tag, the data length itself, or the reserved field
+    header = struct.pack('<LHHHHHH', IO_REPARSE_TAG_MOUNT_POINT, 8 + len(pathBuffer), 0,
+        0, len(substituteName), len(substituteName) + 2, len(printName))
+
+    return header + pathBuffer
+
+def makeJunction(actualPath, linkPath):
+    """
+    Creates a junction at linkPath that points to the directory actualPath, without starting
+    a new process (unlike mklink /J)
+    """
+    data = createMountPointReparseData(os.path.abspath(actualPath))
+    os.mkdir(linkPath)
+
+    try:
+        reparse_point_handle = CreateFileW(linkPath,
+                                           GENERIC_WRITE,
+                                           0,
+                                           None,
+                                           OPEN_EXISTING,
+                                           FILE_FLAG_OPEN_REPARSE_POINT |
+                                           FILE_FLAG_BACKUP_SEMANTICS,
+                                           None)
+        if reparse_point_handle == INVALID_HANDLE_VALUE:
+            raise WinError()
+        data_buffer = create_string_buffer(data, len(data))
+        n_bytes_returned = DWORD()
+        io_result = DeviceIoControl(reparse_point_handle,
+                                    FSCTL_SET_REPARSE_POINT,
+                                    data_buffer, len(data),
+                                    None, 0,
+                                    byref(n_bytes_returned),
+                                    None)
+        CloseHandle(reparse_point_handle)
+        if not io_result:
+            raise WinError()
+    except:
+        os.rmdir(linkPath)
+        raise
+
+if os.name != 'nt':
+    # Everywhere else links are plain symlinks, which python can already handle
+    islink = os.path.islink
+    readlink = os.readlink
+
 if __name__ == '__main__':
 
     path = "C:/Temp/JunctionTest"
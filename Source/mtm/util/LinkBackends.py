@@ -0,0 +1,67 @@
+import os
+
+from mtm.ioc.Inject import Inject
+import mtm.util.JunctionUtil as JunctionUtil
+
+from mtm.util.Assert import *
+
+class LinkBackendTypes:
+    Native = 'native'
+    Shell = 'shell'
+
+    All = [Native, Shell]
+
+class LinkBackendBase:
+    """
+    Creates and removes directory links.  On windows these are junctions (which unlike symlinks do not
+    require admin rights) and everywhere else they are symlinks
+    Subclasses implement makeLink(actualPath, linkPath) and removeLink(linkPath)
+    """
+    def islink(self, path):
+        return JunctionUtil.islink(path)
+
+    def readlink(self, path):
+        return JunctionUtil.readlink(path)
+
+class NativeLinkBackend(LinkBackendBase):
+    """
+    Creates links in process, without starting a new process for every link
+    """
+    def makeLink(self, actualPath, linkPath):
+        if os.name == 'nt':
+            JunctionUtil.makeJunction(actualPath, linkPath)
+        else:
+            os.symlink(actualPath, linkPath, target_is_directory = True)
+
+    def removeLink(self, linkPath):
+        if os.name == 'nt':
+            # Removing a junction with rmdir only removes the junction and never the contents of the target
+            os.rmdir(linkPath)
+        else:
+            os.unlink(linkPath)
+
+class ShellLinkBackend(LinkBackendBase):
+    """
+    Uses mklink / rmdir from the windows shell
+    """
+    _sys = Inject('SystemHelper')
+
+    def makeLink(self, actualPath, linkPath):
+        # Note: mklink is a shell command and can't be executed otherwise
+        self._sys.executeShellCommand('mklink /J "{0}" "{1}"'.format(linkPath, actualPath))
+
+    def removeLink(self, linkPath):
+        # Use rmdir not python unlink to ensure we don't delete the link source
+        self._sys.executeShellCommand('rmdir "{0}"'.format(linkPath))
+
+def createLinkBackend(backendType):
+    backendType = backendType.lower()
+
+    if backendType == LinkBackendTypes.Native:
+        return NativeLinkBackend()
+
+    if backendType == LinkBackendTypes.Shell:
+        assertThat(os.name == 'nt', "Link backend '{0}' is only supported on windows", backendType)
+        return ShellLinkBackend()
+
+    assertThat(False, "Unrecognized link backend '{0}'.  Expected one of {1}", backendType, ', '.join(LinkBackendTypes.All))
@@ -1,7 +1,6 @@
 import subprocess
 import csv
 import re
-import msvcrt
 import os
 import sys
 import imp
@@ -19,6 +18,9 @@ def getExecDirectory():
 def confirmChoice(msg):
     print('\n' + msg, end="")
 
+    # Only available on windows, so only import it when actually needed
+    import msvcrt
+
     while True:
         if msvcrt.kbhit():
             choice = msvcrt.getch().decode("utf-8")
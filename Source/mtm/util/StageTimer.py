@@ -0,0 +1,43 @@
+import time
+from collections import OrderedDict
+
+class StageTimer:
+    """
+    Accumulates the time spent in named stages, in the order they were first entered
+    """
+    def __init__(self):
+        self.stages = OrderedDict()
+        self.counts = OrderedDict()
+
+    def stage(self, name):
+        return StageBlock(self, name)
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def wrap(self, name, func):
+        """
+        Returns a version of func that records its time under the given name
+        """
+        def timedFunc(*args, **kwargs):
+            with self.stage(name):
+                return func(*args, **kwargs)
+
+        return timedFunc
+
+    def clear(self):
+        self.stages.clear()
+        self.counts.clear()
+
+class StageBlock:
+    def __init__(self, timer, name):
+        self._timer = timer
+        self._name = name
+        self._startTime = None
+
+    def __enter__(self):
+        self._startTime = time.perf_counter()
+
+    def __exit__(self, type, value, traceback):
+        self._timer.add(self._name, time.perf_counter() - self._startTime)
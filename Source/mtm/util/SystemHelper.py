@@ -14,6 +14,9 @@
 
 import time
 import os
+import threading
+import pickle
+import tempfile
 import shlex
 import subprocess
 import shutil
@@ -39,6 +42,9 @@ class SystemHelper:
     # Use an hour timeout
     def __init__(self, timeout = 60 * 60):
         self._timeout = timeout
+        self._writeStatsLock = threading.Lock()
+        self.writtenFileCount = 0
+        self.skippedWriteCount = 0
 
     def canonicalizePath(self, pathStr):
         # Make one standard representation of the given path
@@ -291,6 +297,86 @@ def writeFileAsText(self, path, text):
         with self.openOutputFile(path) as f:
             f.write(text)
 
+    def tryReadPickleFile(self, path):
+        path = self._varManager.expand(path)
+
+        if not os.path.isfile(path):
+            return None
+
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            # Cache files are disposable so treat corrupt or out of date files as missing
+            self._log.debug("Ignoring unreadable file '{0}': {1}".format(path, str(e)))
+            return None
+
+    def writePickleFile(self, path, obj):
+        self._writeBytesAtomic(self._varManager.expand(path), pickle.dumps(obj, pickle.HIGHEST_PROTOCOL))
+
+    def _writeBytesAtomic(self, path, data):
+        self.makeMissingDirectoriesInPath(path)
+
+        # Write to a temporary file first so that concurrent readers never see a partially written file
+        fileHandle, tempPath = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+
+        try:
+            with os.fdopen(fileHandle, 'wb') as f:
+                f.write(data)
+
+            # mkstemp only gives the owner access
+            if os.path.exists(path):
+                shutil.copymode(path, tempPath)
+            else:
+                os.chmod(tempPath, 0o644)
+
+            os.replace(tempPath, path)
+        except:
+            os.remove(tempPath)
+            raise
+
+    def writeFileIfChanged(self, path, text):
+        """
+        Same as writeFileAsText except the file is written atomically, and not at all if it already
+        has the same contents, so that unity / visual studio do not see a change
+
+        Returns True if the file was written
+        """
+        path = self._varManager.expand(path)
+
+        # Match the newline translation that writeFileAsText gets from text mode
+        data = text.replace('\n', os.linesep).encode('utf-8', errors='ignore')
+
+        try:
+            with open(path, 'rb') as f:
+                isUnchanged = f.read() == data
+        except OSError:
+            isUnchanged = False
+
+        if isUnchanged:
+            self.addWriteStats(0, 1)
+        else:
+            self.addWriteStats(1, 0)
+
+        if isUnchanged:
+            self._log.debug("Skipped writing '{0}' since it is unchanged".format(path))
+            return False
+
+        self._writeBytesAtomic(path, data)
+        return True
+
+    def addWriteStats(self, writtenCount, skippedCount):
+        """
+        Counts files that were written or left unchanged by something other than writeFileIfChanged
+        """
+        with self._writeStatsLock:
+            self.writtenFileCount += writtenCount
+            self.skippedWriteCount += skippedCount
+
+    def logWriteStats(self):
+        if self.writtenFileCount > 0 or self.skippedWriteCount > 0:
+            self._log.info('Generated files: {0} written, {1} unchanged', self.writtenFileCount, self.skippedWriteCount)
+
     def openOutputFile(self, path):
         path = self._varManager.expand(path)
         self.makeMissingDirectoriesInPath(path)
@@ -0,0 +1,23 @@
+
+import mtm.ioc.Container as Container
+
+from mtm.log.Logger import Logger
+from mtm.config.Config import Config
+from mtm.util.VarManager import VarManager
+from mtm.util.SystemHelper import SystemHelper
+
+class LogStreamNull:
+    def log(self, logType, message):
+        pass
+
+def installBindings(config = None, pathVars = None):
+    """
+    Clears the container and binds the Config, Logger, VarManager and SystemHelper
+    singletons that most tests need, with all log output discarded
+    """
+    Container.clear()
+    Container.bind('Config').toSingle(Config, [config if config else {}])
+    Container.bind('LogStream').toSingle(LogStreamNull)
+    Container.bind('Logger').toSingle(Logger)
+    Container.bind('VarManager').toSingle(VarManager, pathVars)
+    Container.bind('SystemHelper').toSingle(SystemHelper)
@@ -33,6 +33,16 @@ def ensureNoDuplicates(items, collectionName):
 
     assertThat(len(duplicates) == 0, "Found duplicates in collection '{0}': {1}".format(collectionName, ', '.join([str(x) for x in duplicates])))
 
+def getFileStamp(path):
+    # Cheap signature used to detect whether a file (or directory listing) has changed
+    # Returns None if nothing exists at the given path
+    try:
+        info = os.stat(path)
+    except OSError:
+        return None
+
+    return (info.st_mtime_ns, info.st_size)
+
 def mergeDictionaries(x, y):
     z = x.copy()
     z.update(y)
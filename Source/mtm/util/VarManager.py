@@ -1,6 +1,7 @@
 
 import os
 import re
+import threading
 
 import mtm.util.Util as Util
 import mtm.util.MiscUtil as MiscUtil
@@ -12,6 +13,9 @@
 
 from mtm.util.Assert import *
 
+# Returned by VarManager._tryGetParam for variables that were never set, since None is a valid value
+_Missing = object()
+
 class VarManager:
     _config = Inject('Config')
     _log = Inject('Logger')
@@ -30,34 +34,95 @@ def __init__(self, initialParams = None):
 
         self._regex = re.compile('^([^\[]*)(\[[^\]]*\])(.*)$')
 
+        self._threadState = threading.local()
+
+    def withOverrides(self, overrides):
+        """
+        Returns a new VarContext containing the given variables on top of the variables of the
+        currently active context (if any).  The VarManager itself is not changed
+        """
+        context = self.getActiveContext()
+
+        if context == None:
+            return VarContext(overrides)
+
+        return context.withOverrides(overrides)
+
+    def getActiveContext(self):
+        return getattr(self._threadState, 'context', None)
+
+    def activate(self, context):
+        """
+        Returns a block inside of which every lookup on the current thread sees the variables of
+        the given context first.  Since SystemHelper, JunctionHelper, the generators etc. all expand
+        their paths through the VarManager, they all pick up the context without having to be
+        passed it.  Calls to set() inside the block derive a new context for the current thread
+        instead of changing the shared variables
+        """
+        return VarContextBlock(self, context)
+
+    def threadScope(self):
+        """
+        Same as activate() with an empty context, so that calls to set() and add() only change
+        the variables seen by the current thread
+        """
+        return self.activate(self.withOverrides({}))
+
+    def _getParams(self):
+        context = self.getActiveContext()
+
+        if context == None:
+            return self._params
+
+        result = self._params.copy()
+        result.update(context._params)
+        return result
+
     def getAllParameters(self):
         matches = self._config.getAll('PathVars')
-        result = self._params.copy()
+        result = self._getParams().copy()
         for match in matches:
             assertIsType(match, dict)
             result = Util.mergeDictionaries(result, match)
         return result
 
     def hasKey(self, key):
-        return key in self._params or self._config.tryGet('PathVars', key) != None
+        return self._tryGetParam(key) is not _Missing or self._config.tryGet('PathVars', key) != None
+
+    def _tryGetParam(self, key):
+        context = self.getActiveContext()
+
+        if context != None and key in context._params:
+            return context._params[key]
+
+        return self._params.get(key, _Missing)
 
     def get(self, key):
-        if key in self._params:
-            return self._params[key]
+        value = self._tryGetParam(key)
+
+        if value is not _Missing:
+            return value
 
         return self._config.getString('PathVars', key)
 
     def tryGet(self, key):
-        if key in self._params:
-            return self._params[key]
+        value = self._tryGetParam(key)
+
+        if value is not _Missing:
+            return value
 
         return self._config.tryGetString(None, 'PathVars', key)
 
     def add(self, key, value):
-        self._params[key] = value
+        self.set(key, value)
 
     def set(self, key, value):
-        self._params[key] = value
+        context = self.getActiveContext()
+
+        if context != None:
+            self._threadState.context = context.withOverrides({key: value})
+        else:
+            self._params[key] = value
 
     def expandPath(self, text, extraVars = None):
         ''' Same as expand() except it cleans up the path to remove ../ '''
@@ -68,7 +133,7 @@ def expand(self, text, extraVars = None):
         if not extraVars:
             extraVars = {}
 
-        allArgs = self._params.copy()
+        allArgs = self._getParams().copy()
         allArgs.update(extraVars)
 
         originalText = text
@@ -104,4 +169,39 @@ def expand(self, text, extraVars = None):
 
         return text
 
+class VarContext:
+    """
+    An immutable set of path variables that is layered on top of the variables of the VarManager
+    Use VarManager.activate to make it visible to the current thread
+    """
+    def __init__(self, params):
+        self._params = dict(params)
+
+    def withOverrides(self, overrides):
+        params = dict(self._params)
+        params.update(overrides)
+        return VarContext(params)
+
+    def hasKey(self, key):
+        return key in self._params
+
+    def tryGet(self, key):
+        return self._params.get(key)
+
+    def getAll(self):
+        return dict(self._params)
+
+class VarContextBlock:
+    def __init__(self, varMgr, context):
+        self._varMgr = varMgr
+        self._context = context
+        self._previousContext = None
+
+    def __enter__(self):
+        state = self._varMgr._threadState
+        self._previousContext = getattr(state, 'context', None)
+        state.context = self._context
+        return self._context
 
+    def __exit__(self, type, value, traceback):
+        self._varMgr._threadState.context = self._previousContext
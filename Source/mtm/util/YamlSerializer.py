@@ -11,7 +11,7 @@ def serialize(obj):
     return yaml.dump(_serializeObj(obj), width=9999999, default_flow_style=False)
 
 def deserialize(yamlStr):
-    return _deserializeObj(yaml.load(yamlStr))
+    return _deserializeObj(yaml.load(yamlStr, Loader = yaml.Loader))
 
 def _deserializeObj(data):
     dataType = type(data)
@@ -0,0 +1,108 @@
+import os
+import struct
+import shutil
+import tempfile
+import unittest
+
+import mtm.ioc.Container as Container
+
+import mtm.util.UnitTestUtil as UnitTestUtil
+from mtm.util.ProcessRunner import ProcessRunner
+from mtm.util.JunctionHelper import JunctionHelper
+from mtm.util.LinkBackends import NativeLinkBackend
+import mtm.util.JunctionUtil as JunctionUtil
+
+from mtm.util.Assert import *
+
+class TestJunctionHelper(unittest.TestCase):
+    def setUp(self):
+        self._tempDir = os.path.realpath(tempfile.mkdtemp())
+
+        for name in ['A', 'B', 'C']:
+            os.makedirs(os.path.join(self._tempDir, 'Packages', name))
+
+        self._linkDir = os.path.join(self._tempDir, 'Project', 'Assets')
+
+        UnitTestUtil.installBindings({'Links': {'Backend': 'Native'}})
+        Container.bind('ProcessRunner').toSingle(ProcessRunner)
+        Container.bind('JunctionHelper').toSingle(JunctionHelper)
+
+    def tearDown(self):
+        shutil.rmtree(self._tempDir)
+
+    def _getPackagePath(self, name):
+        return os.path.join(self._tempDir, 'Packages', name)
+
+    def _reconcile(self, linkMap):
+        desiredLinks = {os.path.join(self._linkDir, x): self._getPackagePath(y) for x, y in linkMap.items()}
+        return Container.resolve('JunctionHelper').reconcileJunctions(desiredLinks, [self._linkDir])
+
+    def testMakeAndRemove(self):
+        helper = Container.resolve('JunctionHelper')
+        assertThat(isinstance(helper.backend, NativeLinkBackend))
+
+        linkPath = os.path.join(self._linkDir, 'A')
+        helper.makeJunction(self._getPackagePath('A'), linkPath)
+
+        assertThat(helper.isJunction(linkPath))
+        assertIsEqual(os.path.realpath(helper.tryGetJunctionTarget(linkPath)), self._getPackagePath('A'))
+
+        assertThat(helper.removeJunction(linkPath))
+        assertThat(not os.path.exists(linkPath))
+        # The link target must never be touched
+        assertThat(os.path.isdir(self._getPackagePath('A')))
+
+    def testReconcile(self):
+        changes = self._reconcile({'A': 'A', 'B': 'B'})
+        assertIsEqual((len(changes.added), len(changes.removed), len(changes.retargeted)), (2, 0, 0))
+
+        changes = self._reconcile({'A': 'A', 'B': 'B'})
+        assertThat(not changes.hasChanges)
+        assertIsEqual(changes.unchangedCount, 2)
+
+        with open(os.path.join(self._linkDir, 'B.meta'), 'w') as f:
+            f.write('')
+
+        changes = self._reconcile({'A': 'C', 'C': 'C'})
+        assertIsEqual((len(changes.added), len(changes.removed), len(changes.retargeted)), (1, 1, 1))
+
+        assertIsEqual(sorted(os.listdir(self._linkDir)), ['A', 'C'])
+        assertIsEqual(os.path.realpath(os.path.join(self._linkDir, 'A')), self._getPackagePath('C'))
+
+    def testBatchFailuresAreCollected(self):
+        helper = Container.resolve('JunctionHelper')
+
+        os.makedirs(self._linkDir)
+
+        for name in ['A', 'C']:
+            with open(os.path.join(self._linkDir, name), 'w') as f:
+                f.write('')
+
+        links = [(self._getPackagePath(x), os.path.join(self._linkDir, x)) for x in ['A', 'B', 'C']]
+
+        with self.assertRaises(Exception) as context:
+            helper.makeJunctions(links)
+
+        message = str(context.exception)
+        assertThat('2 of 3' in message)
+        assertThat(os.path.join(self._linkDir, 'A') in message and os.path.join(self._linkDir, 'C') in message)
+
+        # The links that could be created should still be created
+        assertThat(helper.isJunction(os.path.join(self._linkDir, 'B')))
+
+    def testMountPointReparseData(self):
+        targetPath = 'C:\\Projects\\Packages\\MyPackage'
+        data = JunctionUtil.createMountPointReparseData(targetPath)
+
+        tag, dataLength, reserved, substOffset, substLength, printOffset, printLength = struct.unpack_from('<LHHHHHH', data)
+        pathBuffer = data[16:]
+
+        assertIsEqual(tag, JunctionUtil.IO_REPARSE_TAG_MOUNT_POINT)
+        assertIsEqual(dataLength, len(data) - 8)
+        assertIsEqual(pathBuffer[substOffset:substOffset + substLength].decode('utf-16-le'), '\\??\\' + targetPath)
+        assertIsEqual(pathBuffer[printOffset:printOffset + printLength].decode('utf-16-le'), targetPath)
+        assertIsEqual(pathBuffer[printOffset - 2:printOffset], b'\0\0')
+        assertIsEqual(pathBuffer[-2:], b'\0\0')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,7 @@
 
 import os
+import shutil
+import tempfile
 import unittest
 
 import mtm.ioc.Container as Container
@@ -9,6 +11,7 @@
 from mtm.util.VarManager import VarManager
 from mtm.util.SystemHelper import SystemHelper
 from mtm.log.Logger import Logger
+import mtm.util.UnitTestUtil as UnitTestUtil
 
 class TestSystemHelper(unittest.TestCase):
     def setUp(self):
@@ -36,6 +39,38 @@ def _test1(self, sysHelper):
         #sysHelper.executeAndWait('cmd /c mklink')
         sysHelper.executeAndWaitWithParams(None, 'cmd', '/c', 'mklink')
 
+    def testWriteFileIfChanged(self):
+        UnitTestUtil.installBindings()
+
+        sysHelper = Container.resolve('SystemHelper')
+        tempDir = tempfile.mkdtemp()
+
+        try:
+            path = os.path.join(tempDir, 'Generated', 'Foo.cs')
+
+            self.assertTrue(sysHelper.writeFileIfChanged(path, 'class Foo\n{\n}\n'))
+            self.assertEqual(sysHelper.readFileAsText(path), 'class Foo\n{\n}\n')
+
+            # Must give the same bytes as writing in text mode
+            otherPath = os.path.join(tempDir, 'Other.cs')
+            sysHelper.writeFileAsText(otherPath, 'class Foo\n{\n}\n')
+
+            with open(path, 'rb') as f1, open(otherPath, 'rb') as f2:
+                self.assertEqual(f1.read(), f2.read())
+
+            mtime = os.stat(path).st_mtime_ns
+
+            self.assertFalse(sysHelper.writeFileIfChanged(path, 'class Foo\n{\n}\n'))
+            self.assertEqual(os.stat(path).st_mtime_ns, mtime)
+
+            self.assertTrue(sysHelper.writeFileIfChanged(path, 'class Bar\n{\n}\n'))
+            self.assertEqual(sysHelper.readFileAsText(path), 'class Bar\n{\n}\n')
+
+            self.assertEqual((sysHelper.writtenFileCount, sysHelper.skippedWriteCount), (2, 1))
+            self.assertEqual(os.listdir(os.path.join(tempDir, 'Generated')), ['Foo.cs'])
+        finally:
+            shutil.rmtree(tempDir)
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -1,5 +1,6 @@
 
 import unittest
+import threading
 
 import mtm.ioc.Container as Container
 from mtm.ioc.Inject import Inject
@@ -44,6 +45,65 @@ def test1(self):
 
         print('Done')
 
+    def testContexts(self):
+        Container.bind('Config').toSingle(Config, [{'PathVars': {'Root': 'C:/Projects'}}])
+        Container.bind('VarManager').toSingle(VarManager)
+
+        varMgr = Container.resolve('VarManager')
+        varMgr.set('ProjectRoot', '[Root]/[ProjectName]')
+
+        contextA = varMgr.withOverrides({'ProjectName': 'A'})
+        contextB = contextA.withOverrides({'ProjectName': 'B'})
+
+        assertIsEqual(contextA.tryGet('ProjectName'), 'A')
+        assertThat(not varMgr.hasKey('ProjectName'))
+
+        with varMgr.activate(contextA):
+            assertIsEqual(varMgr.expand('[ProjectRoot]'), 'C:/Projects/A')
+
+            with varMgr.activate(contextB):
+                assertIsEqual(varMgr.expand('[ProjectRoot]'), 'C:/Projects/B')
+
+            # Setting a variable while a context is active must not change the context itself
+            varMgr.set('ProjectName', 'C')
+            assertIsEqual(varMgr.expand('[ProjectRoot]'), 'C:/Projects/C')
+            assertIsEqual(contextA.tryGet('ProjectName'), 'A')
+
+        assertThat(not varMgr.hasKey('ProjectName'))
+
+        results = {}
+
+        def run(context):
+            with varMgr.activate(context):
+                results[context.tryGet('ProjectName')] = varMgr.expand('[ProjectRoot]')
+
+        threads = [threading.Thread(target = run, args = (x,)) for x in [contextA, contextB]]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        assertIsEqual(results, {'A': 'C:/Projects/A', 'B': 'C:/Projects/B'})
+
+    def testVariablesSetToNone(self):
+        Container.bind('Config').toSingle(Config, [{'PathVars': {'Root': 'C:/Projects'}}])
+        Container.bind('VarManager').toSingle(VarManager)
+
+        varMgr = Container.resolve('VarManager')
+
+        # A variable that is set to None hides the config value instead of falling back to it
+        varMgr.set('Root', None)
+        varMgr.set('Unused', None)
+
+        assertThat(varMgr.hasKey('Unused'))
+        assertIsEqual(varMgr.get('Root'), None)
+        assertIsEqual(varMgr.tryGet('Root'), None)
+
+        with varMgr.activate(varMgr.withOverrides({'Root': 'D:/Projects'})):
+            assertIsEqual(varMgr.get('Root'), 'D:/Projects')
+
 if __name__ == '__main__':
     unittest.main()
 
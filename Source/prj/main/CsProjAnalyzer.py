@@ -19,6 +19,14 @@ def root(self):
     def getAssemblyName(self):
         return self._root.findall('./{0}PropertyGroup/{0}AssemblyName'.format(NsPrefix))[0].text
 
+    def tryGetProjectGuid(self):
+        matches = self._root.findall('./{0}PropertyGroup/{0}ProjectGuid'.format(NsPrefix))
+
+        if len(matches) == 0:
+            return None
+
+        return matches[0].text
+
     def getProjectReferences(self):
         result = []
         for projRef in self._root.findall('./{0}ItemGroup/{0}ProjectReference/{0}Name'.format(NsPrefix)):
@@ -0,0 +1,98 @@
+import re
+
+import mtm.util.Util as Util
+from mtm.ioc.Inject import Inject
+from mtm.util.Assert import *
+
+from prj.main.CsProjAnalyzer import CsProjAnalyzer
+
+# Increment this whenever CsProjFacts changes
+CsProjFactsCacheVersion = 1
+
+class CsProjFacts:
+    def __init__(self, assemblyName, projectGuid, projectReferences):
+        self.assemblyName = assemblyName
+        self.projectGuid = projectGuid
+        self.projectReferences = projectReferences
+
+class CsProjFactsCacheData:
+    def __init__(self):
+        self.version = CsProjFactsCacheVersion
+        # csproj path -> (file stamp, CsProjFacts)
+        self.entries = {}
+
+class CsProjFactsCache:
+    """
+    Stores the parts of assembly project csproj files that Projeny needs, so that
+    unchanged csproj files do not need to be parsed again, either within the same run or
+    across runs
+    """
+    _varMgr = Inject('VarManager')
+    _log = Inject('Logger')
+    _sys = Inject('SystemHelper')
+    _schemaCache = Inject('ProjectSchemaCache')
+
+    def __init__(self):
+        self._data = None
+        self._hasChanges = False
+
+    def _getCachePath(self):
+        return self._varMgr.expandPath('[ProjenyCacheDir]/CsProjFacts.pickle')
+
+    def _getData(self):
+        if self._data == None:
+            data = None
+
+            if self._schemaCache.isEnabled:
+                data = self._sys.tryReadPickleFile(self._getCachePath())
+
+            if data == None or getattr(data, 'version', None) != CsProjFactsCacheVersion:
+                data = CsProjFactsCacheData()
+
+            self._data = data
+
+        return self._data
+
+    def getFacts(self, csProjPath):
+        data = self._getData()
+        stamp = Util.getFileStamp(csProjPath)
+
+        assertThat(stamp != None, "Expected to find file at '{0}'", csProjPath)
+
+        entry = data.entries.get(csProjPath)
+
+        if entry != None and entry[0] == stamp:
+            return entry[1]
+
+        facts = self._parseFacts(csProjPath)
+
+        data.entries[csProjPath] = (stamp, facts)
+        self._hasChanges = True
+
+        return facts
+
+    def _parseFacts(self, csProjPath):
+        self._log.debug("Parsing '{0}'".format(csProjPath))
+
+        analyzer = CsProjAnalyzer(csProjPath)
+
+        projectGuid = analyzer.tryGetProjectGuid()
+
+        if projectGuid != None:
+            match = re.match('^{(.*)}$', projectGuid)
+
+            if match:
+                projectGuid = match.groups()[0]
+
+        return CsProjFacts(analyzer.getAssemblyName(), projectGuid, analyzer.getProjectReferences())
+
+    def saveCache(self):
+        if not self._hasChanges or not self._schemaCache.isEnabled:
+            return
+
+        self._hasChanges = False
+
+        try:
+            self._sys.writePickleFile(self._getCachePath(), self._data)
+        except Exception as e:
+            self._log.warn("Unable to write csproj cache: {0}".format(str(e)))
@@ -0,0 +1,185 @@
+import xml.etree.ElementTree as ET
+
+from mtm.util.Assert import *
+from prj.main.CsProjAnalyzer import NsPrefix
+
+IndentText = '    '
+
+class CsProjElement:
+    """
+    An element that is written into one of the item groups of a CsProjTemplate
+    """
+    def __init__(self, tag, attributes = None, text = None, children = None):
+        self.tag = tag
+        # List of (name, value)
+        self.attributes = attributes or []
+        self.text = text
+        self.children = children or []
+
+class CsProjTemplate:
+    """
+    Writes csproj files from a template without building and re-parsing an xml document for every
+    project.  The template is converted once into fixed chunks of text, with slots for the
+    properties and item groups that differ between projects
+
+    The output is formatted exactly as minidom.toprettyxml would format the template after
+    stripping all whitespace
+    """
+    def __init__(self, path, propertyNames, itemGroupNames):
+        """
+        propertyNames are the names of the elements inside a PropertyGroup whose text is given
+        to render, and itemGroupNames are the names of the items that identify each item group,
+        for eg. 'Compile' for the ItemGroup containing the Compile items.  For both only the first
+        matching element is used
+        """
+        root = ET.parse(path).getroot()
+
+        # Element -> slot name
+        slots = {}
+
+        for name in propertyNames:
+            matches = root.findall('./{0}PropertyGroup/{0}{1}'.format(NsPrefix, name))
+            assertThat(len(matches) > 0, "Could not find property '{0}' in csproj template '{1}'", name, path)
+            slots[matches[0]] = name
+
+        for name in itemGroupNames:
+            matches = root.findall('./{0}ItemGroup[{0}{1}]'.format(NsPrefix, name))
+            assertThat(len(matches) > 0, "Could not find item group for '{0}' in csproj template '{1}'", name, path)
+            slots[matches[0]] = name
+
+        self._itemGroupNames = set(itemGroupNames)
+
+        # List of strings and CsProjSlot
+        self._chunks = []
+        self._pendingText = ['<?xml version="1.0" ?>\n']
+
+        namespace, _ = _splitTag(root.tag)
+        rootAttributes = [('xmlns', namespace)] if namespace else []
+
+        self._addElementChunks(root, '', slots, rootAttributes)
+        self._flushText()
+
+    def _flushText(self):
+        if self._pendingText:
+            self._chunks.append(''.join(self._pendingText))
+            self._pendingText = []
+
+    def _addElementChunks(self, elem, indent, slots, extraAttributes):
+        _, tag = _splitTag(elem.tag)
+
+        slotName = slots.get(elem)
+
+        if slotName != None:
+            self._flushText()
+
+            if slotName in self._itemGroupNames:
+                # Clear the attributes too to match ElementTree.clear()
+                self._chunks.append(CsProjSlot(slotName, indent, indent + '<' + tag, tag))
+            else:
+                self._chunks.append(CsProjSlot(slotName, indent, _getOpenTagText(indent, tag, _getAttributes(elem)), tag))
+            return
+
+        children = [x for x in elem if isinstance(x.tag, str)]
+        text = (elem.text or '').strip()
+
+        self._pendingText.append(_getOpenTagText(indent, tag, extraAttributes + _getAttributes(elem)))
+
+        if not children:
+            if text:
+                self._pendingText.append('>' + _escapeText(text) + '</' + tag + '>\n')
+            else:
+                self._pendingText.append('/>\n')
+            return
+
+        self._pendingText.append('>\n')
+
+        if text:
+            self._pendingText.append(indent + IndentText + _escapeText(text) + '\n')
+
+        for child in children:
+            self._addElementChunks(child, indent + IndentText, slots, [])
+
+        self._pendingText.append(indent + '</' + tag + '>\n')
+
+    def render(self, properties, itemGroups):
+        """
+        properties is a dictionary of property name -> text, and itemGroups is a dictionary of
+        item name -> list of CsProjElement
+
+        Returns the text of the csproj file
+        """
+        out = []
+
+        for chunk in self._chunks:
+            if isinstance(chunk, str):
+                out.append(chunk)
+            elif chunk.name in self._itemGroupNames:
+                _writeElements(out, chunk, itemGroups[chunk.name])
+            else:
+                _writeElement(out, chunk.indent, chunk.openTagText, chunk.tag, properties[chunk.name], [])
+
+        return ''.join(out)
+
+class CsProjSlot:
+    def __init__(self, name, indent, openTagText, tag):
+        self.name = name
+        self.indent = indent
+        # The opening tag without the closing bracket
+        self.openTagText = openTagText
+        self.tag = tag
+
+def _writeElements(out, slot, elements):
+    if not elements:
+        out.append(slot.openTagText + '/>\n')
+        return
+
+    out.append(slot.openTagText + '>\n')
+
+    childIndent = slot.indent + IndentText
+
+    for elem in elements:
+        _writeElement(out, childIndent, _getOpenTagText(childIndent, elem.tag, elem.attributes), elem.tag, elem.text, elem.children)
+
+    out.append(slot.indent + '</' + slot.tag + '>\n')
+
+def _writeElement(out, indent, openTagText, tag, text, children):
+    out.append(openTagText)
+
+    if not children:
+        if text:
+            out.append('>' + _escapeText(text) + '</' + tag + '>\n')
+        else:
+            out.append('/>\n')
+        return
+
+    out.append('>\n')
+
+    childIndent = indent + IndentText
+
+    if text:
+        out.append(childIndent + _escapeText(text) + '\n')
+
+    for child in children:
+        _writeElement(out, childIndent, _getOpenTagText(childIndent, child.tag, child.attributes), child.tag, child.text, child.children)
+
+    out.append(indent + '</' + tag + '>\n')
+
+def _splitTag(tag):
+    if tag.startswith('{'):
+        namespace, _, localName = tag[1:].partition('}')
+        return namespace, localName
+
+    return None, tag
+
+def _getAttributes(elem):
+    return list(elem.attrib.items())
+
+def _getOpenTagText(indent, tag, attributes):
+    return indent + '<' + tag + ''.join(' {0}="{1}"'.format(name, _escapeAttribute(value)) for name, value in attributes)
+
+def _escapeAttribute(value):
+    return value.replace("&", "&amp;").replace("<", "&lt;").replace("\"", "&quot;").replace(">", "&gt;")
+
+def _escapeText(text):
+    # Line endings inside text are normalized when the document is parsed
+    return _escapeAttribute(text.replace('\r\n', '\n').replace('\r', '\n'))
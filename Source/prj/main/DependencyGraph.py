@@ -0,0 +1,180 @@
+import itertools
+
+from mtm.util.Assert import *
+
+_BitFlagTranslation = bytes.maketrans(b'01', b'\x00\x01')
+
+class DependencyGraph:
+    """
+    Directed graph of package dependencies
+
+    Nodes are identified by integer ids internally so that closures can be stored as bitsets
+    (one python int per node) and everything is processed iteratively, which means that
+    very large graphs and very deep dependency chains do not run into the recursion limit
+    """
+    def __init__(self):
+        self._ids = {}
+        self._names = []
+        self._edges = []
+        self._reverseEdges = []
+        self._edgeSet = set()
+
+    @property
+    def nodeCount(self):
+        return len(self._names)
+
+    def addNode(self, name):
+        nodeId = self._ids.get(name)
+
+        if nodeId == None:
+            nodeId = len(self._names)
+            self._ids[name] = nodeId
+            self._names.append(name)
+            self._edges.append([])
+            self._reverseEdges.append([])
+
+        return nodeId
+
+    def addDependency(self, name, dependName):
+        nodeId = self.addNode(name)
+        dependId = self.addNode(dependName)
+
+        if (nodeId, dependId) not in self._edgeSet:
+            self._edgeSet.add((nodeId, dependId))
+            self._edges[nodeId].append(dependId)
+            self._reverseEdges[dependId].append(nodeId)
+
+    def hasNode(self, name):
+        return name in self._ids
+
+    def getId(self, name):
+        return self._ids[name]
+
+    def getName(self, nodeId):
+        return self._names[nodeId]
+
+    def getDependencies(self, name):
+        return [self._names[x] for x in self._edges[self._ids[name]]]
+
+    def getDependents(self, name):
+        return [self._names[x] for x in self._reverseEdges[self._ids[name]]]
+
+    def getTopologicalOrder(self, nodeIds = None):
+        """
+        Returns all node ids ordered so that every node comes after all of its dependencies
+        If nodeIds is given then only those nodes are ordered and edges to other nodes are ignored
+        """
+        if nodeIds == None:
+            nodeIds = range(len(self._names))
+            isIncluded = lambda x: True
+            remainingCounts = {x: len(self._edges[x]) for x in nodeIds}
+        else:
+            nodeIds = set(nodeIds)
+            isIncluded = nodeIds.__contains__
+            remainingCounts = {x: sum(1 for y in self._edges[x] if y in nodeIds) for x in nodeIds}
+
+        ready = [x for x in nodeIds if remainingCounts[x] == 0]
+        result = []
+
+        while ready:
+            nodeId = ready.pop()
+            result.append(nodeId)
+
+            for dependentId in self._reverseEdges[nodeId]:
+                if not isIncluded(dependentId):
+                    continue
+
+                remainingCounts[dependentId] -= 1
+
+                if remainingCounts[dependentId] == 0:
+                    ready.append(dependentId)
+
+        if len(result) != len(remainingCounts):
+            cycle = self._findCycle(set(x for x in nodeIds if remainingCounts[x] > 0))
+            assertThat(False, "Found circular dependency when processing package {0}.  Dependency list: {1}",
+               self._names[cycle[0]], ' -> '.join(self._names[x] for x in cycle))
+
+        return result
+
+    def _findCycle(self, candidates):
+        # Every node that was left over by the topological sort is either part of a cycle or
+        # depends on one, so just keep following edges that stay within the left over nodes until we
+        # revisit a node
+        nodeId = min(candidates)
+        path = []
+        pathIndices = {}
+
+        while nodeId not in pathIndices:
+            pathIndices[nodeId] = len(path)
+            path.append(nodeId)
+            nodeId = next(x for x in self._edges[nodeId] if x in candidates)
+
+        return path[pathIndices[nodeId]:] + [nodeId]
+
+    def calculateClosures(self):
+        """
+        Returns a list of bitsets (indexed by node id) where bit N is set if the node depends
+        on node N either directly or indirectly
+        """
+        closures = [0] * len(self._names)
+
+        for nodeId in self.getTopologicalOrder():
+            closure = 0
+
+            for dependId in self._edges[nodeId]:
+                closure |= closures[dependId] | (1 << dependId)
+
+            closures[nodeId] = closure
+
+        return closures
+
+    def calculateClosuresFor(self, nodeIds, knownClosures):
+        """
+        Same as calculateClosures except only for the given nodes.  Returns a dictionary of node id -> bitset
+
+        knownClosures is a dictionary of node id -> bitset which must contain every node that
+        one of the given nodes depends on directly and that is not itself in nodeIds
+        """
+        closures = dict(knownClosures)
+
+        for nodeId in self.getTopologicalOrder(nodeIds):
+            closure = 0
+
+            for dependId in self._edges[nodeId]:
+                closure |= closures[dependId] | (1 << dependId)
+
+            closures[nodeId] = closure
+
+        return {x: closures[x] for x in nodeIds}
+
+    def getAllDependents(self, names):
+        """
+        Returns the ids of the given nodes plus every node that depends on them directly or indirectly
+        """
+        result = set(self._ids[x] for x in names if x in self._ids)
+        nodesToProcess = list(result)
+
+        while nodesToProcess:
+            nodeId = nodesToProcess.pop()
+
+            for dependentId in self._reverseEdges[nodeId]:
+                if dependentId not in result:
+                    result.add(dependentId)
+                    nodesToProcess.append(dependentId)
+
+        return result
+
+    def namesToBits(self, names):
+        flags = bytearray(b'0') * len(self._names)
+
+        for name in names:
+            flags[self._ids[name]] = ord('1')
+
+        flags.reverse()
+        return int(flags, 2) if flags else 0
+
+    def bitsToNames(self, bits):
+        # Testing one bit at a time is very slow for large graphs, so instead convert the bitset
+        # into one byte per node and let itertools.compress do the filtering
+        flags = format(bits, 'b')[::-1].encode('ascii').translate(_BitFlagTranslation)
+        return list(itertools.compress(self._names, flags))
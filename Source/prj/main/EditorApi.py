@@ -24,6 +24,7 @@ class Runner:
     _releaseSourceManager = Inject('ReleaseSourceManager')
     _sys = Inject('SystemHelper')
     _varMgr = Inject('VarManager')
+    _schemaCache = Inject('ProjectSchemaCache')
 
     def run(self, project, platform, requestId, param1, param2, param3):
         self._log.debug("Started EditorApi with arguments: {0}".format(" ".join(sys.argv[1:])))
@@ -68,7 +69,7 @@ def _runInternal(self):
             isInit = self._packageMgr.isProjectPlatformInitialized(self._project, self._platform)
             self._packageMgr.updateProjectJunctions(self._project, self._platform)
             if not isInit:
-                self._packageMgr.updateLinksForAllProjects()
+                self._packageMgr.refreshProjectSwitchMenus()
         
         elif self._requestId == 'openUnity':
             self._packageMgr.checkProjectInitialized(self._project, self._platform)
@@ -119,6 +120,9 @@ def _runInternal(self):
         else:
             assertThat(False, "Invalid request id '{0}'", self._requestId)
 
+        self._schemaCache.logStats()
+        self._sys.logWriteStats()
+
 def installBindings(configPath):
     Container.bind('LogStream').toSingle(LogStreamConsoleHeadingsOnly)
     Container.bind('LogStream').toSingle(LogStreamFile)
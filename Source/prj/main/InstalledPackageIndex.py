@@ -0,0 +1,103 @@
+import os
+import hashlib
+
+import mtm.util.Util as Util
+from mtm.ioc.Inject import Inject
+import mtm.util.YamlSerializer as YamlSerializer
+
+from mtm.util.Assert import *
+from prj.main.ProjenyConstants import InstallInfoFileName
+
+# Increment this whenever the format of the index changes
+InstalledPackageIndexVersion = 1
+
+class InstalledPackageEntry:
+    def __init__(self, installFileStamp, installInfo):
+        # (size, mtime) of the install info file, or None if the package has none
+        self.installFileStamp = installFileStamp
+        self.installInfo = installInfo
+
+class InstalledPackageIndexData:
+    def __init__(self, folderPath):
+        self.version = InstalledPackageIndexVersion
+        self.folderPath = folderPath
+        # Package name -> InstalledPackageEntry
+        self.packages = {}
+
+class InstalledPackageIndex:
+    """
+    Stores the install info of every package in a package folder in one file per package folder,
+    so that listing the installed packages does not need to deserialize every ProjenyInstall.yaml
+
+    Each entry is validated against the size and modification time of its ProjenyInstall.yaml
+    (rather than the package directory, which does not change when the file is edited in place),
+    so only the install files that were added or changed since the last query are read again
+    """
+    _varMgr = Inject('VarManager')
+    _log = Inject('Logger')
+    _sys = Inject('SystemHelper')
+
+    def _getIndexPath(self, folderRealPath):
+        folderHash = hashlib.sha1(os.path.normcase(folderRealPath).encode('utf-8')).hexdigest()
+        return self._varMgr.expandPath('[ProjenyCacheDir]/InstalledPackages/{0}.pickle'.format(folderHash))
+
+    def _loadIndex(self, folderRealPath):
+        index = self._sys.tryReadPickleFile(self._getIndexPath(folderRealPath))
+
+        if index == None or getattr(index, 'version', None) != InstalledPackageIndexVersion or index.folderPath != folderRealPath:
+            index = InstalledPackageIndexData(folderRealPath)
+
+        return index
+
+    def _saveIndex(self, index):
+        try:
+            self._sys.writePickleFile(self._getIndexPath(index.folderPath), index)
+        except Exception as e:
+            self._log.warn("Unable to write installed package index: {0}".format(str(e)))
+
+    def getInstallInfos(self, folder):
+        """
+        Returns a dictionary of package name -> PackageInstallInfo for every package in the given
+        IndexedPackageFolder that has a ProjenyInstall.yaml
+        """
+        index = self._loadIndex(folder.realPath)
+
+        hasChanges = False
+
+        newPackages = {}
+
+        for packageName in folder.packageNames:
+            installFilePath = os.path.join(folder.realPath, packageName, InstallInfoFileName)
+            installFileStamp = Util.getFileStamp(installFilePath)
+
+            entry = index.packages.get(packageName)
+
+            if entry == None or entry.installFileStamp != installFileStamp:
+                installInfo = None
+
+                if installFileStamp != None:
+                    installInfo = YamlSerializer.deserialize(self._sys.readFileAsText(installFilePath))
+
+                entry = InstalledPackageEntry(installFileStamp, installInfo)
+                hasChanges = True
+
+            newPackages[packageName] = entry
+
+        if hasChanges or len(newPackages) != len(index.packages):
+            index.packages = newPackages
+            self._saveIndex(index)
+
+        return {name: entry.installInfo for name, entry in newPackages.items() if entry.installInfo != None}
+
+    def updatePackage(self, folderPath, packageName, installInfo):
+        """
+        Records the install info of a package that was just installed, after its ProjenyInstall.yaml was written
+        """
+        folderRealPath = self._varMgr.expandPath(folderPath)
+
+        index = self._loadIndex(folderRealPath)
+
+        installFilePath = os.path.join(folderRealPath, packageName, InstallInfoFileName)
+        index.packages[packageName] = InstalledPackageEntry(Util.getFileStamp(installFilePath), installInfo)
+
+        self._saveIndex(index)
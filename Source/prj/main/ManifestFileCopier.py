@@ -0,0 +1,123 @@
+import os
+import hashlib
+
+import mtm.util.Util as Util
+from mtm.ioc.Inject import Inject
+from mtm.util.Assert import *
+
+# Increment this whenever the format of the manifest changes
+CopyManifestVersion = 1
+
+class CopiedFileInfo:
+    def __init__(self, sourceStamp, sourceHash, destStamp):
+        self.sourceStamp = sourceStamp
+        self.sourceHash = sourceHash
+        self.destStamp = destStamp
+
+    def __eq__(self, other):
+        return isinstance(other, CopiedFileInfo) and \
+            (self.sourceStamp, self.sourceHash, self.destStamp) == (other.sourceStamp, other.sourceHash, other.destStamp)
+
+class CopyManifest:
+    def __init__(self):
+        self.version = CopyManifestVersion
+        # Destination path -> CopiedFileInfo
+        self.files = {}
+
+class ManifestFileCopier:
+    """
+    Copies files into a unity project while only touching the files whose contents actually changed
+
+    Every copy is recorded in a manifest together with the hash of the source file, so a source
+    file is only re-copied when its hash differs from the copied version.  Re-writing a DLL
+    (even with identical contents) makes unity re-import it, which is slow
+    """
+    _varMgr = Inject('VarManager')
+    _log = Inject('Logger')
+    _sys = Inject('SystemHelper')
+
+    def copyFiles(self, fileMap, manifestPath):
+        """
+        fileMap is a dictionary of destination path -> source path.  Files that were copied by a
+        previous call with the same manifest but that are no longer in fileMap are removed
+
+        Returns the number of files that were copied
+        """
+        manifestPath = self._varMgr.expandPath(manifestPath)
+
+        manifest = self._sys.tryReadPickleFile(manifestPath)
+
+        if manifest == None or getattr(manifest, 'version', None) != CopyManifestVersion:
+            manifest = CopyManifest()
+
+        newFiles = {}
+        numCopied = 0
+        hasChanges = False
+
+        for destPath, sourcePath in fileMap.items():
+            destPath = self._varMgr.expandPath(destPath)
+            sourcePath = self._varMgr.expandPath(sourcePath)
+
+            oldInfo = manifest.files.get(destPath)
+            sourceStamp = Util.getFileStamp(sourcePath)
+
+            assertThat(sourceStamp != None, "Could not find file '{0}'", sourcePath)
+
+            if oldInfo != None and oldInfo.sourceStamp == sourceStamp:
+                sourceHash = oldInfo.sourceHash
+            else:
+                sourceHash = _getFileHash(sourcePath)
+
+            if oldInfo != None and oldInfo.sourceHash == sourceHash and oldInfo.destStamp == Util.getFileStamp(destPath):
+                newInfo = CopiedFileInfo(sourceStamp, sourceHash, oldInfo.destStamp)
+            else:
+                self._sys.copyFile(sourcePath, destPath)
+                numCopied += 1
+
+                newInfo = CopiedFileInfo(sourceStamp, sourceHash, Util.getFileStamp(destPath))
+
+            # Also save the manifest when only the source stamp changed (for eg. after a rebuild
+            # with identical contents) so that the file is not hashed again next time
+            if newInfo != oldInfo:
+                hasChanges = True
+
+            newFiles[destPath] = newInfo
+
+        for destPath in manifest.files:
+            if destPath not in newFiles and self._sys.removeFileIfExists(destPath):
+                self._log.debug("Removed file '{0}' since it is no longer needed".format(destPath))
+
+        if hasChanges or len(newFiles) != len(manifest.files):
+            manifest.files = newFiles
+            self._sys.writePickleFile(manifestPath, manifest)
+
+        self._sys.addWriteStats(numCopied, len(newFiles) - numCopied)
+
+        self._log.debug('Copied {0} of {1} files'.format(numCopied, len(newFiles)))
+        return numCopied
+
+    def getDirectoryFileMap(self, sourceDir, destDir):
+        """
+        Returns a file map that can be passed to copyFiles to copy the contents of the given directory
+        """
+        sourceDir = self._varMgr.expandPath(sourceDir)
+        destDir = self._varMgr.expandPath(destDir)
+
+        result = {}
+
+        for root, dirs, files in os.walk(sourceDir):
+            relDir = os.path.relpath(root, sourceDir)
+
+            for fileName in files:
+                result[os.path.normpath(os.path.join(destDir, relDir, fileName))] = os.path.join(root, fileName)
+
+        return result
+
+def _getFileHash(path):
+    hasher = hashlib.sha1()
+
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(chunk)
+
+    return hasher.hexdigest()
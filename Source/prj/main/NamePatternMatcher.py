@@ -0,0 +1,93 @@
+import re
+
+from mtm.util.Assert import *
+
+# Numbered or named backreferences would refer to the wrong group once the patterns are combined
+BackReferencePattern = re.compile(r'\\[1-9]|\(\?P=')
+
+class NamePatternMatcher:
+    """
+    Matches names against a list of patterns as used in SolutionProjects and SolutionFolders,
+    where each pattern is either an exact name or a regex prefixed with '/'
+
+    All exact names are put in a dictionary and all regexes are combined into one, so matching
+    a name costs the same regardless of how many patterns there are.  When multiple patterns
+    match, the one that is listed first wins
+    """
+    def __init__(self, patterns, sourceDesc):
+        self._exactIndices = {}
+        self._regexes = []
+        self._combinedRegex = None
+        self._results = {}
+
+        regexParts = []
+
+        for i, pattern in enumerate(patterns):
+            if pattern.startswith('/'):
+                regexText = pattern[1:]
+
+                try:
+                    regex = re.compile(regexText)
+                except Exception as e:
+                    raise Exception("Failed while parsing regex '{0}' from {1}.  Details: {2}".format(pattern, sourceDesc, str(e)))
+
+                self._regexes.append((i, regex))
+                regexParts.append((i, regexText))
+            elif pattern not in self._exactIndices:
+                self._exactIndices[pattern] = i
+
+        self._combinedRegex = self._tryCombine(regexParts)
+
+    def _tryCombine(self, regexParts):
+        if len(regexParts) < 2:
+            return None
+
+        if any(BackReferencePattern.search(x[1]) for x in regexParts):
+            return None
+
+        try:
+            # Alternatives are tried in order, so the name of the outer group that matched
+            # is always the first pattern in the list that matches
+            return re.compile('|'.join('(?P<_pattern{0}>{1})'.format(i, text) for i, text in regexParts))
+        except Exception:
+            # For eg. inline flags are only allowed at the start of the expression, so just
+            # match the regexes one at a time instead
+            return None
+
+    def tryGetMatchIndex(self, name):
+        """
+        Returns the index of the first pattern that matches the given name, or None
+        """
+        if name in self._results:
+            return self._results[name]
+
+        result = self._exactIndices.get(name)
+        regexIndex = self._tryGetRegexMatchIndex(name, result)
+
+        if regexIndex != None:
+            result = regexIndex
+
+        self._results[name] = result
+        return result
+
+    def _tryGetRegexMatchIndex(self, name, maxIndex):
+        if self._combinedRegex != None:
+            match = self._combinedRegex.match(name)
+
+            if match == None:
+                return None
+
+            index = int(match.lastgroup[len('_pattern'):])
+        else:
+            index = next((i for i, regex in self._regexes if regex.match(name)), None)
+
+            if index == None:
+                return None
+
+        if maxIndex != None and index > maxIndex:
+            return None
+
+        return index
+
+    def matches(self, name):
+        return self.tryGetMatchIndex(name) != None
@@ -0,0 +1,61 @@
+import os
+
+class PackageFolderIndex:
+    """
+    Maps package names to package directories using a single directory listing per package folder,
+    instead of probing every package folder separately for every package
+
+    When the same package name exists in multiple package folders, the folder that is listed first wins
+    """
+    def __init__(self, packageFolders):
+        # packageFolders is a list of (path as given in config, expanded path) pairs
+        self.folders = []
+        self._packageDirs = {}
+
+        for folderPath, expandedFolderPath in packageFolders:
+            folder = IndexedPackageFolder(folderPath, expandedFolderPath)
+            self.folders.append(folder)
+
+            for packageName in folder.packageNames:
+                key = os.path.normcase(packageName)
+
+                if key not in self._packageDirs:
+                    self._packageDirs[key] = folder.getPackageDir(packageName)
+
+    def tryGetPackageDir(self, packageName):
+        return self._packageDirs.get(os.path.normcase(packageName))
+
+    def getAllPackageNames(self):
+        result = []
+
+        for folder in self.folders:
+            result += folder.packageNames
+
+        return result
+
+class IndexedPackageFolder:
+    def __init__(self, path, expandedPath):
+        self.path = path
+        self.expandedPath = expandedPath
+        self.realPath = os.path.realpath(expandedPath)
+        self.exists = os.path.isdir(expandedPath)
+        self.packageNames = []
+        self._linkedPackageNames = set()
+
+        if self.exists:
+            with os.scandir(expandedPath) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        self.packageNames.append(entry.name)
+
+                        if entry.is_symlink():
+                            self._linkedPackageNames.add(entry.name)
+
+    def getPackageDir(self, packageName):
+        packageDir = os.path.join(self.realPath, packageName)
+
+        # Only linked package directories need to be resolved, everything else is already a real path
+        if packageName in self._linkedPackageNames:
+            return os.path.realpath(packageDir)
+
+        return packageDir
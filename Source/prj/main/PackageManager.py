@@ -7,10 +7,11 @@
 import mtm.util.JunctionUtil as JunctionUtil
 import mtm.util.Util as Util
 
-from prj.main.ProjectSchemaLoader import FolderTypes
+from prj.main.ProjectSchemaLoader import FolderTypes, PackageOutputDirVars
 from mtm.util.Platforms import Platforms
 
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 
 from mtm.util.CommonSettings import ConfigFileName
 import mtm.util.MiscUtil as MiscUtil
@@ -20,15 +21,13 @@
 from prj.reg.PackageInfo import PackageInfo, PackageFolderInfo, PackageInstallInfo
 
 from datetime import datetime
-import mtm.util.YamlSerializer as YamlSerializer
+from collections import OrderedDict
 import mtm.ioc.Container as Container
 from mtm.ioc.Inject import Inject
 from mtm.ioc.Inject import InjectMany
 import mtm.ioc.IocAssertions as Assertions
 import prj.main.ProjectConfigChanger as ProjectConfigChanger
 
-InstallInfoFileName = 'ProjenyInstall.yaml'
-
 from prj.main.ProjenyConstants import ProjectConfigFileName
 
 class SourceControlTypes:
@@ -52,6 +51,8 @@ class PackageManager:
     _commonSettings = Inject('CommonSettings')
     _projectConfigChanger = Inject('ProjectConfigChanger')
     _unityEditorMenuGenerator = Inject('UnityEditorMenuGenerator')
+    _fileCopier = Inject('ManifestFileCopier')
+    _installedPackageIndex = Inject('InstalledPackageIndex')
 
     def projectExists(self, projectName):
         return self._sys.directoryExists('[UnityProjectsDir]/{0}'.format(projectName))
@@ -121,7 +122,7 @@ def createProject(self, projName, platform = Platforms.Windows, settingsProject
 """.format(settingsPath, unityPackagesPath))
 
             self.updateProjectJunctions(projName, platform)
-            self.updateLinksForAllProjects()
+            self.refreshProjectSwitchMenus()
 
     def getProjectFromAlias(self, alias):
         result = self.tryGetProjectFromAlias(alias)
@@ -149,9 +150,10 @@ def _validateDirForFolderType(self, packageInfo, sourceDir):
         if packageInfo.folderType == FolderTypes.AndroidProject:
             assertThat(os.path.exists(os.path.join(sourceDir, "project.properties")), "Project '{0}' is marked with foldertype AndroidProject and therefore must contain a project.properties file".format(packageInfo.name))
 
-    def updateProjectJunctions(self, projectName, platform):
+    def updateProjectJunctions(self, projectName, platform, schema = None, checkVersionControl = True):
         """
         Initialize all the folder links for the given project
+        The schema is loaded here unless it is given
         """
 
         with self._log.heading('Updating package directories for project {0}'.format(projectName)):
@@ -161,10 +163,13 @@ def updateProjectJunctions(self, projectName, platform):
             if platform not in projConfig.targetPlatforms:
                 projConfig.targetPlatforms.append(platform)
                 self._projectConfigChanger._saveProjectConfig(projectName, projConfig)
-            schema = self._schemaLoader.loadSchema(projectName, platform)
+            if schema == None:
+                schema = self._schemaLoader.loadSchema(projectName, platform)
+
             self._updateDirLinksForSchema(schema)
 
-            self._checkForVersionControlIgnore()
+            if checkVersionControl:
+                self._checkForVersionControlIgnore()
 
             self._log.good('Finished updating packages for project "{0}"'.format(schema.name))
 
@@ -190,26 +195,19 @@ def getAllPackageFolderInfos(self, projectName):
 
         self.setPathsForProject(projectName)
         projConfig = self._schemaLoader.loadProjectConfig(projectName)
+        folderIndex = self._schemaLoader.createPackageFolderIndex(projConfig)
 
-        for packageFolder in projConfig.packageFolders:
+        for folder in folderIndex.folders:
             folderInfo = PackageFolderInfo()
-            folderInfo.path = packageFolder
-
-            if self._sys.directoryExists(packageFolder):
-                for packageName in self._sys.walkDir(packageFolder):
-                    packageDirPath = os.path.join(packageFolder, packageName)
-
-                    if not self._sys.IsDir(packageDirPath):
-                        continue
+            folderInfo.path = folder.path
 
-                    installInfoFilePath = os.path.join(packageDirPath, InstallInfoFileName)
+            if folder.exists:
+                installInfos = self._installedPackageIndex.getInstallInfos(folder)
 
+                for packageName in folder.packageNames:
                     packageInfo = PackageInfo()
                     packageInfo.name = packageName
-
-                    if self._sys.fileExists(installInfoFilePath):
-                        installInfo = YamlSerializer.deserialize(self._sys.readFileAsText(installInfoFilePath))
-                        packageInfo.installInfo = installInfo
+                    packageInfo.installInfo = installInfos.get(packageName)
 
                     folderInfo.packages.append(packageInfo)
 
@@ -226,22 +224,13 @@ def deleteProject(self, projName):
 
             self.clearProjectGeneratedFiles(projName)
             self._sys.deleteDirectory(fullPath)
-            self.updateLinksForAllProjects()
+            self.refreshProjectSwitchMenus()
 
     def getAllPackageNames(self, projectName):
-        results = []
         self.setPathsForProject(projectName)
         projConfig = self._schemaLoader.loadProjectConfig(projectName)
 
-        for packageFolder in projConfig.packageFolders:
-            if not self._sys.directoryExists(packageFolder):
-                continue
-
-            for name in self._sys.walkDir(packageFolder):
-                if self._sys.IsDir(os.path.join(packageFolder, name)):
-                    results.append(name)
-
-        return results
+        return self._schemaLoader.createPackageFolderIndex(projConfig).getAllPackageNames()
 
     def getAllProjectNames(self):
         assertThat(self._varMgr.hasKey('UnityProjectsDir'), "Could not find 'UnityProjectsDir' in PathVars.  Have you set up your {0} file?", ConfigFileName)
@@ -253,7 +242,19 @@ def getAllProjectNames(self):
         return results
 
     # This will set up all the directory junctions for all projects for all platforms
-    def updateLinksForAllProjects(self):
+    def updateLinksForAllProjects(self, workerCount = None):
+        """
+        When workerCount is more than one, the project-platforms are updated at the same time on
+        that many threads.  Defaults to ProjectInit: Workers
+        """
+        if workerCount == None:
+            workerCount = self._config.tryGetInt(1, 'ProjectInit', 'Workers')
+
+        tasks = []
+        failures = []
+
+        # The schemas are loaded up front on this thread, so that the worker threads only need
+        # to touch the project directories
         for projectName in self.getAllProjectNames():
 
             try:
@@ -262,58 +263,162 @@ def updateLinksForAllProjects(self):
                 self._log.warn('Could not load project config for "{0}"'.format(projectName))
                 continue
 
-            with self._log.heading('Initializing project "{0}"'.format(projectName)):
-                try:
-                    #for platform in Platforms.All:
-                    for platform in projConfig.targetPlatforms:
-                        self.updateProjectJunctions(projectName, platform)
+            try:
+                # Load the schemas for all platforms together so that each package is only read once
+                self.setPathsForProject(projectName)
+                schemas = self._schemaLoader.loadSchemas(projectName, projConfig.targetPlatforms)
 
-                    self._log.good('Successfully initialized project "{0}"'.format(projectName))
-                except Exception as e:
-                    self._log.warn('Failed to initialize project "{0}": {1}'.format(projectName, e))
+                # The ignore files are shared by all platforms of the project, so they are only
+                # checked here, rather than at the same time by every platform
+                self._checkForVersionControlIgnore()
+            except Exception as e:
+                self._log.warn('Failed to initialize project "{0}": {1}'.format(projectName, e))
+                failures.append((projectName, None, e))
+                continue
+
+            #for platform in Platforms.All:
+            for platform in projConfig.targetPlatforms:
+                tasks.append((projectName, platform, schemas[platform]))
+
+        # Initializing a new project-platform loads its schema again, which must happen on this thread
+        newTasks = []
+        otherTasks = []
+
+        for task in tasks:
+            if self.isProjectPlatformInitialized(task[0], task[1]):
+                otherTasks.append(task)
+            else:
+                newTasks.append(task)
+
+        results = [self._tryUpdateProjectJunctions(x) for x in newTasks]
+
+        workerCount = min(workerCount, len(otherTasks))
+
+        if workerCount > 1:
+            numHeadings = self._log.getCurrentNumHeadings()
+
+            with ThreadPoolExecutor(max_workers = workerCount) as executor:
+                results += list(executor.map(lambda x: self._tryUpdateProjectJunctions(x, numHeadings), otherTasks))
+        else:
+            results += [self._tryUpdateProjectJunctions(x) for x in otherTasks]
+
+        # Projects that failed before they were split into platforms count as one failure
+        numTotal = len(tasks) + len(failures)
+
+        failures += [x for x in results if x != None]
+
+        if failures:
+            self._log.warn('Initialized {0} of {1} project-platforms.  Failures:', numTotal - len(failures), numTotal)
+
+            for projectName, platform, e in failures:
+                self._log.warn('  {0}: {1}'.format(projectName if platform == None else '{0}-{1}'.format(projectName, platform), e))
+        else:
+            self._log.good('Successfully initialized {0} project-platforms', numTotal)
+
+    def _tryUpdateProjectJunctions(self, task, numHeadings = None):
+        """
+        Returns (project name, platform, exception) if the update failed, otherwise None
+        """
+        projectName, platform, schema = task
+
+        if numHeadings != None:
+            self._log.setBaseNumHeadings(numHeadings)
+
+        # Path variables such as [ProjectRoot] are set separately for every task
+        with self._varMgr.activate(self.getProjectPlatformContext(projectName, platform)):
+            try:
+                self.updateProjectJunctions(projectName, platform, schema, False)
+            except Exception as e:
+                self._log.warn('Failed to initialize project "{0}" for platform "{1}": {2}'.format(projectName, platform, e))
+                return (projectName, platform, e)
+
+        return None
+
+    # The change project menu lists every project-platform, so it needs to be refreshed in every
+    # project whenever a project is added or removed, but none of the package links do
+    def refreshProjectSwitchMenus(self):
+        projectNames = self.getAllProjectNames()
+        projectPlatforms = self._unityEditorMenuGenerator.getProjectPlatforms(projectNames)
+
+        numChanged = 0
+        numTotal = 0
+
+        for projectName, platform in projectPlatforms:
+            with self._varMgr.activate(self.getProjectPlatformContext(projectName, platform)):
+                if not self._sys.directoryExists('[ProjectPlatformRoot]'):
+                    continue
+
+                numTotal += 1
+
+                if self._unityEditorMenuGenerator.Generate(
+                        projectName, platform, self._getSwitchProjectMenuPath(), projectNames, projectPlatforms):
+                    numChanged += 1
+
+        self._log.info('Updated the change project menu in {0} of {1} project-platforms', numChanged, numTotal)
+
+    def _getGeneratedProjenyFilesDir(self):
+        if self._config.tryGetBool(False, 'DoNotIncludeProjenyInUnityProject'):
+            return '[PluginsDir]/ProjenyGenerated'
+
+        return '[PluginsDir]/Projeny'
+
+    def _getSwitchProjectMenuPath(self):
+        return self._getGeneratedProjenyFilesDir() + '/Editor/ProjenyChangeProjectMenu.cs'
 
     def _createSwitchProjectMenuScript(self, currentProjName, currentPlatform, outputPath):
         projectNames = self.getAllProjectNames()
         self._unityEditorMenuGenerator.Generate(currentProjName, currentPlatform, outputPath, projectNames)
 
-    def _addGeneratedProjenyFiles(self, outDir, schema):
+    def _addGeneratedProjenyFiles(self, outDir, schema, fileMap):
         menuFileOutPath = outDir + '/Editor/ProjenyChangeProjectMenu.cs'
         placeholderOutPath1 = outDir + '/Placeholder.cs'
         placeholderOutPath2 = outDir + '/Editor/Placeholder.cs'
 
         # Need to always use the same meta files to avoid having unity do a refresh
         self._createSwitchProjectMenuScript(schema.name, schema.platform, menuFileOutPath)
-        self._sys.copyFile('[ProjenyChangeProjectMenuMeta]', menuFileOutPath + ".meta")
+        fileMap[menuFileOutPath + ".meta"] = '[ProjenyChangeProjectMenuMeta]'
 
-        self._sys.copyFile('[PlaceholderFile1]', placeholderOutPath1)
-        self._sys.copyFile('[PlaceholderFile1].meta', placeholderOutPath1 + ".meta")
+        fileMap[placeholderOutPath1] = '[PlaceholderFile1]'
+        fileMap[placeholderOutPath1 + ".meta"] = '[PlaceholderFile1].meta'
 
-        self._sys.copyFile('[PlaceholderFile2]', placeholderOutPath2)
-        self._sys.copyFile('[PlaceholderFile2].meta', placeholderOutPath2 + ".meta")
+        fileMap[placeholderOutPath2] = '[PlaceholderFile2]'
+        fileMap[placeholderOutPath2 + ".meta"] = '[PlaceholderFile2].meta'
 
     def _updateDirLinksForSchema(self, schema):
-        self._removeProjectPlatformJunctions()
-
-        self._sys.deleteDirectoryIfExists('[PluginsDir]/Projeny')
+        # Destination path -> source path for all the files that we copy into the project
+        fileMap = {}
 
         # Define DoNotIncludeProjenyInUnityProject only if you want to include Projeny as just another prebuilt package
         # This is nice because then you can call methods on projeny from another package
         if self._config.tryGetBool(False, 'DoNotIncludeProjenyInUnityProject'):
-            self._addGeneratedProjenyFiles('[PluginsDir]/ProjenyGenerated', schema)
+            self._sys.deleteDirectoryIfExists('[PluginsDir]/Projeny')
+            self._addGeneratedProjenyFiles(self._getGeneratedProjenyFilesDir(), schema, fileMap)
         else:
             dllOutPath = '[PluginsDir]/Projeny/Editor/Projeny.dll'
 
-            self._sys.copyFile('[ProjenyUnityEditorDllPath]', dllOutPath)
-            self._sys.copyFile('[ProjenyUnityEditorDllMetaFilePath]', dllOutPath + '.meta')
+            fileMap[dllOutPath] = '[ProjenyUnityEditorDllPath]'
+            fileMap[dllOutPath + '.meta'] = '[ProjenyUnityEditorDllMetaFilePath]'
 
-            self._sys.copyFile('[YamlDotNetDllPath]', '[PluginsDir]/Projeny/Editor/YamlDotNet.dll')
+            fileMap['[PluginsDir]/Projeny/Editor/YamlDotNet.dll'] = '[YamlDotNetDllPath]'
 
-            self._sys.copyDirectory('[ProjenyUnityEditorAssetsDirPath]', '[PluginsDir]/Projeny/Editor/Assets')
+            fileMap.update(self._fileCopier.getDirectoryFileMap('[ProjenyUnityEditorAssetsDirPath]', '[PluginsDir]/Projeny/Editor/Assets'))
 
-            self._addGeneratedProjenyFiles('[PluginsDir]/Projeny', schema)
+            self._addGeneratedProjenyFiles(self._getGeneratedProjenyFilesDir(), schema, fileMap)
 
-        self._junctionHelper.makeJunction(schema.projectSettingsPath, '[ProjectPlatformRoot]/ProjectSettings')
-        self._junctionHelper.makeJunction(schema.unityPackagesPath, '[ProjectPlatformRoot]/Packages')
+        # Only copy the files that changed since the last update, so that unity does not re-import
+        # the projeny DLLs every time the links are updated
+        numCopied = self._fileCopier.copyFiles(fileMap, '[ProjenyCacheDir]/CopiedFiles/[ProjectName]-[ShortPlatform].pickle')
+
+        if numCopied > 0:
+            self._log.info('Copied {0} projeny files into the project', numCopied)
+
+        self._updatePackageLinks(schema)
+
+    def _updatePackageLinks(self, schema):
+        desiredLinks = {
+            '[ProjectPlatformRoot]/ProjectSettings': schema.projectSettingsPath,
+            '[ProjectPlatformRoot]/Packages': schema.unityPackagesPath,
+        }
 
         for packageInfo in schema.packages.values():
 
@@ -326,11 +431,17 @@ def _updateDirLinksForSchema(self, schema):
 
             outputPackageDir = self._varMgr.expandPath(packageInfo.outputDirVar)
 
-            linkDir = os.path.join(outputPackageDir, packageInfo.name)
+            desiredLinks[os.path.join(outputPackageDir, packageInfo.name)] = packageInfo.dirPath
 
-            assertThat(not os.path.exists(linkDir), "Did not expect this path to exist: '{0}'".format(linkDir))
+        # Only change the links that differ, so that Unity does not see every package disappear and
+        # re-appear (and then re-import everything) when nothing changed
+        changes = self._junctionHelper.reconcileJunctions(desiredLinks, ['[ProjectPlatformRoot]'] + PackageOutputDirVars)
 
-            self._junctionHelper.makeJunction(packageInfo.dirPath, linkDir)
+        if changes.hasChanges:
+            self._log.info('Updated package links: {0} added, {1} removed, {2} re-targeted, {3} unchanged',
+                len(changes.added), len(changes.removed), len(changes.retargeted), changes.unchangedCount)
+        else:
+            self._log.info('Package links are already up to date ({0} links)', changes.unchangedCount)
 
     def checkProjectInitialized(self, projectName, platform):
         self.setPathsForProjectPlatform(projectName, platform)
@@ -346,42 +457,60 @@ def isProjectPlatformInitialized(self, projectName, platform):
         return self._sys.directoryExists('[ProjectPlatformRoot]')
 
     def setPathsForProject(self, projectName):
-        self._varMgr.set('ShortProjectName', self._commonSettings.getShortProjectName(projectName))
-        self._varMgr.set('ProjectName', projectName)
-        self._varMgr.set('ProjectRoot', '[UnityProjectsDir]/[ProjectName]')
+        for key, value in self._getProjectVars(projectName).items():
+            self._varMgr.set(key, value)
 
     def setPathsForProjectPlatform(self, projectName, platform):
+        for key, value in self._getProjectPlatformVars(projectName, platform).items():
+            self._varMgr.set(key, value)
 
-        self.setPathsForProject(projectName)
+    def getProjectPlatformContext(self, projectName, platform):
+        """
+        Returns a VarContext with the same path variables that setPathsForProjectPlatform sets,
+        without changing the shared variables
+        """
+        return self._varMgr.withOverrides(self._getProjectPlatformVars(projectName, platform))
+
+    def _getProjectVars(self, projectName):
+        result = OrderedDict()
+        result['ShortProjectName'] = self._commonSettings.getShortProjectName(projectName)
+        result['ProjectName'] = projectName
+        result['ProjectRoot'] = '[UnityProjectsDir]/[ProjectName]'
+        return result
+
+    def _getProjectPlatformVars(self, projectName, platform):
+        result = self._getProjectVars(projectName)
 
-        self._varMgr.set('ShortPlatform', PlatformUtil.toPlatformFolderName(platform))
+        result['ShortPlatform'] = PlatformUtil.toPlatformFolderName(platform)
 
-        self._varMgr.set('Platform', platform)
+        result['Platform'] = platform
 
-        self._varMgr.set('ProjectPlatformRoot', '[ProjectRoot]/[ShortProjectName]-[ShortPlatform]')
-        self._varMgr.set('ProjectAssetsDir', '[ProjectPlatformRoot]/Assets')
+        result['ProjectPlatformRoot'] = '[ProjectRoot]/[ShortProjectName]-[ShortPlatform]'
+        result['ProjectAssetsDir'] = '[ProjectPlatformRoot]/Assets'
 
         # For reasons I don't understand, the unity generated project is named with 'Assembly' on some machines and not other
         # Problem due to unity version but for now just allow either or
-        self._varMgr.set('UnityGeneratedProjectEditorPath', '[ProjectPlatformRoot]/[ShortProjectName]-[ShortPlatform].CSharp.Editor.Plugins.csproj')
-        self._varMgr.set('UnityGeneratedProjectEditorPath2', '[ProjectPlatformRoot]/Assembly-CSharp-Editor-firstpass.csproj')
-        self._varMgr.set('UnityGeneratedProjectEditorPath3', '[ProjectPlatformRoot]/[ProjectName]-[Platform].Editor.Plugins.csproj')
+        result['UnityGeneratedProjectEditorPath'] = '[ProjectPlatformRoot]/[ShortProjectName]-[ShortPlatform].CSharp.Editor.Plugins.csproj'
+        result['UnityGeneratedProjectEditorPath2'] = '[ProjectPlatformRoot]/Assembly-CSharp-Editor-firstpass.csproj'
+        result['UnityGeneratedProjectEditorPath3'] = '[ProjectPlatformRoot]/[ProjectName]-[Platform].Editor.Plugins.csproj'
 
-        self._varMgr.set('UnityGeneratedProjectPath', '[ProjectPlatformRoot]/[ShortProjectName]-[ShortPlatform].CSharp.Plugins.csproj')
-        self._varMgr.set('UnityGeneratedProjectPath2', '[ProjectPlatformRoot]/Assembly-CSharp-firstpass.csproj')
-        self._varMgr.set('UnityGeneratedProjectPath3', '[ProjectPlatformRoot]/[ProjectName]-[Platform].Plugins.csproj')
+        result['UnityGeneratedProjectPath'] = '[ProjectPlatformRoot]/[ShortProjectName]-[ShortPlatform].CSharp.Plugins.csproj'
+        result['UnityGeneratedProjectPath2'] = '[ProjectPlatformRoot]/Assembly-CSharp-firstpass.csproj'
+        result['UnityGeneratedProjectPath3'] = '[ProjectPlatformRoot]/[ProjectName]-[Platform].Plugins.csproj'
 
-        self._varMgr.set('PluginsDir', '[ProjectAssetsDir]/Plugins')
-        self._varMgr.set('PluginsAndroidDir', '[PluginsDir]/Android')
-        self._varMgr.set('PluginsAndroidLibraryDir', '[PluginsDir]/Android/libs')
-        self._varMgr.set('PluginsIosLibraryDir', '[PluginsDir]/iOS')
-        self._varMgr.set('PluginsWebGlLibraryDir', '[PluginsDir]/WebGL')
+        result['PluginsDir'] = '[ProjectAssetsDir]/Plugins'
+        result['PluginsAndroidDir'] = '[PluginsDir]/Android'
+        result['PluginsAndroidLibraryDir'] = '[PluginsDir]/Android/libs'
+        result['PluginsIosLibraryDir'] = '[PluginsDir]/iOS'
+        result['PluginsWebGlLibraryDir'] = '[PluginsDir]/WebGL'
 
-        self._varMgr.set('StreamingAssetsDir', '[ProjectAssetsDir]/StreamingAssets')
+        result['StreamingAssetsDir'] = '[ProjectAssetsDir]/StreamingAssets'
 
-        self._varMgr.set('IntermediateFilesDir', '[ProjectPlatformRoot]/obj')
+        result['IntermediateFilesDir'] = '[ProjectPlatformRoot]/obj'
 
-        self._varMgr.set('SolutionPath', '[ProjectRoot]/[ProjectName]-[Platform].sln')
+        result['SolutionPath'] = '[ProjectRoot]/[ProjectName]-[Platform].sln'
+
+        return result
 
     def deleteAllLinks(self):
         with self._log.heading('Deleting all junctions for all projects'):
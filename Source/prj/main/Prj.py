@@ -21,6 +21,12 @@
 from prj.main.VisualStudioHelper import VisualStudioHelper
 from prj.main.ProjenyVisualStudioHelper import ProjenyVisualStudioHelper
 from prj.main.ProjectSchemaLoader import ProjectSchemaLoader
+from prj.main.ProjectSchemaCache import ProjectSchemaCache
+from prj.main.ScriptFileScanner import ScriptFileScanner
+from prj.main.CsProjFactsCache import CsProjFactsCache
+from prj.main.ManifestFileCopier import ManifestFileCopier
+from prj.main.InstalledPackageIndex import InstalledPackageIndex
+from prj.main.ProjectWatcher import ProjectWatcher
 from mtm.util.ScriptRunner import ScriptRunner
 from mtm.util.CommonSettings import CommonSettings
 from prj.reg.UnityPackageExtractor import UnityPackageExtractor
@@ -61,6 +67,8 @@ def addArguments(parser):
     parser.add_argument('-v', '--verbose', action='store_true', help='Output more detailed logging information to console')
     parser.add_argument('-vv', '--veryVerbose', action='store_true', help='Output absolutely all logging information to console.  This will result in the console output being identical to the contents of the log file')
     parser.add_argument('-sp', '--suppressPrompts', action='store_true', help='If unset, confirmation prompts will be displayed for important operations.')
+    parser.add_argument('-iw', '--initWorkers', metavar='COUNT', type=int, help='The number of project-platforms to initialize at the same time when using --init.  If unspecified, ProjectInit: Workers from {0} is used'.format(ConfigFileName))
+    parser.add_argument('-nsc', '--noSchemaCache', action='store_true', help='Ignore any cached project schemas and re-read every {0} and package config from disk'.format(ProjectConfigFileName))
 
     # Projects
     parser.add_argument('-lpr', '--listProjects', action='store_true', help='Display the list of all projects that are in the UnityProjects directory')
@@ -75,6 +83,8 @@ def addArguments(parser):
     # Packages
     parser.add_argument('-lpa', '--listPackages', action='store_true', help='Lists all the directories found in the UnityPackages directory')
 
+    parser.add_argument('-wa', '--watch', action='store_true', help='Keeps running and updates the directory links and the custom solution of every initialized platform of the given project whenever its configs or packages change')
+
     parser.add_argument('-il', '--initLinks', action='store_true', help="This is the same as -ul except it will only update the directories if they haven't been updated at all yet")
 
     # Releases
@@ -143,6 +153,12 @@ def installBindings(mainConfigPath):
     Container.bind('VisualStudioHelper').toSingle(VisualStudioHelper)
     Container.bind('ProjenyVisualStudioHelper').toSingle(ProjenyVisualStudioHelper)
     Container.bind('ProjectSchemaLoader').toSingle(ProjectSchemaLoader)
+    Container.bind('ProjectSchemaCache').toSingle(ProjectSchemaCache)
+    Container.bind('ScriptFileScanner').toSingle(ScriptFileScanner)
+    Container.bind('CsProjFactsCache').toSingle(CsProjFactsCache)
+    Container.bind('ManifestFileCopier').toSingle(ManifestFileCopier)
+    Container.bind('InstalledPackageIndex').toSingle(InstalledPackageIndex)
+    Container.bind('ProjectWatcher').toSingle(ProjectWatcher)
     Container.bind('CommonSettings').toSingle(CommonSettings)
     Container.bind('UnityPackageExtractor').toSingle(UnityPackageExtractor)
     Container.bind('ZipHelper').toSingle(ZipHelper)
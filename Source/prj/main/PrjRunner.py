@@ -32,6 +32,8 @@ class PrjRunner:
     _vsSolutionHelper = Inject('VisualStudioHelper')
     _projVsHelper = Inject('ProjenyVisualStudioHelper')
     _releaseSourceManager = Inject('ReleaseSourceManager')
+    _schemaCache = Inject('ProjectSchemaCache')
+    _projectWatcher = Inject('ProjectWatcher')
 
     def run(self, args):
         self._args = self._processArgs(args)
@@ -100,7 +102,7 @@ def _runPreBuild(self):
             self.buildPrebuildProjects()
 
         if self._args.init:
-            self._packageMgr.updateLinksForAllProjects()
+            self._packageMgr.updateLinksForAllProjects(self._args.initWorkers)
 
         if self._args.initLinks:
             self._packageMgr.checkProjectInitialized(self._args.project, self._platform)
@@ -160,6 +162,9 @@ def _editProjectYaml(self):
     def _initialize(self):
         self._platform = PlatformUtil.fromPlatformArgName(self._args.platform)
 
+        if self._args.noSchemaCache:
+            self._schemaCache.setEnabled(False)
+
         if self._args.project and self._platform:
             self._packageMgr.setPathsForProjectPlatform(self._args.project, self._platform)
 
@@ -173,6 +178,13 @@ def _runInternal(self):
         self._runBuild()
         self._runPostBuild()
 
+        self._schemaCache.logStats()
+        self._sys.logWriteStats()
+
+        if self._args.watch:
+            # This blocks until interrupted so it always runs last
+            self._projectWatcher.watch(self._args.project)
+
     def _argsRequiresProject(self):
         return self._args.updateLinks or self._args.updateUnitySolution \
            or self._args.updateCustomSolution or self._args.buildCustomSolution \
@@ -180,7 +192,7 @@ def _argsRequiresProject(self):
            or self._args.openUnity or self._args.openCustomSolution \
            or self._args.editProjectYaml or self._args.createProject \
            or self._args.projectAddPackageAssets or self._args.projectAddPackagePlugins \
-           or self._args.deleteProject or self._args.listPackages
+           or self._args.deleteProject or self._args.listPackages or self._args.watch
 
     def _validateRequest(self):
 
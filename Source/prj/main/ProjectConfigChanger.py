@@ -36,7 +36,7 @@ def _loadProjectConfig(self, projectName):
 
     def _saveProjectConfig(self, projectName, projectConfig):
         configPath = self._getProjectConfigPath(projectName)
-        self._sys.writeFileAsText(configPath, YamlSerializer.serialize(projectConfig))
+        self._sys.writeFileIfChanged(configPath, YamlSerializer.serialize(projectConfig))
 
     def addPackage(self, projectName, packageName, addToAssetsFolder):
         with self._log.heading('Adding package {0} to project {1}'.format(packageName, projectName)):
@@ -0,0 +1,122 @@
+import mtm.util.Util as Util
+from mtm.ioc.Inject import Inject
+from mtm.util.Assert import *
+
+# Increment this whenever the contents of ProjectSchema / PackageInfo change
+# so that cache files written by older versions are ignored
+SchemaCacheVersion = 3
+
+class SchemaInputs:
+    """
+    Records every file and path variable expansion that fed into a resolved schema
+    so that we can later tell whether the schema is still valid
+    """
+    def __init__(self):
+        self.fileStamps = {}
+        self.expansions = {}
+
+    def addFile(self, path):
+        if path not in self.fileStamps:
+            self.fileStamps[path] = Util.getFileStamp(path)
+
+    def addExpansion(self, rawValue, expandedValue):
+        self.expansions[rawValue] = expandedValue
+
+    def addAll(self, other):
+        for path, stamp in other.fileStamps.items():
+            self.fileStamps.setdefault(path, stamp)
+
+        self.expansions.update(other.expansions)
+
+class SchemaCacheEntry:
+    def __init__(self, projectConfigPaths, inputs, schema):
+        self.version = SchemaCacheVersion
+        self.projectConfigPaths = projectConfigPaths
+        self.fileStamps = inputs.fileStamps
+        self.expansions = inputs.expansions
+        self.schema = schema
+
+class ProjectSchemaCache:
+    """
+    Stores fully resolved project schemas on disk (one file per project/platform)
+    so that unchanged projects do not need to re-read every package yaml file
+    """
+    _config = Inject('Config')
+    _varMgr = Inject('VarManager')
+    _log = Inject('Logger')
+    _sys = Inject('SystemHelper')
+
+    def __init__(self):
+        self._isEnabled = None
+        self.hits = 0
+        self.updates = 0
+        self.misses = 0
+
+    @property
+    def isEnabled(self):
+        if self._isEnabled == None:
+            self._isEnabled = self._config.tryGetBool(True, 'UseSchemaCache') and self._varMgr.hasKey('ProjenyCacheDir')
+
+        return self._isEnabled
+
+    def setEnabled(self, isEnabled):
+        self._isEnabled = isEnabled
+
+    def _getCachePath(self, projectName, platform):
+        return self._varMgr.expandPath('[ProjenyCacheDir]/Schemas/{0}-{1}.pickle'.format(projectName, platform))
+
+    def tryGetEntry(self, projectName, platform):
+        """
+        Returns the cached entry for the given project/platform without checking whether it is still valid
+        """
+        if not self.isEnabled:
+            return None
+
+        entry = self._sys.tryReadPickleFile(self._getCachePath(projectName, platform))
+
+        if entry == None or getattr(entry, 'version', None) != SchemaCacheVersion:
+            return None
+
+        return entry
+
+    def getChangedPaths(self, entry, projectConfigPaths):
+        """
+        Returns the list of files that changed since the given entry was created (an empty list
+        meaning the cached schema can be used as is), or None if the entry can not be used at all
+        """
+        if entry.projectConfigPaths != projectConfigPaths:
+            return None
+
+        for rawValue, expandedValue in entry.expansions.items():
+            if self._varMgr.expand(rawValue) != expandedValue:
+                return None
+
+        return [path for path, stamp in entry.fileStamps.items() if Util.getFileStamp(path) != stamp]
+
+    def addHit(self, projectName, platform):
+        self.hits += 1
+        self._log.debug("Loaded schema for project '{0}' (platform '{1}') from cache".format(projectName, platform))
+
+    def addUpdate(self, projectName, platform):
+        self.updates += 1
+
+    def addMiss(self, projectName, platform):
+        if self.isEnabled:
+            self.misses += 1
+
+    def store(self, projectName, platform, projectConfigPaths, inputs, schema):
+        if not self.isEnabled:
+            return
+
+        try:
+            self._sys.writePickleFile(
+                self._getCachePath(projectName, platform), SchemaCacheEntry(projectConfigPaths, inputs, schema))
+        except Exception as e:
+            # Failing to write the cache should never fail the actual operation
+            self._log.warn("Unable to write schema cache for project '{0}': {1}".format(projectName, str(e)))
+
+    def logStats(self):
+        if self.hits + self.updates + self.misses == 0:
+            return
+
+        self._log.info('Schema cache: {0} hits, {1} updated, {2} misses', self.hits, self.updates, self.misses)
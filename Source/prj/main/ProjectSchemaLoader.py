@@ -1,6 +1,5 @@
 
 import sys
-import re
 import os
 
 from mtm.util.Assert import *
@@ -9,13 +8,15 @@
 import mtm.ioc.Container as Container
 from mtm.ioc.Inject import Inject
 import mtm.ioc.IocAssertions as Assertions
-import mtm.util.JunctionUtil as JunctionUtil
 from mtm.config.Config import Config
 from mtm.config.YamlConfigLoader import loadYamlFilesThatExist
 
-from prj.main.CsProjAnalyzer import NsPrefix, CsProjAnalyzer
 from prj.main.ProjenyConstants import ProjectConfigFileName, PackageConfigFileName, ProjectUserConfigFileName
 from prj.main.ProjectConfig import ProjectConfig
+from prj.main.ProjectSchemaCache import SchemaInputs
+from prj.main.DependencyGraph import DependencyGraph
+from prj.main.PackageFolderIndex import PackageFolderIndex
+from prj.main.NamePatternMatcher import NamePatternMatcher
 
 from collections import OrderedDict
 import xml.etree.ElementTree as ET
@@ -24,19 +25,145 @@ class ProjectSchemaLoader:
     _varMgr = Inject('VarManager')
     _log = Inject('Logger')
     _sys = Inject('SystemHelper')
+    _schemaCache = Inject('ProjectSchemaCache')
+    _scriptScanner = Inject('ScriptFileScanner')
+    _csProjCache = Inject('CsProjFactsCache')
 
     def loadSchema(self, name, platform):
+        return self.loadSchemas(name, [platform])[platform]
+
+    def loadSchemas(self, name, platforms):
+        """
+        Returns a dictionary of platform -> ProjectSchema
+
+        Package yaml files and csproj files are only read once no matter how many platforms are given
+        """
+        schemas = {}
+        packageStore = ParsedPackageStore()
+
+        for platform in platforms:
+            try:
+                projectConfigPaths = self._getProjectConfigPaths(name)
+
+                entry = self._schemaCache.tryGetEntry(name, platform)
+                changedPaths = None
+
+                if entry != None:
+                    changedPaths = self._schemaCache.getChangedPaths(entry, projectConfigPaths)
+
+                if changedPaths != None and len(changedPaths) == 0:
+                    self._schemaCache.addHit(name, platform)
+                    schema = entry.schema
+
+                    # Scripts can be added to assembly project packages without touching any
+                    # of the recorded inputs, so this check is re-run on every hit
+                    self._ensurePrebuiltProjectsHaveNoScripts(schema.packages)
+                else:
+                    inputs = SchemaInputs()
+
+                    if changedPaths != None:
+                        # Only some files changed since the cached schema was created, so try re-using it
+                        self._schemaCache.addUpdate(name, platform)
+                        schema, _ = self._updateSchemaInternal(entry.schema, changedPaths, inputs)
+                    else:
+                        self._schemaCache.addMiss(name, platform)
+                        schema = self._loadSchemaInternal(name, platform, inputs, packageStore)
+
+                    self._schemaCache.store(name, platform, projectConfigPaths, inputs, schema)
+
+                schemas[platform] = schema
+            except Exception as e:
+                raise Exception("Failed while processing config yaml for project '{0}' (platform '{1}'). Details: {2}".format(name, platform, str(e))) from e
+
+        self._scriptScanner.saveCache()
+        self._csProjCache.saveCache()
+
+        return schemas
+
+    def updateSchema(self, previousSchema, changedPaths):
+        """
+        Re-resolves the given schema after the given config files have changed.  Only the packages
+        whose ProjenyPackage.yaml or assembly project changed are read again, and dependency lists
+        are only recalculated for those packages and the packages that depend on them
+
+        Returns the new schema and a SchemaDiff describing what changed
+        """
         try:
-            return self._loadSchemaInternal(name, platform)
+            inputs = SchemaInputs()
+            schema, diff = self._updateSchemaInternal(previousSchema, changedPaths, inputs)
+
+            self._schemaCache.store(
+                schema.name, schema.platform, self._getProjectConfigPaths(schema.name), inputs, schema)
+
+            self._scriptScanner.saveCache()
+            self._csProjCache.saveCache()
+
+            return schema, diff
         except Exception as e:
-            raise Exception("Failed while processing config yaml for project '{0}' (platform '{1}'). Details: {2}".format(name, platform, str(e))) from e
+            raise Exception("Failed while processing config yaml for project '{0}' (platform '{1}'). Details: {2}".format(previousSchema.name, previousSchema.platform, str(e))) from e
 
-    def loadProjectConfig(self, name):
+    def _updateSchemaInternal(self, previousSchema, changedPaths, inputs):
+        packageStore = self._tryCreateIncrementalPackageStore(previousSchema, changedPaths)
+
+        if packageStore == None:
+            self._log.debug('Fully reloading schema for project "{0}" since changes were not limited to package configs'.format(previousSchema.name))
+            packageStore = ParsedPackageStore()
+        else:
+            self._log.debug('Incrementally updating schema for project "{0}" with changes to packages {1}'.format(
+                previousSchema.name, ', '.join(sorted(packageStore.changedPackageNames))))
+
+        schema = self._loadSchemaInternal(previousSchema.name, previousSchema.platform, inputs, packageStore)
+
+        return schema, SchemaDiff.create(previousSchema, schema)
+
+    def _tryCreateIncrementalPackageStore(self, previousSchema, changedPaths):
+        # Returns None if the changes could affect more than just the packages they belong to
+        # (for eg. a change to the project config or a package folder), in which case everything is reloaded
+        packagesByPath = {}
+
+        for info in previousSchema.packages.values():
+            packagesByPath[_normalizePath(os.path.join(info.dirPath, PackageConfigFileName))] = info.name
+
+            if info.assemblyProjectInfo != None:
+                packagesByPath[_normalizePath(info.assemblyProjectInfo.path)] = info.name
+
+        changedPackageNames = set()
+
+        for path in changedPaths:
+            packageName = packagesByPath.get(_normalizePath(path))
+
+            if packageName == None:
+                return None
+
+            changedPackageNames.add(packageName)
+
+        packageStore = ParsedPackageStore()
+        packageStore.previousPackages = previousSchema.packages
+        packageStore.changedPackageNames = changedPackageNames
+
+        for info in previousSchema.packages.values():
+            if info.name not in changedPackageNames:
+                configPath = os.path.join(info.dirPath, PackageConfigFileName)
+
+                packageInputs = SchemaInputs()
+                packageInputs.addFile(configPath)
+
+                packageStore.packages[info.name] = ParsedPackage(
+                    info.dirPath, configPath, info.config, info.folderType, packageInputs)
+
+        return packageStore
+
+    def _getProjectConfigPaths(self, name):
         schemaPath = self._varMgr.expandPath('[UnityProjectsDir]/{0}/{1}'.format(name, ProjectConfigFileName))
         schemaPathUser = self._varMgr.expandPath('[UnityProjectsDir]/{0}/{1}'.format(name, ProjectUserConfigFileName))
         schemaPathGlobal = self._varMgr.expandPath('[UnityProjectsDir]/{0}'.format(ProjectConfigFileName))
         schemaPathUserGlobal = self._varMgr.expandPath('[UnityProjectsDir]/{0}'.format(ProjectUserConfigFileName))
 
+        return [schemaPath, schemaPathUser, schemaPathGlobal, schemaPathUserGlobal]
+
+    def loadProjectConfig(self, name):
+        schemaPath, schemaPathUser, schemaPathGlobal, schemaPathUserGlobal = self._getProjectConfigPaths(name)
+
         self._log.debug('Loading schema at path "{0}"'.format(schemaPath))
         yamlConfig = Config(loadYamlFilesThatExist(schemaPath, schemaPathUser, schemaPathGlobal, schemaPathUserGlobal))
 
@@ -60,12 +187,21 @@ def loadProjectConfig(self, name):
 
         return config
 
-    def _loadSchemaInternal(self, name, platform):
+    def _loadSchemaInternal(self, name, platform, inputs, packageStore):
 
-        config = self.loadProjectConfig(name)
+        for path in self._getProjectConfigPaths(name):
+            inputs.addFile(path)
+
+        if packageStore.projectConfig == None:
+            packageStore.projectConfig = self.loadProjectConfig(name)
+            packageStore.folderIndex = self.createPackageFolderIndex(packageStore.projectConfig)
+            packageStore.solutionProjectMatcher = NamePatternMatcher(
+                packageStore.projectConfig.solutionProjects, 'SolutionProjects in {0}/{1}'.format(name, ProjectConfigFileName))
+
+        config = packageStore.projectConfig
 
         # Search all the given packages and any new packages that are dependencies and create PackageInfo() objects for each
-        packageMap = self._getAllPackageInfos(config, platform)
+        packageMap = self._getAllPackageInfos(config, platform, inputs, packageStore)
 
         self._addGroupedDependenciesAsExplicitDependencies(packageMap)
 
@@ -73,8 +209,13 @@ def _loadSchemaInternal(self, name, platform):
 
         self._ensurePrebuiltProjectDependenciesArePrebuilt(packageMap)
 
+        graph = self._createDependencyGraph(packageMap)
+
         # We have all the package infos, but we don't know which packages depend on what so calculate that
-        self._calculateDependencyListForEachPackage(packageMap)
+        if packageStore.previousPackages != None:
+            self._updateDependencyListForChangedPackages(packageMap, graph, packageStore)
+        else:
+            self._calculateDependencyListForEachPackage(packageMap, graph)
 
         # For the pre-built assembly projects, if we add one of them to our solution,
         # then we need to add all the pre-built dependencies, since unlike generated projects
@@ -90,9 +231,9 @@ def _loadSchemaInternal(self, name, platform):
 
         # In Unity, the plugins folder can not have any dependencies on anything in the scripts folder
         # So if dependencies exist then just automatically move those packages to the scripts folder
-        self._ensurePluginPackagesDoNotHaveDependenciesInAssets(packageMap)
+        self._ensurePluginPackagesDoNotHaveDependenciesInAssets(packageMap, graph)
 
-        self._ensurePackagesThatAreNotProjectsDoNotHaveProjectDependencies(packageMap)
+        self._ensurePackagesThatAreNotProjectsDoNotHaveProjectDependencies(packageMap, graph)
 
         for info in packageMap.values():
             if info.forcePluginsDir and not info.isPluginDir:
@@ -146,41 +287,38 @@ def _getFolderTypeFromString(self, value):
         assertThat(False, "Unrecognized folder type '{0}'".format(value))
         return ""
 
-    def _getAllPackageInfos(self, projectConfig, platform):
+    def _getAllPackageInfos(self, projectConfig, platform, inputs, packageStore):
         configRefDesc = "'{0}' or '{1}'".format(ProjectConfigFileName, ProjectUserConfigFileName)
         allPackageRefs = [PackageReference(x, configRefDesc) for x in projectConfig.pluginsFolder + projectConfig.assetsFolder]
+        allPackageRefNames = set(x.name for x in allPackageRefs)
 
         packageMap = {}
 
+        # Adding or removing a package inside any of the package folders changes which directory
+        # a package name resolves to, so the folders themselves are inputs too
+        for folder in packageStore.folderIndex.folders:
+            inputs.addExpansion(folder.path, folder.expandedPath)
+            inputs.addFile(folder.expandedPath)
+
         # Resolve all dependencies for each package
         # by default, put any dependencies that are not declared explicitly into the plugins folder
         for packageRef in allPackageRefs:
 
             packageName = packageRef.name
-            packageDir = None
-
-            for packageFolder in projectConfig.packageFolders:
-                candidatePackageDir = os.path.join(packageFolder, packageName)
-
-                if self._sys.directoryExists(candidatePackageDir):
-                    packageDir = self._varMgr.expandPath(candidatePackageDir)
-                    break
+            parsedPackage = packageStore.packages.get(packageName)
 
-            assertIsNotNone(packageDir, "Could not find package '{0}' in any of the package directories!  Referenced in {1}", packageName, packageRef.sourceDesc)
+            if parsedPackage == None:
+                parsedPackage = self._parsePackage(packageRef, packageStore.folderIndex)
+                packageStore.packages[packageName] = parsedPackage
 
-            configPath = os.path.join(packageDir, PackageConfigFileName)
-
-            if os.path.exists(configPath):
-                packageConfig = Config(loadYamlFilesThatExist(configPath))
-            else:
-                packageConfig = Config([])
-
-            folderType = self._getFolderTypeFromString(packageConfig.tryGetString('', 'FolderType'))
+            packageConfig = parsedPackage.config
+            folderType = parsedPackage.folderType
 
             if not self._shouldIncludeForPlatform(packageName, packageConfig, folderType, platform):
+                inputs.addAll(parsedPackage.inputs)
                 continue
 
-            createCustomVsProject = self._shouldCreateVsProjectForName(packageName, projectConfig.solutionProjects)
+            createCustomVsProject = packageStore.solutionProjectMatcher.matches(packageName)
 
             isPluginsDir = True
 
@@ -195,13 +333,21 @@ def _getAllPackageInfos(self, projectConfig, platform):
 
             forcePluginsDir = packageConfig.tryGetBool(False, 'ForcePluginsDirectory')
 
-            assemblyProjInfo = self._tryGetAssemblyProjectInfo(packageConfig, packageName)
+            # Only look at the assembly project once we know the package is actually used by one of the platforms
+            if not parsedPackage.hasReadAssemblyProject:
+                parsedPackage.assemblyProjectInfo = self._tryGetAssemblyProjectInfo(packageConfig, packageName, parsedPackage.dirPath, parsedPackage.inputs)
+                parsedPackage.hasReadAssemblyProject = True
+
+            inputs.addAll(parsedPackage.inputs)
 
-            sourceDesc = '"{0}"'.format(configPath)
+            assemblyProjInfo = parsedPackage.assemblyProjectInfo
+
+            sourceDesc = '"{0}"'.format(parsedPackage.configPath)
 
             if assemblyProjInfo != None:
                 for assemblyDependName in assemblyProjInfo.dependencies:
-                    if assemblyDependName not in [x.name for x in allPackageRefs]:
+                    if assemblyDependName not in allPackageRefNames:
+                        allPackageRefNames.add(assemblyDependName)
                         allPackageRefs.append(PackageReference(assemblyDependName, sourceDesc))
 
                 explicitDependencies += assemblyProjInfo.dependencies
@@ -213,47 +359,72 @@ def _getAllPackageInfos(self, projectConfig, platform):
 
             packageMap[packageName] = PackageInfo(
                 isPluginsDir, packageName, packageConfig, createCustomVsProject,
-                explicitDependencies, forcePluginsDir, folderType, assemblyProjInfo, packageDir, groupedDependencies)
+                explicitDependencies, forcePluginsDir, folderType, assemblyProjInfo, parsedPackage.dirPath, groupedDependencies)
 
             for dependName in (explicitDependencies + groupedDependencies + extraDependencies):
-                if dependName not in [x.name for x in allPackageRefs]:
+                if dependName not in allPackageRefNames:
                     # Yes, python is ok with changing allPackageRefs even while iterating over it
+                    allPackageRefNames.add(dependName)
                     allPackageRefs.append(PackageReference(dependName, sourceDesc))
 
         return packageMap
 
-    def _tryGetAssemblyProjectInfo(self, packageConfig, packageName):
+    def _parsePackage(self, packageRef, folderIndex):
+        """
+        Reads everything about the given package that does not depend on the platform
+        """
+        packageName = packageRef.name
+        packageDir = folderIndex.tryGetPackageDir(packageName)
+
+        assertIsNotNone(packageDir, "Could not find package '{0}' in any of the package directories!  Referenced in {1}", packageName, packageRef.sourceDesc)
+
+        inputs = SchemaInputs()
+
+        configPath = os.path.join(packageDir, PackageConfigFileName)
+        inputs.addFile(configPath)
+
+        if os.path.exists(configPath):
+            packageConfig = Config(loadYamlFilesThatExist(configPath))
+        else:
+            packageConfig = Config([])
+
+        folderType = self._getFolderTypeFromString(packageConfig.tryGetString('', 'FolderType'))
+
+        return ParsedPackage(packageDir, configPath, packageConfig, folderType, inputs)
+
+    def createPackageFolderIndex(self, projectConfig):
+        return PackageFolderIndex(
+            [(x, self._varMgr.expand(x)) for x in projectConfig.packageFolders])
+
+    def _tryGetAssemblyProjectInfo(self, packageConfig, packageName, packageDir, inputs):
         assemblyProjectRelativePath = packageConfig.tryGetString(None, 'AssemblyProject', 'Path')
 
         if assemblyProjectRelativePath == None:
             return None
 
         projFullPath = self._varMgr.expand(assemblyProjectRelativePath)
+        inputs.addExpansion(assemblyProjectRelativePath, projFullPath)
 
         if not os.path.isabs(projFullPath):
             projFullPath = os.path.join(packageDir, assemblyProjectRelativePath)
 
+        inputs.addFile(projFullPath)
+
         assertThat(self._sys.fileExists(projFullPath), "Expected to find file at '{0}'.", projFullPath)
 
-        projAnalyzer = CsProjAnalyzer(projFullPath)
+        csProjFacts = self._csProjCache.getFacts(projFullPath)
 
-        assemblyName = projAnalyzer.getAssemblyName()
+        assemblyName = csProjFacts.assemblyName
         assertThat(assemblyName == '$(MSBuildProjectName)' or assemblyName.lower() == packageName.lower(), 'Packages that represent assembly projects must have the same name as the assembly')
 
         assertIsEqual(self._sys.getFileNameWithoutExtension(projFullPath).lower(), packageName.lower(),
           'Assembly projects must have the same name as their package')
 
         projConfig = packageConfig.tryGetString(None, 'AssemblyProject', 'Config')
-        dependencies = projAnalyzer.getProjectReferences()
+        dependencies = list(csProjFacts.projectReferences)
 
         return AssemblyProjectInfo(
-            projFullPath, projAnalyzer.root, projConfig, dependencies)
-
-    def getDependenciesFromCsProj(self, projectRoot):
-        result = []
-        for projRef in projectRoot.findall('./{0}ItemGroup/{0}ProjectReference/{0}Name'.format(NsPrefix)):
-            result.append(projRef.text)
-        return result
+            projFullPath, csProjFacts.projectGuid, projConfig, dependencies)
 
     def _ensureAllPackagesExist(self, packageMap):
         for package in packageMap.values():
@@ -266,12 +437,17 @@ def _ensureVisiblePrebuiltProjectHaveVisibleDependencies(self, packageMap):
                 self._makeAllPrebuiltDependenciesVisible(package, packageMap)
 
     def _makeAllPrebuiltDependenciesVisible(self, package, packageMap):
-        for dependName in package.explicitDependencies:
-            depend = packageMap[dependName]
+        packagesToProcess = [package]
+
+        while packagesToProcess:
+            current = packagesToProcess.pop()
 
-            if not depend.createCustomVsProject:
-                depend.createCustomVsProject = True
-                self._makeAllPrebuiltDependenciesVisible(depend, packageMap)
+            for dependName in current.explicitDependencies:
+                depend = packageMap[dependName]
+
+                if not depend.createCustomVsProject:
+                    depend.createCustomVsProject = True
+                    packagesToProcess.append(depend)
 
     def _ensurePrebuiltProjectDependenciesArePrebuilt(self, packageMap):
         for packageInfo in packageMap.values():
@@ -288,58 +464,41 @@ def _ensurePrebuiltProjectDependenciesArePrebuilt(self, packageMap):
     def _ensurePrebuiltProjectsHaveNoScripts(self, packageMap):
         for package in packageMap.values():
             if package.assemblyProjectInfo != None:
-                assertThat(not any(self._sys.findFilesByPattern(package.dirPath, '*.cs')),
+                assertThat(not self._scriptScanner.hasScripts(package.dirPath),
                    "Found C# scripts in assembly project '{0}'.  This is not allowed - please move to a separate package.", package.name)
 
-    def _ensurePackagesThatAreNotProjectsDoNotHaveProjectDependencies(self, packageMap):
-        changedOne = True
+    def _ensurePackagesThatAreNotProjectsDoNotHaveProjectDependencies(self, packageMap, graph):
+        # Any package that depends on a visual studio project (directly or indirectly) needs to be one
+        # too, so walk the reverse dependencies starting from every existing project.  Each package
+        # is only added to the worklist once, when its flag changes
+        packagesToProcess = [x for x in packageMap.values() if x.createCustomVsProject]
 
-        while changedOne:
-            changedOne = False
+        while packagesToProcess:
+            current = packagesToProcess.pop()
 
-            for info in packageMap.values():
-                if not info.createCustomVsProject and self._hasVsProjectDependency(info, packageMap):
+            for dependentName in graph.getDependents(current.name):
+                info = packageMap[dependentName]
+
+                if not info.createCustomVsProject:
                     info.createCustomVsProject = True
                     self._log.debug('Created visual studio project for {0} package even though it wasnt marked as one, because it has csproj dependencies'.format(info.name))
-                    changedOne = True
-
-    def _hasVsProjectDependency(self, info, packageMap):
-        for dependName in info.allDependencies:
-            if not dependName in packageMap:
-                # For eg. a platform specific dependency
-                continue
-
-            dependInfo = packageMap[dependName]
-
-            if dependInfo.createCustomVsProject:
-                return True
+                    packagesToProcess.append(info)
 
-        return False
+    def _ensurePluginPackagesDoNotHaveDependenciesInAssets(self, packageMap, graph):
+        # Same approach as above - anything that depends on a package in the scripts folder
+        # (directly or indirectly) is moved there as well
+        packagesToProcess = [x for x in packageMap.values() if not x.isPluginDir]
 
-    def _ensurePluginPackagesDoNotHaveDependenciesInAssets(self, packageMap):
-        movedProject = True
+        while packagesToProcess:
+            current = packagesToProcess.pop()
 
-        while movedProject:
-            movedProject = False
+            for dependentName in graph.getDependents(current.name):
+                info = packageMap[dependentName]
 
-            for info in packageMap.values():
-                if info.isPluginDir and self._hasAssetsDependency(info, packageMap):
+                if info.isPluginDir:
                     info.isPluginDir = False
                     self._log.debug('Moved {0} package to scripts folder since it has dependencies there and therefore cannot be in plugins'.format(info.name))
-                    movedProject = True
-
-    def _hasAssetsDependency(self, info, packageMap):
-        for dependName in info.allDependencies:
-            if not dependName in packageMap:
-                # For eg. a platform specific dependency
-                continue
-
-            dependInfo = packageMap[dependName]
-
-            if not dependInfo.isPluginDir:
-                return True
-
-        return False
+                    packagesToProcess.append(info)
 
     def _printDependencyTree(self, packageMap):
         packages = sorted(packageMap.values(), key = lambda p: (p.isPluginDir, -len(p.explicitDependencies)))
@@ -350,88 +509,218 @@ def _printDependencyTree(self, packageMap):
             self._printDependency(pack, done, 1, packageMap)
 
     def _printDependency(self, package, done, indentCount, packageMap):
-        done[package.name] = True
-
         indentInterval = '    '
 
-        indent = ((indentCount - 1) * (indentInterval + '.')) + indentInterval
-        self._log.debug(indent + '|-' + package.name)
+        # Use an explicit stack instead of recursion so that deep dependency chains are not a problem
+        # Note that packages are pushed in reverse so that they are printed in the original order
+        stack = [(package, indentCount, True)]
 
-        for dependName in package.explicitDependencies:
-            if dependName in packageMap:
-                subPackage = packageMap[dependName]
+        while stack:
+            current, currentIndentCount, isRoot = stack.pop()
 
-                if subPackage.name in done:
-                    self._log.debug(indent + '.' + indentInterval + '|~' + subPackage.name)
-                else:
-                    self._printDependency(subPackage, done, indentCount+1, packageMap)
+            indent = ((currentIndentCount - 1) * (indentInterval + '.')) + indentInterval
 
-    def _shouldCreateVsProjectForName(self, packageName, solutionProjects):
-        if packageName in solutionProjects:
-            return True
+            if current.name in done and not isRoot:
+                parentIndent = ((currentIndentCount - 2) * (indentInterval + '.')) + indentInterval
+                self._log.debug(parentIndent + '.' + indentInterval + '|~' + current.name)
+                continue
 
-        # Allow regex's!
-        for projPattern in solutionProjects:
-            if projPattern.startswith('/'):
-                projPattern = projPattern[1:]
-                try:
-                    if re.match(projPattern, packageName):
-                        return True
-                except Exception as e:
-                    raise Exception("Failed while parsing project regex '/{0}' from {1}/{2}.  Details: {3}".format(projPattern, self._varMgr.expand('ProjectName'), ProjectConfigFileName, str(e)))
+            done[current.name] = True
+            self._log.debug(indent + '|-' + current.name)
 
-        return False
+            for dependName in reversed(current.explicitDependencies):
+                if dependName in packageMap:
+                    stack.append((packageMap[dependName], currentIndentCount + 1, False))
 
     def _addGroupedDependenciesAsExplicitDependencies(self, packageMap):
 
-        # There is a bug here where it won't handle grouped dependencies within grouped dependencies
+        groupCache = {}
+
         for info in packageMap.values():
-            extras = set()
+            extras = []
+            existing = set(info.explicitDependencies)
+            existing.add(info.name)
 
             for explicitDependName in info.explicitDependencies:
                 if explicitDependName not in packageMap:
                     continue
 
-                explicitDependInfo = packageMap[explicitDependName]
+                for groupedDependName in self._getAllGroupedDependencies(explicitDependName, packageMap, groupCache):
+                    if groupedDependName not in existing:
+                        existing.add(groupedDependName)
+                        extras.append(groupedDependName)
+
+            info.explicitDependencies += extras
+
+    def _getAllGroupedDependencies(self, packageName, packageMap, groupCache):
+        # Follow GroupWith entries transitively, since grouped packages can have their own groups
+        # Note that GroupWith is often declared in both directions so cycles are expected here
+        result = groupCache.get(packageName)
 
-                for groupedDependName in explicitDependInfo.groupedDependencies:
-                    if info.name != groupedDependName:
-                        extras.add(groupedDependName)
+        if result != None:
+            return result
 
-            info.explicitDependencies += list(extras)
+        result = []
+        visited = set([packageName])
+        packagesToProcess = [packageName]
+
+        while packagesToProcess:
+            currentName = packagesToProcess.pop(0)
+
+            if currentName not in packageMap:
+                continue
+
+            for groupedDependName in packageMap[currentName].groupedDependencies:
+                if groupedDependName not in visited:
+                    visited.add(groupedDependName)
+                    result.append(groupedDependName)
+                    packagesToProcess.append(groupedDependName)
+
+        groupCache[packageName] = result
+        return result
 
-    def _calculateDependencyListForEachPackage(self, packageMap):
+    def _createDependencyGraph(self, packageMap):
+        graph = DependencyGraph()
+
+        for info in packageMap.values():
+            graph.addNode(info.name)
+
+            for dependName in info.explicitDependencies:
+                # Note that dependencies that are not in packageMap (eg. platform specific packages)
+                # are still added as nodes since they are included in allDependencies, they just
+                # never have any dependencies of their own
+                graph.addDependency(info.name, dependName)
+
+        return graph
+
+    def _calculateDependencyListForEachPackage(self, packageMap, graph):
 
         self._log.debug('Processing dependency tree')
 
-        inProgress = set()
+        closures = graph.calculateClosures()
+
+        for info in packageMap.values():
+            info.allDependencies = graph.bitsToNames(closures[graph.getId(info.name)])
+
+    def _updateDependencyListForChangedPackages(self, packageMap, graph, packageStore):
+        previousPackages = packageStore.previousPackages
+
+        # Only packages that changed, are new, or depend on one of those can have a different dependency list.
+        # Changed packages that are no longer in the schema (for eg. because of a new platform filter) still
+        # have a node as long as something depends on them, and those dependents have to be updated too
+        changedNames = [x for x in packageMap if x not in previousPackages]
+        changedNames += [x for x in packageStore.changedPackageNames if graph.hasNode(x)]
+        affectedIds = graph.getAllDependents(changedNames)
+
+        self._log.debug('Processing dependency tree for {0} of {1} packages'.format(len(affectedIds), len(packageMap)))
+
+        knownClosures = {}
+
+        for nodeId in affectedIds:
+            for dependName in graph.getDependencies(graph.getName(nodeId)):
+                dependId = graph.getId(dependName)
+
+                if dependId in affectedIds or dependId in knownClosures:
+                    continue
+
+                previousInfo = previousPackages.get(dependName)
+                # Packages that are not in the schema (for eg. platform specific ones) have no dependencies
+                knownClosures[dependId] = graph.namesToBits(previousInfo.allDependencies) if dependName in packageMap else 0
+
+        closures = graph.calculateClosuresFor(affectedIds, knownClosures)
 
         for info in packageMap.values():
-            self._calculateDependencyListForPackage(info, packageMap, inProgress)
+            nodeId = graph.getId(info.name)
+
+            if nodeId in affectedIds:
+                info.allDependencies = graph.bitsToNames(closures[nodeId])
+            else:
+                info.allDependencies = list(previousPackages[info.name].allDependencies)
+
+class ParsedPackage:
+    def __init__(self, dirPath, configPath, config, folderType, inputs):
+        self.dirPath = dirPath
+        self.configPath = configPath
+        self.config = config
+        self.folderType = folderType
+        self.inputs = inputs
+        self.assemblyProjectInfo = None
+        self.hasReadAssemblyProject = False
+
+class ParsedPackageStore:
+    """
+    Everything that is read from disk while loading a schema that is shared between platforms
+    """
+    def __init__(self):
+        self.projectConfig = None
+        self.folderIndex = None
+        self.solutionProjectMatcher = None
+        self.packages = {}
+
+        # Only set when updating a previously resolved schema
+        self.previousPackages = None
+        self.changedPackageNames = None
+
+class SchemaDiff:
+    """
+    Describes the differences between two resolved schemas for the same project and platform
+    """
+    PackageFields = [
+        'isPluginDir', 'createCustomVsProject', 'explicitDependencies', 'allDependencies', 'folderType',
+        'forcePluginsDir', 'dirPath', 'groupedDependencies', 'assemblyProjectInfo']
+
+    SchemaFields = ['customFolderMap', 'projectSettingsPath', 'unityPackagesPath', 'targetPlatforms']
+
+    def __init__(self):
+        self.addedPackages = []
+        self.removedPackages = []
+        # Package name -> list of PackageInfo field names that changed
+        self.changedPackages = {}
+        self.changedSchemaFields = []
 
-    def _calculateDependencyListForPackage(self, packageInfo, packageMap, inProgress):
+    @property
+    def isEmpty(self):
+        return not self.addedPackages and not self.removedPackages and not self.changedPackages and not self.changedSchemaFields
 
-        if packageInfo.name in inProgress:
-            assertThat(False, "Found circular dependency when processing package {0}.  Dependency list: {1}".format(packageInfo.name, ' -> '.join([x for x in inProgress]) + '-> ' + packageInfo.name))
+    @staticmethod
+    def create(previousSchema, schema):
+        diff = SchemaDiff()
 
-        inProgress.add(packageInfo.name)
-        allDependencies = set(packageInfo.explicitDependencies)
+        for fieldName in SchemaDiff.SchemaFields:
+            if getattr(previousSchema, fieldName) != getattr(schema, fieldName):
+                diff.changedSchemaFields.append(fieldName)
 
-        for explicitDependName in packageInfo.explicitDependencies:
-            if explicitDependName not in packageMap:
-                # This can happen if a package depends on another package that is platform specific
+        for name, info in schema.packages.items():
+            previousInfo = previousSchema.packages.get(name)
+
+            if previousInfo == None:
+                diff.addedPackages.append(name)
                 continue
 
-            explicitDependInfo = packageMap[explicitDependName]
+            changedFields = [x for x in SchemaDiff.PackageFields if not _areFieldsEqual(x, getattr(previousInfo, x), getattr(info, x))]
+
+            if changedFields:
+                diff.changedPackages[name] = changedFields
+
+        diff.removedPackages = [x for x in previousSchema.packages if x not in schema.packages]
+
+        return diff
 
-            if explicitDependInfo.allDependencies == None:
-                self._calculateDependencyListForPackage(explicitDependInfo, packageMap, inProgress)
+def _areFieldsEqual(fieldName, left, right):
+    if fieldName == 'assemblyProjectInfo':
+        if left == None or right == None:
+            return left is right
 
-            for dependName in explicitDependInfo.allDependencies:
-                allDependencies.add(dependName)
+        return (left.path, left.projectGuid, left.config, left.dependencies) == (right.path, right.projectGuid, right.config, right.dependencies)
 
-        packageInfo.allDependencies = list(allDependencies)
-        inProgress.remove(packageInfo.name)
+    if fieldName == 'allDependencies':
+        # The order is not meaningful here
+        return set(left) == set(right)
+
+    return left == right
+
+def _normalizePath(path):
+    return os.path.normcase(os.path.normpath(path))
 
 class PackageReference:
     def __init__(self, name, sourceDesc):
@@ -448,6 +737,17 @@ def __init__(self, name, packages, customFolderMap, projectSettingsPath, unityPa
         self.platform = platform
         self.targetPlatforms = targetPlatforms
 
+# Every directory that PackageInfo.outputDirVar can return
+PackageOutputDirVars = [
+    '[PluginsAndroidDir]',
+    '[PluginsAndroidLibraryDir]',
+    '[PluginsIosLibraryDir]',
+    '[PluginsWebGlLibraryDir]',
+    '[StreamingAssetsDir]',
+    '[PluginsDir]',
+    '[ProjectAssetsDir]',
+]
+
 class FolderTypes:
     Normal = "normal"
     WebGl = "webgl"
@@ -457,9 +757,9 @@ class FolderTypes:
     StreamingAssets = "streamingassets"
 
 class AssemblyProjectInfo:
-    def __init__(self, path, root, config, dependencies):
+    def __init__(self, path, projectGuid, config, dependencies):
         self.path = path
-        self.root = root
+        self.projectGuid = projectGuid
         self.config = config
         self.dependencies = dependencies
 
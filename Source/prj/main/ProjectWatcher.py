@@ -0,0 +1,358 @@
+import os
+
+from mtm.ioc.Inject import Inject
+from mtm.util.FileWatcher import createFileWatcher
+
+from mtm.util.Assert import *
+from prj.main.ProjenyConstants import ProjectConfigFileName, ProjectUserConfigFileName, PackageConfigFileName
+from prj.main.ScriptFileScanner import IgnoredDirectoryNames
+
+ProjectConfigFileNames = [x.lower() for x in [ProjectConfigFileName, ProjectUserConfigFileName]]
+
+class WatchUpdate:
+    """
+    Describes what was updated for one project-platform after a batch of changes
+    """
+    def __init__(self, platform):
+        self.platform = platform
+        self.diff = None
+        self.updatedLinks = False
+        self.updatedSolution = False
+
+class ProjectWatcher:
+    """
+    Watches the project configs, package configs and package folders of a project and keeps the
+    links and the generated solution of every initialized platform up to date
+
+    Bursts of changes (for eg. from a git checkout) are collected until nothing has changed for
+    Watch: DebounceMilliseconds and then handled together.  Config changes go through
+    ProjectSchemaLoader.updateSchema, so only the platforms whose resolved schema actually
+    changed are re-linked
+    """
+    _log = Inject('Logger')
+    _config = Inject('Config')
+    _varMgr = Inject('VarManager')
+    _sys = Inject('SystemHelper')
+    _packageManager = Inject('PackageManager')
+    _schemaLoader = Inject('ProjectSchemaLoader')
+    _vsSolutionGenerator = Inject('VisualStudioSolutionGenerator')
+
+    def __init__(self):
+        self._projectName = None
+        self._schemas = {}
+        self._watcher = None
+        # Normalized package folder path -> set of package directory names
+        self._packageFolders = {}
+        # Normalized paths of the C# scripts inside the package folders
+        self._scriptPaths = set()
+
+    @property
+    def schemas(self):
+        return self._schemas
+
+    def watch(self, projectName):
+        """
+        Runs until interrupted
+        """
+        self.start(projectName)
+
+        try:
+            self._log.info('Watching project "{0}" for changes.  Press Ctrl+C to stop', projectName)
+
+            while True:
+                self.waitAndProcessChanges(None)
+        except KeyboardInterrupt:
+            self._log.info('Stopped watching project "{0}"', projectName)
+        finally:
+            self.stop()
+
+    def start(self, projectName, platforms = None):
+        """
+        Starts watching the given platforms of the given project, or every initialized platform if none are given
+        """
+        self._projectName = projectName
+
+        self._packageManager.setPathsForProject(projectName)
+        projConfig = self._schemaLoader.loadProjectConfig(projectName)
+
+        if platforms == None:
+            platforms = [x for x in projConfig.targetPlatforms if self._packageManager.isProjectPlatformInitialized(projectName, x)]
+
+        assertThat(len(platforms) > 0, "Project '{0}' has not been initialized for any platform.  Run --updateLinks first", projectName)
+
+        self._schemas = self._schemaLoader.loadSchemas(projectName, platforms)
+
+        self._watchProjectFolders(projConfig)
+
+        self._log.debug('Watching {0} package folders for platforms {1}'.format(len(self._packageFolders), ', '.join(platforms)))
+
+    def _watchProjectFolders(self, projConfig):
+        """
+        (Re)creates the watcher for the project config directories and the package folders of the
+        given project config, and re-indexes the packages and scripts inside those folders
+        """
+        self.stop()
+
+        self._watcher = createFileWatcher(
+            self._config.tryGetBool(False, 'Watch', 'UsePolling'),
+            self._config.tryGetInt(1000, 'Watch', 'PollIntervalMilliseconds') / 1000.0,
+            IgnoredDirectoryNames)
+
+        # The directories containing the project configs are not watched recursively, since
+        # the project directories also contain the generated project-platform directories
+        self._watcher.addDirectory(self._varMgr.expandPath('[UnityProjectsDir]'), False)
+        self._watcher.addDirectory(self._varMgr.expandPath('[UnityProjectsDir]/{0}'.format(self._projectName)), False)
+
+        self._packageFolders = {}
+        self._scriptPaths = set()
+
+        for folder in self._schemaLoader.createPackageFolderIndex(projConfig).folders:
+            if folder.exists:
+                self._watcher.addDirectory(folder.realPath, True)
+                self._packageFolders[_normalizePath(folder.realPath)] = set(folder.packageNames)
+                self._scriptPaths.update(_findScripts(folder.realPath))
+
+    def stop(self):
+        if self._watcher != None:
+            self._watcher.close()
+            self._watcher = None
+
+    def waitAndProcessChanges(self, timeout):
+        """
+        Waits up to timeout seconds (or forever if None) for changes, then waits until the changes
+        stop and processes all of them together
+
+        Returns a list of WatchUpdate, which is empty if nothing needed to be updated
+        """
+        changedPaths = set()
+
+        while not changedPaths:
+            changedPaths = self._watcher.waitForChanges(3600 if timeout == None else timeout)
+
+            if timeout != None:
+                break
+
+        if not changedPaths:
+            return []
+
+        debounceTime = self._config.tryGetInt(500, 'Watch', 'DebounceMilliseconds') / 1000.0
+
+        while True:
+            newPaths = self._watcher.waitForChanges(debounceTime)
+
+            if not newPaths:
+                break
+
+            changedPaths.update(newPaths)
+
+        return self.processChanges(changedPaths)
+
+    def processChanges(self, changedPaths):
+        reloadPaths, packagePaths, scriptPaths = self._classifyPaths(changedPaths)
+
+        if not reloadPaths and not packagePaths and not scriptPaths:
+            return []
+
+        self._log.debug('Processing {0} changed paths'.format(len(changedPaths)))
+
+        if any(os.path.basename(x).lower() in ProjectConfigFileNames for x in reloadPaths):
+            scriptPaths += self._rewatchProjectFolders()
+
+        updates = []
+
+        for platform, schema in sorted(self._schemas.items()):
+            update = WatchUpdate(platform)
+
+            # Changes to packages that are not part of the schema can't affect it, since they
+            # would first need to be referenced by a config that is
+            packageInputPaths = self._getPackageInputPaths(schema)
+            schemaPaths = reloadPaths + [x for x in packagePaths if _normalizePath(x) in packageInputPaths]
+
+            try:
+                if schemaPaths:
+                    schema, update.diff = self._schemaLoader.updateSchema(schema, schemaPaths)
+                    self._schemas[platform] = schema
+
+                    if not update.diff.isEmpty:
+                        self._packageManager.updateProjectJunctions(self._projectName, platform, schema)
+                        update.updatedLinks = True
+
+                if update.updatedLinks or self._containsPackageScripts(schema, scriptPaths):
+                    update.updatedSolution = self._tryUpdateSolution(platform, schema)
+            except Exception as e:
+                self._log.error('Failed to update project "{0}" for platform "{1}": {2}'.format(self._projectName, platform, e))
+                continue
+
+            if update.updatedLinks or update.updatedSolution:
+                updates.append(update)
+
+        if updates:
+            self._log.good('Updated {0}', ', '.join('{0}-{1}'.format(self._projectName, x.platform) for x in updates))
+
+        return updates
+
+    def _rewatchProjectFolders(self):
+        """
+        The package folders are part of the project config, so the watched folders and their indexes
+        have to be rebuilt whenever it changes.  Returns the scripts that were added or removed as a result
+        """
+        try:
+            projConfig = self._schemaLoader.loadProjectConfig(self._projectName)
+        except Exception as e:
+            # The schema update reports the same error for every platform
+            self._log.debug('Could not reload the package folders of project "{0}": {1}'.format(self._projectName, e))
+            return []
+
+        oldScriptPaths = self._scriptPaths
+        self._watchProjectFolders(projConfig)
+
+        self._log.debug('Watching {0} package folders'.format(len(self._packageFolders)))
+
+        return list(oldScriptPaths.symmetric_difference(self._scriptPaths))
+
+    def _classifyPaths(self, changedPaths):
+        """
+        Returns the paths that require fully reloading the schemas, the package configs or assembly
+        projects that were changed, and the C# scripts that were added or removed
+        """
+        reloadPaths = []
+        packagePaths = []
+        scriptPaths = []
+        removedPaths = set()
+
+        for path in changedPaths:
+            normalizedPath = _normalizePath(path)
+            name = os.path.basename(normalizedPath).lower()
+
+            if not name.endswith('.cs') and not os.path.lexists(path):
+                removedPaths.add(normalizedPath)
+
+            if name in ProjectConfigFileNames:
+                reloadPaths.append(path)
+            elif name == PackageConfigFileName.lower() or name.endswith('.csproj'):
+                packagePaths.append(path)
+            elif name.endswith('.cs'):
+                # Editing a script does not change the solution, so only count additions and removals
+                if os.path.isfile(path) != (normalizedPath in self._scriptPaths):
+                    scriptPaths.append(normalizedPath)
+
+                    if normalizedPath in self._scriptPaths:
+                        self._scriptPaths.remove(normalizedPath)
+                    else:
+                        self._scriptPaths.add(normalizedPath)
+            elif normalizedPath in self._packageFolders:
+                # Events were lost so the whole folder has to be checked
+                reloadPaths.append(path)
+            elif os.path.dirname(normalizedPath) in self._packageFolders:
+                # Directories directly inside a package folder are packages, but their modification
+                # time also changes whenever anything is added to them, so only count additions and removals
+                packageNames = self._packageFolders[os.path.dirname(normalizedPath)]
+                packageName = os.path.basename(path)
+
+                if os.path.isdir(path) != (packageName in packageNames):
+                    reloadPaths.append(path)
+
+                    if packageName in packageNames:
+                        packageNames.remove(packageName)
+                    else:
+                        packageNames.add(packageName)
+                        # Packages that are moved in are not always reported along with the scripts inside them
+                        scriptPaths += self._addScriptsInDirectory(path)
+
+        if removedPaths:
+            scriptPaths += self._removeScriptsInDirectories(removedPaths)
+
+        return reloadPaths, packagePaths, scriptPaths
+
+    def _addScriptsInDirectory(self, dirPath):
+        result = [x for x in _findScripts(dirPath) if x not in self._scriptPaths]
+        self._scriptPaths.update(result)
+        return result
+
+    def _removeScriptsInDirectories(self, dirPaths):
+        # Directories that are moved away are reported without the scripts inside them
+        result = []
+
+        for path in self._scriptPaths:
+            dirPath = os.path.dirname(path)
+
+            while dirPath not in self._packageFolders:
+                if dirPath in dirPaths:
+                    result.append(path)
+                    break
+
+                parentPath = os.path.dirname(dirPath)
+
+                if parentPath == dirPath:
+                    break
+
+                dirPath = parentPath
+
+        self._scriptPaths.difference_update(result)
+        return result
+
+    def _getPackageInputPaths(self, schema):
+        result = set()
+
+        for info in schema.packages.values():
+            result.add(_normalizePath(os.path.join(info.dirPath, PackageConfigFileName)))
+
+            if info.assemblyProjectInfo != None:
+                result.add(_normalizePath(info.assemblyProjectInfo.path))
+
+        return result
+
+    def _containsPackageScripts(self, schema, scriptPaths):
+        if not scriptPaths:
+            return False
+
+        packageDirs = set(_normalizePath(x.dirPath) for x in schema.packages.values())
+
+        for path in scriptPaths:
+            dirPath = os.path.dirname(path)
+
+            while dirPath and dirPath not in self._packageFolders:
+                if dirPath in packageDirs:
+                    return True
+
+                parentPath = os.path.dirname(dirPath)
+
+                if parentPath == dirPath:
+                    break
+
+                dirPath = parentPath
+
+        return False
+
+    def _tryUpdateSolution(self, platform, schema):
+        with self._varMgr.activate(self._packageManager.getProjectPlatformContext(self._projectName, platform)):
+            # Only keep the solution up to date if it was generated before
+            if not self._sys.fileExists('[SolutionPath]'):
+                return False
+
+            self._vsSolutionGenerator.updateVisualStudioSolution(self._projectName, platform, schema)
+
+        return True
+
+def _findScripts(dirPath):
+    result = []
+    dirsToProcess = [dirPath]
+
+    while dirsToProcess:
+        currentDir = dirsToProcess.pop()
+
+        try:
+            with os.scandir(currentDir) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks = False):
+                        if entry.name.lower() not in IgnoredDirectoryNames:
+                            dirsToProcess.append(entry.path)
+                    elif entry.name.lower().endswith('.cs'):
+                        result.append(_normalizePath(entry.path))
+        except OSError:
+            pass
+
+    return result
+
+def _normalizePath(path):
+    return os.path.normcase(os.path.normpath(path))
@@ -4,3 +4,4 @@
 
 PackageConfigFileName = 'ProjenyPackage.yaml'
 
+InstallInfoFileName = 'ProjenyInstall.yaml'
@@ -0,0 +1,317 @@
+
+import sys
+import os
+import json
+import time
+import random
+import shutil
+import platform
+import argparse
+import tempfile
+import traceback
+import statistics
+
+import mtm.util.MiscUtil as MiscUtil
+import mtm.util.UnitTestUtil as UnitTestUtil
+
+from mtm.util.ProcessRunner import ProcessRunner
+from mtm.util.StageTimer import StageTimer
+from mtm.util.Platforms import Platforms
+
+from prj.main.ProjectSchemaLoader import ProjectSchemaLoader, FolderTypes
+from prj.main.ProjectSchemaCache import ProjectSchemaCache
+from prj.main.ScriptFileScanner import ScriptFileScanner
+from prj.main.CsProjFactsCache import CsProjFactsCache
+from prj.main.ProjenyConstants import ProjectConfigFileName, PackageConfigFileName
+
+import mtm.ioc.Container as Container
+
+from mtm.util.Assert import *
+
+ProjectName = 'Benchmark'
+
+# The internal passes of ProjectSchemaLoader that are timed separately
+SchemaLoaderPasses = [
+    'loadProjectConfig',
+    '_getAllPackageInfos',
+    '_addGroupedDependenciesAsExplicitDependencies',
+    '_ensurePrebuiltProjectsHaveNoScripts',
+    '_ensurePrebuiltProjectDependenciesArePrebuilt',
+    '_createDependencyGraph',
+    '_calculateDependencyListForEachPackage',
+    '_ensureVisiblePrebuiltProjectHaveVisibleDependencies',
+    '_printDependencyTree',
+    '_ensurePluginPackagesDoNotHaveDependenciesInAssets',
+    '_ensurePackagesThatAreNotProjectsDoNotHaveProjectDependencies',
+    '_ensureAllPackagesExist',
+]
+
+PlatformSpecificFolderTypes = [FolderTypes.AndroidProject, FolderTypes.AndroidLibraries, FolderTypes.Ios, FolderTypes.WebGl]
+
+class WorkspaceGenerator:
+    """
+    Writes a synthetic UnityProjects / UnityPackages directory structure containing a
+    single project that references a layered graph of packages
+    """
+    def __init__(self, args):
+        self._args = args
+        self._random = random.Random(args.seed)
+
+    def generate(self, rootDir):
+        args = self._args
+
+        packageNames = ['Package{0:05}'.format(i) for i in range(args.packages)]
+
+        # Packages are split into layers and only ever depend on packages in the next layer,
+        # so the graph is acyclic and the longest dependency chain is equal to the depth
+        layers = [[] for _ in range(args.depth)]
+
+        for i, packageName in enumerate(packageNames):
+            layers[i * args.depth // args.packages].append(packageName)
+
+        packageFolders = []
+
+        for i in range(args.packageFolders):
+            packageFolder = os.path.join(rootDir, 'UnityPackages{0}'.format(i))
+            os.makedirs(packageFolder)
+            packageFolders.append(packageFolder)
+
+        for layerIndex, layer in enumerate(layers):
+            nextLayer = layers[layerIndex + 1] if layerIndex + 1 < len(layers) else []
+
+            for packageName in layer:
+                packageDir = os.path.join(self._random.choice(packageFolders), packageName)
+                os.makedirs(packageDir)
+
+                self._writeFile(os.path.join(packageDir, PackageConfigFileName),
+                    self._createPackageConfig(layer, nextLayer))
+
+                self._writeFile(os.path.join(packageDir, packageName + '.cs'), '')
+
+        projectDir = os.path.join(rootDir, 'UnityProjects', ProjectName)
+        os.makedirs(os.path.join(projectDir, 'ProjectSettings'))
+
+        # Only the first layer is listed explicitly, everything else is found through dependencies
+        roots = layers[0]
+        assetsCount = len(roots) // 2
+
+        lines = [
+            "ProjectSettingsPath: '[ProjectRoot]/ProjectSettings'",
+            "UnityPackagesPath: '[ProjectRoot]/UnityPackages'",
+            'TargetPlatforms:',
+        ]
+        lines += ['    - {0}'.format(x) for x in args.platforms]
+        lines += ['PackageFolders:']
+        lines += ["    - '{0}'".format(x) for x in packageFolders]
+        lines += ['AssetsFolder:']
+        lines += ['    - {0}'.format(x) for x in roots[:assetsCount]]
+        lines += ['PluginsFolder:']
+        lines += ['    - {0}'.format(x) for x in roots[assetsCount:]]
+
+        self._writeFile(os.path.join(projectDir, ProjectConfigFileName), '\n'.join(lines) + '\n')
+
+    def _createPackageConfig(self, layer, nextLayer):
+        args = self._args
+        lines = []
+
+        if nextLayer:
+            lines.append('Dependencies:')
+            lines += ['    - {0}'.format(x) for x in self._random.sample(nextLayer, min(args.fanOut, len(nextLayer)))]
+
+        if self._random.random() < args.groupWithRatio:
+            # Only group with packages in the same layer, since those are never dependencies of each other
+            lines.append('GroupWith:')
+            lines.append('    - {0}'.format(self._random.choice(layer)))
+
+        if nextLayer and self._random.random() < args.extrasRatio:
+            lines.append('Extras:')
+            lines.append('    - {0}'.format(self._random.choice(nextLayer)))
+
+        if self._random.random() < args.folderTypeRatio:
+            lines.append('FolderType: {0}'.format(self._random.choice(PlatformSpecificFolderTypes)))
+        elif self._random.random() < args.platformFilterRatio:
+            lines.append('Platforms:')
+            lines.append('    - {0}'.format(self._random.choice(args.platforms)))
+
+        if self._random.random() < args.forceAssetsRatio:
+            lines.append('ForceAssetsDirectory: True')
+
+        return '\n'.join(lines) + '\n'
+
+    def _writeFile(self, path, text):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+class SchemaBenchmark:
+    """
+    Times ProjectSchemaLoader against a synthetic workspace and reports the results as JSON
+    """
+    def __init__(self, args, rootDir):
+        self._args = args
+        self._rootDir = rootDir
+
+    def _createLoader(self, timer, useCache):
+        installBindings(self._rootDir, useCache)
+        loader = Container.resolve('ProjectSchemaLoader')
+
+        for passName in SchemaLoaderPasses:
+            setattr(loader, passName, timer.wrap(passName, getattr(loader, passName)))
+
+        return loader
+
+    def _runScenario(self, name, useCache, loadFunc):
+        samples = []
+        passSamples = {}
+
+        for _ in range(self._args.iterations):
+            timer = StageTimer()
+            loader = self._createLoader(timer, useCache)
+
+            startTime = time.perf_counter()
+            schemas = loadFunc(loader)
+            samples.append(time.perf_counter() - startTime)
+
+            for passName, seconds in timer.stages.items():
+                passSamples.setdefault(passName, []).append(seconds)
+
+        return {
+            'name': name,
+            'total': _summarize(samples),
+            'passes': {x: _summarize(passSamples[x]) for x in SchemaLoaderPasses if x in passSamples},
+            'packageCounts': {x.platform: len(x.packages) for x in schemas},
+        }
+
+    def run(self):
+        args = self._args
+        results = []
+
+        shutil.rmtree(os.path.join(self._rootDir, 'ProjenyCache'), ignore_errors = True)
+
+        for platformName in args.platforms:
+            results.append(self._runScenario(
+                'loadSchema.{0}'.format(platformName), False,
+                lambda loader: [loader.loadSchema(ProjectName, platformName)]))
+
+        results.append(self._runScenario(
+            'loadSchemas', False,
+            lambda loader: list(loader.loadSchemas(ProjectName, args.platforms).values())))
+
+        # Fill the on-disk caches once, then measure repeat runs that should only validate them
+        self._createLoader(StageTimer(), True).loadSchemas(ProjectName, args.platforms)
+
+        results.append(self._runScenario(
+            'loadSchemas.cached', True,
+            lambda loader: list(loader.loadSchemas(ProjectName, args.platforms).values())))
+
+        return results
+
+def installBindings(rootDir, useCache):
+    """
+    Clears the container and binds everything needed to load the schema of a workspace
+    created by WorkspaceGenerator in the given directory
+    """
+    config = {
+        'UseSchemaCache': useCache,
+        'PathVars': {
+            'UnityProjectsDir': os.path.join(rootDir, 'UnityProjects'),
+            'ProjenyCacheDir': os.path.join(rootDir, 'ProjenyCache'),
+        },
+    }
+
+    UnitTestUtil.installBindings(config)
+    Container.bind('ProcessRunner').toSingle(ProcessRunner)
+    Container.bind('ProjectSchemaLoader').toSingle(ProjectSchemaLoader)
+    Container.bind('ProjectSchemaCache').toSingle(ProjectSchemaCache)
+    Container.bind('ScriptFileScanner').toSingle(ScriptFileScanner)
+    Container.bind('CsProjFactsCache').toSingle(CsProjFactsCache)
+
+    varMgr = Container.resolve('VarManager')
+    varMgr.set('ProjectName', ProjectName)
+    varMgr.set('ProjectRoot', '[UnityProjectsDir]/[ProjectName]')
+
+def _summarize(samples):
+    return {
+        'min': min(samples),
+        'median': statistics.median(samples),
+        'mean': statistics.mean(samples),
+        'max': max(samples),
+    }
+
+def addArguments(parser):
+    parser.add_argument('-n', '--packages', type=int, default=500, help='Number of packages to generate')
+    parser.add_argument('-f', '--fanOut', type=int, default=3, help='Number of dependencies per package')
+    parser.add_argument('-d', '--depth', type=int, default=10, help='Number of dependency layers (the length of the longest dependency chain)')
+    parser.add_argument('-pf', '--packageFolders', type=int, default=2, help='Number of package folders to spread the packages across')
+    parser.add_argument('-gw', '--groupWithRatio', type=float, default=0.1, help='Fraction of packages with a GroupWith entry')
+    parser.add_argument('-ex', '--extrasRatio', type=float, default=0.1, help='Fraction of packages with an Extras entry')
+    parser.add_argument('-ft', '--folderTypeRatio', type=float, default=0.05, help='Fraction of packages with a platform specific FolderType')
+    parser.add_argument('-pfr', '--platformFilterRatio', type=float, default=0.1, help='Fraction of packages that are limited to one platform')
+    parser.add_argument('-fa', '--forceAssetsRatio', type=float, default=0.05, help='Fraction of packages with ForceAssetsDirectory set')
+    parser.add_argument('-pl', '--platforms', type=str, nargs='+', default=[Platforms.Windows, Platforms.Android, Platforms.Ios], help='Platforms to load the schema for')
+    parser.add_argument('-i', '--iterations', type=int, default=5, help='Number of times to run each scenario')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='Random seed used to generate the workspace')
+    parser.add_argument('-o', '--output', type=str, help='Write the JSON results to this file instead of stdout')
+    parser.add_argument('-k', '--keepWorkspace', type=str, metavar='DIR', help='Generate the workspace in the given (empty) directory and keep it afterwards')
+
+def main():
+    parser = argparse.ArgumentParser(description='Measures the time taken to resolve project schemas for a synthetic workspace')
+    addArguments(parser)
+    args = parser.parse_args(sys.argv[1:])
+
+    assertThat(args.packages > 0 and args.depth > 0 and args.depth <= args.packages, 'Depth must be between 1 and the number of packages')
+
+    if args.keepWorkspace:
+        rootDir = os.path.realpath(args.keepWorkspace)
+        os.makedirs(rootDir, exist_ok = True)
+    else:
+        rootDir = os.path.realpath(tempfile.mkdtemp(prefix = 'ProjenyBenchmark'))
+
+    try:
+        startTime = time.perf_counter()
+        WorkspaceGenerator(args).generate(rootDir)
+        generateTime = time.perf_counter() - startTime
+
+        output = {
+            'python': platform.python_version(),
+            'os': platform.system(),
+            'parameters': {x: y for x, y in vars(args).items() if x not in ['output', 'keepWorkspace']},
+            'generateSeconds': generateTime,
+            'scenarios': SchemaBenchmark(args, rootDir).run(),
+        }
+    finally:
+        if not args.keepWorkspace:
+            shutil.rmtree(rootDir, ignore_errors = True)
+
+    outputText = json.dumps(output, indent = 4)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(outputText + '\n')
+    else:
+        print(outputText)
+
+if __name__ == '__main__':
+
+    if (sys.version_info < (3, 0)):
+        print('Wrong version of python!  Install python 3 and try again')
+        sys.exit(2)
+
+    succeeded = True
+
+    try:
+        main()
+
+    except KeyboardInterrupt as e:
+        print('Operation aborted by user by hitting CTRL+C')
+        succeeded = False
+
+    except Exception as e:
+        sys.stderr.write(str(e))
+
+        if not MiscUtil.isRunningAsExe():
+            sys.stderr.write('\n' + traceback.format_exc())
+
+        succeeded = False
+
+    if not succeeded:
+        sys.exit(1)
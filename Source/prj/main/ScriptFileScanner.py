@@ -0,0 +1,121 @@
+import os
+import fnmatch
+
+from mtm.ioc.Inject import Inject
+from mtm.util.Assert import *
+
+# Increment this whenever the format of the scan cache changes
+ScriptScanCacheVersion = 1
+
+# Build output directories of assembly projects, which can contain generated .cs files
+IgnoredDirectoryNames = ['bin', 'obj']
+
+class ScriptScanCache:
+    def __init__(self):
+        self.version = ScriptScanCacheVersion
+        # Package directory -> {directory path -> mtime} for every directory that was searched
+        self.scriptFreeDirs = {}
+
+class ScriptFileScanner:
+    """
+    Checks whether package directories contain any C# scripts
+
+    Directories that were found to contain no scripts are remembered together with the
+    modification time of every directory that was searched.  Adding, removing or renaming a
+    file changes the modification time of the directory containing it, so if none of those
+    changed we can skip the walk entirely
+    """
+    _varMgr = Inject('VarManager')
+    _log = Inject('Logger')
+    _sys = Inject('SystemHelper')
+    _schemaCache = Inject('ProjectSchemaCache')
+
+    def __init__(self):
+        self._cache = None
+        self._hasChanges = False
+
+    def _getCachePath(self):
+        return self._varMgr.expandPath('[ProjenyCacheDir]/ScriptScans.pickle')
+
+    def _getCache(self):
+        if self._cache == None:
+            cache = None
+
+            if self._schemaCache.isEnabled:
+                cache = self._sys.tryReadPickleFile(self._getCachePath())
+
+            if cache == None or getattr(cache, 'version', None) != ScriptScanCacheVersion:
+                cache = ScriptScanCache()
+
+            self._cache = cache
+
+        return self._cache
+
+    def hasScripts(self, dirPath):
+        cache = self._getCache()
+        dirPath = self._varMgr.expandPath(dirPath)
+
+        dirStamps = cache.scriptFreeDirs.get(dirPath)
+
+        if dirStamps != None and self._areStampsValid(dirStamps):
+            return False
+
+        dirStamps = {}
+
+        if self._findScript(dirPath, dirStamps) != None:
+            if cache.scriptFreeDirs.pop(dirPath, None) != None:
+                self._hasChanges = True
+
+            return True
+
+        cache.scriptFreeDirs[dirPath] = dirStamps
+        self._hasChanges = True
+        return False
+
+    def _areStampsValid(self, dirStamps):
+        for path, mtime in dirStamps.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    return False
+            except OSError:
+                return False
+
+        return True
+
+    def _findScript(self, dirPath, dirStamps):
+        dirsToProcess = [dirPath]
+
+        while dirsToProcess:
+            currentDir = dirsToProcess.pop()
+
+            try:
+                dirStamps[currentDir] = os.stat(currentDir).st_mtime_ns
+
+                with os.scandir(currentDir) as entries:
+                    for entry in entries:
+                        if entry.is_symlink():
+                            continue
+
+                        if entry.is_dir():
+                            if entry.name.lower() not in IgnoredDirectoryNames:
+                                dirsToProcess.append(entry.path)
+
+                        elif fnmatch.fnmatch(entry.name, '*.cs'):
+                            return entry.path
+            except OSError as e:
+                # Never cache a result for a directory we could not read completely
+                self._log.debug("Unable to scan directory '{0}': {1}".format(currentDir, str(e)))
+                dirStamps[currentDir] = None
+
+        return None
+
+    def saveCache(self):
+        if not self._hasChanges or not self._schemaCache.isEnabled:
+            return
+
+        self._hasChanges = False
+
+        try:
+            self._sys.writePickleFile(self._getCachePath(), self._cache)
+        except Exception as e:
+            self._log.warn("Unable to write script scan cache: {0}".format(str(e)))
@@ -42,29 +42,46 @@ class UnityEditorMenuGenerator:
         """
     )
 
-    def Generate(self, currentProjName, currentPlatform, outputPath, allProjectNames):
-        foundCurrent = False
-        methodsText = ""
-        projIndex = 1
+    def getProjectPlatforms(self, allProjectNames):
+        """
+        Returns the (project name, platform) pairs that are listed in the menu, so that the
+        project configs only need to be loaded once when generating the menu for many projects
+        """
+        result = []
+
         for projName in allProjectNames:
             try:
                 projConfig = self._schemaLoader.loadProjectConfig(projName)
             except Exception as e:
-                self._log.warn('Could not load config for project {projName}. It will not show up in editor menu.')
+                self._log.warn('Could not load config for project {0}. It will not show up in editor menu.'.format(projName))
                 continue
 
             for platform in projConfig.targetPlatforms:
-                methodsText += self._changeProjectMethodTemplate.substitute(name = projName, platform = platform, index = projIndex)
+                result.append((projName, platform))
+
+        return result
 
-                if projName == currentProjName and platform == currentPlatform:
-                    assertThat(not foundCurrent)
-                    foundCurrent = True
-                    methodsText += self._currentProjectMethodTemplate.substitute(name = projName, platform = platform, index = projIndex)
+    def Generate(self, currentProjName, currentPlatform, outputPath, allProjectNames, projectPlatforms = None):
+        """
+        Returns true if the menu file was changed
+        """
+        if projectPlatforms == None:
+            projectPlatforms = self.getProjectPlatforms(allProjectNames)
+
+        foundCurrent = False
+        methodsText = ""
+        projIndex = 1
+        for projName, platform in projectPlatforms:
+            methodsText += self._changeProjectMethodTemplate.substitute(name = projName, platform = platform, index = projIndex)
 
-                projIndex += 1
+            if projName == currentProjName and platform == currentPlatform:
+                assertThat(not foundCurrent)
+                foundCurrent = True
+                methodsText += self._currentProjectMethodTemplate.substitute(name = projName, platform = platform, index = projIndex)
 
+            projIndex += 1
 
         #assertThat(foundCurrent, "Could not find project " + currentProjName)
         fileText = self._ChangeProjectMenuClassTemplate.substitute(methods = methodsText)
         # self._log.info(fileText)
-        self._sys.writeFileAsText(outputPath, fileText)
+        return self._sys.writeFileIfChanged(outputPath, fileText)
@@ -1,19 +1,24 @@
 
 import xml.etree.ElementTree as ET
-from xml.dom import minidom
 
 import uuid
 import re
 import os
 
+from concurrent.futures import ThreadPoolExecutor
+
+import mtm.util.Util as Util
 import mtm.ioc.Container as Container
 from mtm.ioc.Inject import Inject
 from mtm.ioc.Inject import InjectMany
 import mtm.ioc.IocAssertions as Assertions
 from mtm.util.Assert import *
+from mtm.util.StageTimer import StageTimer
 from prj.main.ProjenyConstants import ProjectConfigFileName, PackageConfigFileName, ProjectUserConfigFileName
 
 from prj.main.CsProjAnalyzer import NsPrefix
+from prj.main.NamePatternMatcher import NamePatternMatcher
+from prj.main.CsProjTemplate import CsProjTemplate, CsProjElement
 
 CsProjTypeGuid = 'FAE04EC0-301F-11D3-BF4B-00C04F79EFBC'
 SolutionFolderTypeGuid = '2150E333-8FDC-42A3-9474-1A3956D46DE8'
@@ -21,12 +26,29 @@
 
 ProjenyDirectoryIgnorePattern = re.compile(r'.*Assets\\Plugins\\Projeny\\.*')
 ProjenyGeneratedDirectoryIgnorePattern = re.compile(r'.*Assets\\Plugins\\ProjenyGenerated\\.*')
+EditorDirectoryPattern = re.compile(r'.*\\Editor($|\\).*')
+
+CsProjFileExtensions = ('.cs', '.txt', '.yaml')
+
+# The parts of [CsProjectTemplate] that are filled in for each project
+CsProjTemplatePropertyNames = [
+    'RootNamespace', 'ProjectGuid', 'OutputPath', 'AssemblyName', 'DefineConstants',
+    'IntermediateOutputPath', 'BaseIntermediateOutputPath']
+CsProjTemplateItemGroupNames = ['Reference', 'Compile', 'ProjectReference']
 
 PluginsProjectName = 'PluginsFolder'
 AssetsProjectName = 'AssetsFolder'
 AssetsEditorProjectName = 'AssetsFolder-Editor'
 PluginsEditorProjectName = 'PluginsFolder-Editor'
 
+# Generated project guids are derived from this so that they stay the same between runs
+ProjectGuidNamespace = uuid.UUID('5B0B5C2E-7A43-4C4F-9C2D-3F1E6D8A9B10')
+
+UnityProjectCachePath = '[ProjenyCacheDir]/UnityGeneratedProjects/[ProjectName]-[ShortPlatform].pickle'
+
+# Increment this whenever the format of the unity project cache changes
+UnityProjectCacheVersion = 1
+
 class VisualStudioSolutionGenerator:
     """
     Handler for creating custom visual studio solutions based on ProjenyProject.yaml files
@@ -38,20 +60,22 @@ class VisualStudioSolutionGenerator:
     _config = Inject('Config')
     _varMgr = Inject('VarManager')
     _sys = Inject('SystemHelper')
+    _schemaCache = Inject('ProjectSchemaCache')
 
-    def updateVisualStudioSolution(self, projectName, platform):
+    def updateVisualStudioSolution(self, projectName, platform, schema = None):
+        """
+        The schema is loaded here unless it is given
+        """
         with self._log.heading('Updating Visual Studio solution for project "{0}"'.format(projectName)):
             self._packageManager.setPathsForProjectPlatform(projectName, platform)
             self._packageManager.checkProjectInitialized(projectName, platform)
 
-            schema = self._schemaLoader.loadSchema(projectName, platform)
+            if schema == None:
+                schema = self._schemaLoader.loadSchema(projectName, platform)
 
             self._updateVisualStudioSolutionInternal(
                 schema.packages.values(), schema.customFolderMap)
 
-    def _prettify(self, doc):
-        return minidom.parseString(ET.tostring(doc)).toprettyxml(indent="    ")
-
     def _getDefineConstantsElement(self, root):
         return root.findall('.//{0}DefineConstants'.format(NsPrefix))[0].text
 
@@ -61,7 +85,7 @@ def _getUnityProjectReferencesItems(self, root):
 
         for refElem in refElems:
             name = refElem.get('Include')
-            children = refElem.getchildren()
+            children = list(refElem)
 
             hintPath = None
 
@@ -71,41 +95,50 @@ def _getUnityProjectReferencesItems(self, root):
 
                 hintPath = hintPathElem.text.replace('/', '\\')
 
-            if hintPath:
-                if not os.path.isabs(hintPath):
-                    hintPath = self._varMgr.expandPath('[ProjectPlatformRoot]/{0}'.format(hintPath))
-
-                assertThat(self._sys.fileExists(hintPath), "Expected to find file at '{0}'.  Try updating the unity generated solution, the assembly references might be out of date.".format(hintPath))
+            if hintPath and not os.path.isabs(hintPath):
+                hintPath = self._varMgr.expandPath('[ProjectPlatformRoot]/{0}'.format(hintPath))
 
             items.append(RefInfo(name, hintPath))
 
         return items
 
+    def _checkHintPathsExist(self, unityProjInfo):
+        # The editor project references nearly everything that the other one does, so each path is only checked once
+        missingPaths = sorted(x for x in _getHintPaths(unityProjInfo) if not self._sys.fileExists(x))
+
+        assertThat(len(missingPaths) == 0, "Expected to find files at {0}.  Try updating the unity generated solution, the assembly references might be out of date.",
+            ', '.join("'{0}'".format(x) for x in missingPaths))
+
     def _chooseMostRecentFile(self, path1, path2, path3):
+        """
+        Returns the chosen path and its (modification time, size), or (None, None) if none of them exist
+        """
         path1 = self._varMgr.expandPath(path1)
         path2 = self._varMgr.expandPath(path2)
         path3 = self._varMgr.expandPath(path3)
 
-        if self._sys.fileExists(path3):
-            return path3
+        stamp3 = Util.getFileStamp(path3)
 
-        # If they both exist choose most recent
-        if self._sys.fileExists(path1) and self._sys.fileExists(path2):
-            modtime1 = os.path.getmtime(path1)
-            modtime2 = os.path.getmtime(path2)
+        if stamp3 != None:
+            return path3, stamp3
 
-            if modtime1 > modtime2:
-                return path1
+        stamp1 = Util.getFileStamp(path1)
+        stamp2 = Util.getFileStamp(path2)
 
-            return path2
+        # If they both exist choose most recent
+        if stamp1 != None and stamp2 != None:
+            if stamp1[0] > stamp2[0]:
+                return path1, stamp1
+
+            return path2, stamp2
 
-        if self._sys.fileExists(path1):
-            return path1
+        if stamp1 != None:
+            return path1, stamp1
 
-        if self._sys.fileExists(path2):
-            return path2
+        if stamp2 != None:
+            return path2, stamp2
 
-        return None
+        return None, None
 
     def _parseGeneratedUnityProject(self):
 
@@ -114,15 +147,26 @@ def _parseGeneratedUnityProject(self):
         # If visual studio is set to external editor, it names it the first one
         # and otherwise it names it the second one
         # So check modification times for the case where the user changes this setting
-        unityProjPath = self._chooseMostRecentFile(
+        unityProjPath, unityProjStamp = self._chooseMostRecentFile(
             '[UnityGeneratedProjectPath]', '[UnityGeneratedProjectPath2]', '[UnityGeneratedProjectPath3]')
 
-        unityEditorProjPath = self._chooseMostRecentFile(
+        unityEditorProjPath, unityEditorProjStamp = self._chooseMostRecentFile(
             '[UnityGeneratedProjectEditorPath]', '[UnityGeneratedProjectEditorPath2]', '[UnityGeneratedProjectEditorPath3]')
 
-        assertThat(unityProjPath and self._sys.fileExists(unityProjPath) and unityEditorProjPath and self._sys.fileExists(unityEditorProjPath), \
+        assertThat(unityProjPath and unityEditorProjPath, \
             'Could not find unity-generated project when generating custom solution.  This is necessary so the custom solution can add things like unity defines and DLL references within the unity project.')
 
+        # Unity re-generates its projects whenever a script is added or removed, but only the
+        # defines and references are needed here, so those are cached along with the schemas
+        cacheKey = (unityProjPath, unityProjStamp, unityEditorProjPath, unityEditorProjStamp)
+        cache = self._sys.tryReadPickleFile(UnityProjectCachePath) if self._schemaCache.isEnabled else None
+
+        if cache != None and getattr(cache, 'version', None) != UnityProjectCacheVersion:
+            cache = None
+
+        if cache != None and cache.key == cacheKey:
+            return cache.info
+
         unityProjRoot = ET.parse(unityProjPath)
         unityProjEditorRoot = ET.parse(unityEditorProjPath)
 
@@ -130,32 +174,53 @@ def _parseGeneratedUnityProject(self):
         references = self._getUnityProjectReferencesItems(unityProjRoot)
         referencesEditor = self._getUnityProjectReferencesItems(unityProjEditorRoot)
 
-        return UnityGeneratedProjInfo(defines, references, referencesEditor)
+        info = UnityGeneratedProjInfo(defines, references, referencesEditor)
+
+        if cache == None or _getHintPaths(cache.info) != _getHintPaths(info):
+            self._checkHintPathsExist(info)
+
+        if self._schemaCache.isEnabled:
+            try:
+                self._sys.writePickleFile(UnityProjectCachePath, UnityGeneratedProjCache(cacheKey, info))
+            except Exception as e:
+                self._log.warn("Unable to write unity project cache: {0}".format(str(e)))
+
+        return info
 
     def _updateVisualStudioSolutionInternal(self, allPackages, customFolderMap):
 
-        # Necessary to avoid having ns0: prefixes everywhere on output
-        ET.register_namespace('', 'http://schemas.microsoft.com/developer/msbuild/2003')
+        timer = StageTimer()
 
-        unifyProjInfo = self._parseGeneratedUnityProject()
+        with timer.stage('unity project'):
+            unifyProjInfo = self._parseGeneratedUnityProject()
 
-        projectMap = self._createProjectMap(allPackages)
+        with timer.stage('scan'):
+            # Every project only contains files from inside the assets folder, so list it once
+            # and take the files of each project from that
+            fileIndex = self._createCsFileIndex()
 
-        self._initDependenciesForAllProjects(
-            allPackages, projectMap, unifyProjInfo)
+            projectMap = self._createProjectMap(allPackages, fileIndex)
 
-        self._addFilesForAllProjects(
-            projectMap, unifyProjInfo)
+        with timer.stage('dependencies'):
+            self._initDependenciesForAllProjects(
+                allPackages, projectMap, unifyProjInfo)
+
+        with timer.stage('scan'):
+            self._addFilesForAllProjects(
+                projectMap, fileIndex)
 
         self._writeCsProjFiles(
-            projectMap, unifyProjInfo)
+            projectMap, unifyProjInfo, timer)
+
+        with timer.stage('solution'):
+            self._createSolution(projectMap.values(), customFolderMap)
 
-        self._createSolution(projectMap.values(), customFolderMap)
+        self._log.info('Solution generation took {0}', ', '.join('{0} {1:.2f}s'.format(name, seconds) for name, seconds in timer.stages.items()))
 
-    def _createProjectMap(self, allPackages):
+    def _createProjectMap(self, allPackages, fileIndex):
         projectMap = {}
         self._addStandardProjects(projectMap)
-        self._addCustomProjects(allPackages, projectMap)
+        self._addCustomProjects(allPackages, projectMap, fileIndex)
         return projectMap
 
     def _addStandardProjects(self, projectMap):
@@ -172,54 +237,70 @@ def _addStandardProjects(self, projectMap):
             PluginsEditorProjectName, '[PluginsDir]')
 
     def _addFilesForAllProjects(
-        self, projectMap, unifyProjInfo):
+        self, projectMap, fileIndex):
 
         excludeDirs = []
 
         for projInfo in projectMap.values():
             if projInfo.packageInfo != None:
-                packageDir = self._varMgr.expandPath(os.path.join(projInfo.packageInfo.outputDirVar, projInfo.packageInfo.name))
+                # Note that the package directories are links, so these must not be passed through
+                # expandPath, since that would resolve them to the package source directories
+                packageDir = os.path.join(self._varMgr.expandPath(projInfo.packageInfo.outputDirVar), projInfo.packageInfo.name)
                 excludeDirs.append(packageDir)
 
         self._initFilesForStandardCsProjForDirectory(
-            projectMap[PluginsEditorProjectName], excludeDirs, unifyProjInfo, True)
+            projectMap[PluginsEditorProjectName], excludeDirs, fileIndex, True)
 
         self._initFilesForStandardCsProjForDirectory(
-            projectMap[PluginsProjectName], excludeDirs, unifyProjInfo, False)
+            projectMap[PluginsProjectName], excludeDirs, fileIndex, False)
 
         excludeDirs.append(self._varMgr.expandPath('[PluginsDir]'))
 
         self._initFilesForStandardCsProjForDirectory(
-            projectMap[AssetsProjectName], excludeDirs, unifyProjInfo, False)
+            projectMap[AssetsProjectName], excludeDirs, fileIndex, False)
 
         self._initFilesForStandardCsProjForDirectory(
-            projectMap[AssetsEditorProjectName], excludeDirs, unifyProjInfo, True)
+            projectMap[AssetsEditorProjectName], excludeDirs, fileIndex, True)
 
     def _writeCsProjFiles(
-        self, projectMap, unifyProjInfo):
+        self, projectMap, unifyProjInfo, timer):
+
+        # (CsProjInfo, is editor) for every project that needs a csproj file
+        tasks = []
 
         for projInfo in projectMap.values():
-            if projInfo.projectType != ProjectType.Custom and projInfo.projectType != ProjectType.CustomEditor:
-                continue
+            if projInfo.projectType == ProjectType.Custom:
+                tasks.append((projInfo, False))
+            elif projInfo.projectType == ProjectType.CustomEditor:
+                tasks.append((projInfo, True))
 
-            if projInfo.projectType == ProjectType.CustomEditor:
-                refItems = unifyProjInfo.referencesEditor
-            else:
-                refItems = unifyProjInfo.references
+        for projectName, isEditor in [
+                (PluginsEditorProjectName, True), (PluginsProjectName, False),
+                (AssetsProjectName, False), (AssetsEditorProjectName, True)]:
+
+            if not projectMap[projectName].isIgnored:
+                tasks.append((projectMap[projectName], isEditor))
+
+        settings = self._createCsProjSettings(projectMap, unifyProjInfo)
 
-            self._writeCsProject(projInfo, projectMap, projInfo.files, refItems, unifyProjInfo.defines)
+        # The contents of each project only depend on the project itself and the settings, so
+        # they can all be rendered and written at the same time
+        workerCount = self._config.tryGetInt(1, 'SolutionGeneration', 'Workers')
 
-        self._writeStandardCsProjForDirectory(
-            projectMap[PluginsEditorProjectName], projectMap, unifyProjInfo, True)
+        with timer.stage('render'):
+            contents = self._runInWorkers(
+                workerCount, lambda task: self._renderCsProject(task[0], task[1], settings), tasks)
 
-        self._writeStandardCsProjForDirectory(
-            projectMap[PluginsProjectName], projectMap, unifyProjInfo, False)
+        with timer.stage('write'):
+            self._runInWorkers(
+                workerCount, lambda x: self._writeCsProjFile(x[0][0].absPath, x[1]), list(zip(tasks, contents)))
 
-        self._writeStandardCsProjForDirectory(
-            projectMap[AssetsProjectName], projectMap, unifyProjInfo, False)
+    def _runInWorkers(self, workerCount, func, items):
+        if workerCount <= 1 or len(items) <= 1:
+            return [func(x) for x in items]
 
-        self._writeStandardCsProjForDirectory(
-            projectMap[AssetsEditorProjectName], projectMap, unifyProjInfo, True)
+        with ThreadPoolExecutor(max_workers = min(workerCount, len(items))) as executor:
+            return list(executor.map(func, items))
 
     def _initDependenciesForAllProjects(
         self, allPackages, projectMap, unifyProjInfo):
@@ -257,42 +338,36 @@ def _initDependenciesForAllProjects(
         scriptsEditorProj.dependencies = scriptsProj.dependencies + [scriptsProj, pluginsEditorProj]
 
     def _addCustomProjects(
-        self, allPackages, allCustomProjects):
+        self, allPackages, allCustomProjects, fileIndex):
 
         for packageInfo in allPackages:
             if not packageInfo.createCustomVsProject:
                 continue
 
             if packageInfo.assemblyProjectInfo == None:
-                customProject = self._createGeneratedCsProjInfo(packageInfo, False)
+                customProject = self._createGeneratedCsProjInfo(packageInfo, False, fileIndex)
                 allCustomProjects[customProject.name] = customProject
 
-                customEditorProject = self._createGeneratedCsProjInfo(packageInfo, True)
+                customEditorProject = self._createGeneratedCsProjInfo(packageInfo, True, fileIndex)
                 allCustomProjects[customEditorProject.name] = customEditorProject
             else:
-                projId = self._getCsProjIdFromFile(packageInfo.assemblyProjectInfo.root)
+                projId = packageInfo.assemblyProjectInfo.projectGuid
+                assertThat(projId != None, "Could not find ProjectGuid in '{0}'", packageInfo.assemblyProjectInfo.path)
                 customProject = CsProjInfo(
                     projId, packageInfo.assemblyProjectInfo.path, packageInfo.name,
                     [], False, packageInfo.assemblyProjectInfo.config, ProjectType.Prebuilt, packageInfo)
                 allCustomProjects[customProject.name] = customProject
 
-    def _getCsProjIdFromFile(self, projectRoot):
-        projId = projectRoot.findall('./{0}PropertyGroup/{0}ProjectGuid'.format(NsPrefix))[0].text
-        return re.match('^{(.*)}$', projId).groups()[0]
+    def _getFolderName(self, packageName, folderNames, folderMatcher):
+        index = folderMatcher.tryGetMatchIndex(packageName)
 
-    def _getFolderName(self, packageName, customFolders):
+        if index == None:
+            return None
 
-        for item in customFolders.items():
-            folderName = item[0]
-            pattern = item[1]
-            if packageName == pattern or (pattern.startswith('/') and re.match(pattern[1:], packageName)):
-                return folderName
+        return folderNames[index]
 
-        return None
+    def _createGeneratedCsProjInfo(self, packageInfo, isEditor, fileIndex):
 
-    def _createGeneratedCsProjInfo(self, packageInfo, isEditor):
-
-        projId = self._createProjectGuid()
         outputDir = self._varMgr.expandPath(packageInfo.outputDirVar)
 
         csProjectName = packageInfo.name
@@ -300,12 +375,13 @@ def _createGeneratedCsProjInfo(self, packageInfo, isEditor):
         if isEditor:
             csProjectName += EditorProjectNameSuffix
 
+        projId = self._createProjectGuid(csProjectName)
+
         outputPath = os.path.join(outputDir, csProjectName + ".csproj")
 
         packageDir = os.path.join(outputDir, packageInfo.name)
 
-        files = []
-        self._addCsFilesInDirectory(packageDir, [], files, isEditor, True)
+        files = fileIndex.getFiles(packageDir, [], isEditor, True)
 
         isIgnored = (len(files) == 0 or (len(files) == 1 and os.path.basename(files[0]) == PackageConfigFileName))
 
@@ -370,8 +446,13 @@ def _createSolution(self, projects, customFolderMap):
 
         usedFolders = set()
 
+        folderNames = list(customFolderMap.keys())
+        folderMatcher = NamePatternMatcher(
+            list(customFolderMap.values()), 'SolutionFolders in {0}/{1}'.format(self._varMgr.expand('[ProjectName]'), ProjectConfigFileName))
+
         for folderName in customFolderMap:
-            folderId = self._createProjectGuid()
+            # Project names can't contain slashes so this never matches a project guid
+            folderId = self._createProjectGuid('SolutionFolder/' + folderName)
             folderIds[folderName] = folderId
 
         for proj in projects:
@@ -406,7 +487,7 @@ def _createSolution(self, projects, customFolderMap):
                 '\t\t{{{0}}}.Debug|Any CPU.ActiveCfg = {1}|Any CPU\n\t\t{{{0}}}.Debug|Any CPU.Build.0 = {1}|Any CPU' \
                 .format(proj.id, buildConfig)
 
-            folderName = self._getFolderName(proj.name, customFolderMap)
+            folderName = self._getFolderName(proj.name, folderNames, folderMatcher)
 
             if folderName:
                 usedFolders.add(folderName)
@@ -444,8 +525,7 @@ def _createSolution(self, projects, customFolderMap):
         else:
             solutionStr = solutionStr.replace('[ProjectFolderMaps]', '')
 
-        with open(outputPath, 'w', encoding='utf-8', errors='ignore') as outFile:
-            outFile.write(solutionStr)
+        self._sys.writeFileIfChanged(outputPath, solutionStr)
 
         self._log.debug('Saved new solution file at "{0}"'.format(outputPath))
 
@@ -454,140 +534,140 @@ def _createStandardCsProjInfo(self, projectName, outputDir):
         outputDir = self._varMgr.expandPath(outputDir)
         outputPath = os.path.join(outputDir, projectName + ".csproj")
 
-        projId = self._createProjectGuid()
+        projId = self._createProjectGuid(projectName)
 
         return CsProjInfo(
             projId, outputPath, projectName, [], False, None, ProjectType.Standard, None)
 
     def _initFilesForStandardCsProjForDirectory(
-        self, projInfo, excludeDirs, unityProjInfo, isEditor):
+        self, projInfo, excludeDirs, fileIndex, isEditor):
 
         outputDir = os.path.dirname(projInfo.absPath)
 
-        projInfo.files = []
-        self._addCsFilesInDirectory(outputDir, excludeDirs, projInfo.files, isEditor, False)
+        projInfo.files = fileIndex.getFiles(outputDir, excludeDirs, isEditor, False)
 
         # If it only contains the project config file then ignore it
         if len([x for x in projInfo.files if not x.endswith('.yaml')]) == 0:
             projInfo.isIgnored = True
 
-    def _writeStandardCsProjForDirectory(
-        self, projInfo, projectMap, unityProjInfo, isEditor):
-
-        if projInfo.isIgnored:
-            return
-
-        if isEditor:
-            references = unityProjInfo.referencesEditor
-        else:
-            references = unityProjInfo.references
-
-        self._writeCsProject(
-            projInfo, projectMap, projInfo.files, references, unityProjInfo.defines)
-
-    def _createProjectGuid(self):
-        return str(uuid.uuid4()).upper()
+    def _createProjectGuid(self, name):
+        """
+        Returns the same guid for the same name within the same project-platform, so that
+        regenerating the solution does not change every project file and force visual studio
+        to reload the whole solution
+        """
+        projectRoot = os.path.normcase(self._varMgr.expandPath('[ProjectPlatformRoot]'))
+        return str(uuid.uuid5(ProjectGuidNamespace, '{0}|{1}'.format(projectRoot, name))).upper()
 
     def _shouldReferenceBeCopyLocal(self, refName):
         return refName != 'System' and refName != 'System.Core'
 
-    def _writeCsProject(self, projInfo, projectMap, files, refItems, defines):
-
-        outputDir = os.path.dirname(projInfo.absPath)
-
-        doc = ET.parse(self._varMgr.expandPath('[CsProjectTemplate]'))
+    def _loadCsProjTemplate(self):
+        return CsProjTemplate(
+            self._varMgr.expandPath('[CsProjectTemplate]'), CsProjTemplatePropertyNames, CsProjTemplateItemGroupNames)
 
-        root = doc.getroot()
-        self._stripWhitespace(root)
+    def _createCsProjSettings(self, projectMap, unityProjInfo):
+        prebuiltProjectNames = set(x.name for x in projectMap.values() if x.projectType == ProjectType.Prebuilt)
 
-        refsItemGroupElem = root.findall('./{0}ItemGroup[{0}Reference]'.format(NsPrefix))[0]
-        refsItemGroupElem.clear()
+        return CsProjSettings(
+            self._loadCsProjTemplate(),
+            unityProjInfo.defines,
+            self._getReferencesForGeneratedProjects(unityProjInfo.references, prebuiltProjectNames),
+            self._getReferencesForGeneratedProjects(unityProjInfo.referencesEditor, prebuiltProjectNames),
+            self._config.tryGetString('', 'SolutionGeneration', 'RootNamespace'),
+            self._varMgr.expandPath('[ProjectPlatformRoot]/Bin'),
+            self._varMgr.expandPath('[IntermediateFilesDir]'))
 
-        prebuiltProjectInfos = [x for x in projectMap.values() if x.projectType == ProjectType.Prebuilt]
+    def _getReferencesForGeneratedProjects(self, refItems, prebuiltProjectNames):
+        result = []
 
-        # Add reference items given from unity project
         for refInfo in refItems:
-
-            if any([x for x in prebuiltProjectInfos if x.name == refInfo.name]):
+            if refInfo.name in prebuiltProjectNames:
                 self._log.debug('Ignoring reference for prebuilt project "{0}"'.format(refInfo.name))
                 continue
 
-            refElem = ET.SubElement(refsItemGroupElem, 'Reference')
-            refElem.set('Include', refInfo.name)
-
             if refInfo.hintPath:
-                refPath = refInfo.hintPath
-                assertThat(os.path.isabs(refPath), "Invalid path '{0}'".format(refPath))
+                assertThat(os.path.isabs(refInfo.hintPath), "Invalid path '{0}'".format(refInfo.hintPath))
 
-                if refPath.startswith(outputDir):
-                    refPath = os.path.relpath(refPath, outputDir)
+            result.append(refInfo)
 
-                hintPathElem = ET.SubElement(refElem, 'HintPath')
-                hintPathElem.text = refPath
+        return result
 
-            ET.SubElement(refElem, 'Private').text = 'True' if self._shouldReferenceBeCopyLocal(refInfo.name) else 'False'
+    def _writeCsProjFile(self, path, contents):
+        self._sys.makeMissingDirectoriesInPath(path)
+        self._sys.writeFileIfChanged(path, contents)
 
-        # Add cs files 'compile' items
-        filesItemGroupElem = root.findall('./{0}ItemGroup[{0}Compile]'.format(NsPrefix))[0]
-        filesItemGroupElem.clear()
+    def _renderCsProject(self, projInfo, isEditor, settings):
+        """
+        Returns the contents of the csproj file for the given project.  This is called from
+        multiple threads at once
+        """
+        outputDir = os.path.dirname(projInfo.absPath)
 
-        for filePath in files:
-            if filePath.endswith('.cs'):
-                compileElem = ET.SubElement(filesItemGroupElem, 'Compile')
-            else:
-                compileElem = ET.SubElement(filesItemGroupElem, 'None')
+        # Add reference items given from unity project
+        referenceElems = []
 
-            compileElem.set('Include', os.path.relpath(filePath, outputDir))
+        for refInfo in (settings.referencesEditor if isEditor else settings.references):
+            refChildren = []
 
-        root.findall('./{0}PropertyGroup/{0}RootNamespace'.format(NsPrefix))[0] \
-            .text = self._config.tryGetString('', 'SolutionGeneration', 'RootNamespace')
+            if refInfo.hintPath:
+                refPath = refInfo.hintPath
 
-        root.findall('./{0}PropertyGroup/{0}ProjectGuid'.format(NsPrefix))[0] \
-            .text = '{' + projInfo.id + '}'
+                if refPath.startswith(outputDir):
+                    refPath = os.path.relpath(refPath, outputDir)
 
-        root.findall('./{0}PropertyGroup/{0}OutputPath'.format(NsPrefix))[0] \
-            .text = os.path.relpath(self._varMgr.expandPath('[ProjectPlatformRoot]/Bin'), outputDir)
+                refChildren.append(CsProjElement('HintPath', text = refPath))
 
-        root.findall('./{0}PropertyGroup/{0}AssemblyName'.format(NsPrefix))[0] \
-            .text = projInfo.name
+            refChildren.append(CsProjElement('Private', text = 'True' if self._shouldReferenceBeCopyLocal(refInfo.name) else 'False'))
 
-        root.findall('./{0}PropertyGroup/{0}DefineConstants'.format(NsPrefix))[0] \
-            .text = defines
+            referenceElems.append(CsProjElement('Reference', [('Include', refInfo.name)], children = refChildren))
 
-        tempFilesDir = os.path.relpath(self._varMgr.expandPath('[IntermediateFilesDir]'), outputDir)
+        # Add cs files 'compile' items
+        fileElems = []
 
-        root.findall('./{0}PropertyGroup/{0}IntermediateOutputPath'.format(NsPrefix))[0] \
-            .text = tempFilesDir
+        # The files come from the file index, which only contains normalized paths, so most of
+        # them can skip relpath, which is slow when there are thousands of files
+        outputDirPrefix = os.path.join(outputDir, '')
 
-        root.findall('./{0}PropertyGroup/{0}BaseIntermediateOutputPath'.format(NsPrefix))[0] \
-            .text = tempFilesDir
+        for filePath in projInfo.files:
+            if filePath.startswith(outputDirPrefix):
+                relativePath = filePath[len(outputDirPrefix):]
+            else:
+                relativePath = os.path.relpath(filePath, outputDir)
+
+            fileElems.append(CsProjElement(
+                'Compile' if filePath.endswith('.cs') else 'None', [('Include', relativePath)]))
 
         # Add project references
-        projectRefGroupElem = root.findall('./{0}ItemGroup[{0}ProjectReference]'.format(NsPrefix))[0]
-        projectRefGroupElem.clear()
+        projectRefElems = []
 
         for dependInfo in projInfo.dependencies:
             if dependInfo.isIgnored:
                 continue
 
-            projectRefElem = ET.SubElement(projectRefGroupElem, 'ProjectReference')
-            projectRefElem.set('Include', os.path.relpath(dependInfo.absPath, outputDir))
-
-            ET.SubElement(projectRefElem, 'Project').text = '{' + dependInfo.id + '}'
-            ET.SubElement(projectRefElem, 'Name').text = dependInfo.name
+            projectRefElems.append(CsProjElement(
+                'ProjectReference', [('Include', settings.getRelativePath(dependInfo.absPath, outputDir))],
+                children = [CsProjElement('Project', text = '{' + dependInfo.id + '}'), CsProjElement('Name', text = dependInfo.name)]))
 
-        self._sys.makeMissingDirectoriesInPath(projInfo.absPath)
+        tempFilesDir = settings.getRelativePath(settings.intermediateFilesDir, outputDir)
 
-        with open(projInfo.absPath, 'w', encoding='utf-8', errors='ignore') as outputFile:
-            outputFile.write(self._prettify(root))
+        properties = {
+            'RootNamespace': settings.rootNamespace,
+            'ProjectGuid': '{' + projInfo.id + '}',
+            'OutputPath': settings.getRelativePath(settings.binDir, outputDir),
+            'AssemblyName': projInfo.name,
+            'DefineConstants': settings.defines,
+            'IntermediateOutputPath': tempFilesDir,
+            'BaseIntermediateOutputPath': tempFilesDir,
+        }
 
-    def _stripWhitespace(self, elem):
-        for x in ET.ElementTree(elem).getiterator():
-            if x.text: x.text = x.text.strip()
-            if x.tail: x.tail = x.tail.strip()
+        itemGroups = {
+            'Reference': referenceElems,
+            'Compile': fileElems,
+            'ProjectReference': projectRefElems,
+        }
 
-    def _prettify(self, doc):
-        return minidom.parseString(ET.tostring(doc)).toprettyxml(indent="    ")
+        return settings.template.render(properties, itemGroups)
 
     def _shouldIgnoreCsProjFile(self, fullPath):
 
@@ -597,35 +677,114 @@ def _shouldIgnoreCsProjFile(self, fullPath):
 
         return ProjenyDirectoryIgnorePattern.match(fullPath)
 
-    def _addCsFilesInDirectory(self, dirPath, excludeDirs, files, isForEditor, includeYaml):
-        isInsideEditorFolder = re.match(r'.*\\Editor($|\\).*', dirPath)
+    def _createCsFileIndex(self):
+        fileIndex = CsFileIndex()
+        assetsDir = self._varMgr.expandPath('[ProjectAssetsDir]')
 
-        if not isForEditor and isInsideEditorFolder:
-            return
+        if self._sys.directoryExists(assetsDir):
+            self._addDirectoryToCsFileIndex(assetsDir, fileIndex)
 
-        if dirPath in excludeDirs:
-            return
+        return fileIndex
 
-        #self._log.debug('Processing ' + dirPath)
+    def _addDirectoryToCsFileIndex(self, dirPath, fileIndex):
+        startIndex = len(fileIndex.files)
+        isInsideEditorFolder = EditorDirectoryPattern.match(dirPath) != None
 
-        for excludeDir in excludeDirs:
-            assertThat(not dirPath.startswith(excludeDir + "\\"))
+        with os.scandir(dirPath) as iterator:
+            entries = list(iterator)
 
-        if not self._sys.directoryExists(dirPath):
-            return
+        for entry in entries:
+            if self._shouldIgnoreCsProjFile(entry.path):
+                continue
 
-        for itemName in os.listdir(dirPath):
-            fullPath = os.path.join(dirPath, itemName)
+            # Note that this follows the links to the packages
+            if entry.is_dir():
+                self._addDirectoryToCsFileIndex(entry.path, fileIndex)
+            elif entry.name.endswith(CsProjFileExtensions):
+                fileIndex.files.append(CsFileInfo(entry.path, entry.name, isInsideEditorFolder))
 
-            if self._shouldIgnoreCsProjFile(fullPath):
-                continue
+        fileIndex.dirRanges[dirPath] = (startIndex, len(fileIndex.files))
 
-            if os.path.isdir(fullPath):
-                self._addCsFilesInDirectory(fullPath, excludeDirs, files, isForEditor, includeYaml)
-            else:
-                if itemName.endswith('.cs') or itemName.endswith('.txt') or (includeYaml and itemName.endswith('.yaml')):
-                    if not isForEditor or isInsideEditorFolder or itemName == PackageConfigFileName:
-                        files.append(fullPath)
+class CsFileInfo:
+    def __init__(self, path, name, isInsideEditorFolder):
+        self.path = path
+        self.name = name
+        self.isInsideEditorFolder = isInsideEditorFolder
+
+    def shouldInclude(self, isForEditor, includeYaml):
+        if not includeYaml and self.name.endswith('.yaml'):
+            return False
+
+        if isForEditor:
+            return self.isInsideEditorFolder or self.name == PackageConfigFileName
+
+        return not self.isInsideEditorFolder
+
+class CsFileIndex:
+    """
+    The files below a directory that can be added to a C# project, in depth first order.  The
+    files below any directory are a contiguous range of this list, so getting the files of a
+    project does not depend on how many other files there are
+    """
+    def __init__(self):
+        # List of CsFileInfo
+        self.files = []
+        # Directory path -> (start, end) range in files
+        self.dirRanges = {}
+
+    def getFiles(self, dirPath, excludeDirs, isForEditor, includeYaml):
+        """
+        Returns the paths of the files below dirPath that are not below any of excludeDirs
+        """
+        if dirPath in excludeDirs or dirPath not in self.dirRanges:
+            return []
+
+        startIndex, endIndex = self.dirRanges[dirPath]
+
+        excludedRanges = sorted(
+            self.dirRanges[x] for x in excludeDirs if x in self.dirRanges and x.startswith(dirPath + os.sep))
+
+        result = []
+
+        for excludeStart, excludeEnd in excludedRanges + [(endIndex, endIndex)]:
+            # Nested excluded directories have ranges inside the previous one, so they result in empty slices here
+            for info in self.files[startIndex:excludeStart]:
+                if info.shouldInclude(isForEditor, includeYaml):
+                    result.append(info.path)
+
+            startIndex = max(startIndex, excludeEnd)
+
+        return result
+
+class CsProjSettings:
+    """
+    Everything that is shared between the generated csproj files of a solution
+    """
+    def __init__(self, template, defines, references, referencesEditor, rootNamespace, binDir, intermediateFilesDir):
+        self.template = template
+        self.defines = defines
+        # Lists of RefInfo, without the references to prebuilt projects
+        self.references = references
+        self.referencesEditor = referencesEditor
+        self.rootNamespace = rootNamespace
+        self.binDir = binDir
+        self.intermediateFilesDir = intermediateFilesDir
+        # (path, start directory) -> relative path
+        self._relativePaths = {}
+
+    def getRelativePath(self, path, startDir):
+        """
+        Same as os.path.relpath.  Most generated projects are in the same few directories and
+        reference the same projects, so this is usually just a lookup
+        """
+        key = (path, startDir)
+        result = self._relativePaths.get(key)
+
+        if result == None:
+            result = os.path.relpath(path, startDir)
+            self._relativePaths[key] = result
+
+        return result
 
 class RefInfo:
     def __init__(self, name, hintPath):
@@ -638,6 +797,16 @@ def __init__(self, defines, references, referencesEditor):
         self.references = references
         self.referencesEditor = referencesEditor
 
+class UnityGeneratedProjCache:
+    def __init__(self, key, info):
+        self.version = UnityProjectCacheVersion
+        # The paths and (modification time, size) of the unity projects that info was read from
+        self.key = key
+        self.info = info
+
+def _getHintPaths(unityProjInfo):
+    return set(x.hintPath for x in unityProjInfo.references + unityProjInfo.referencesEditor if x.hintPath)
+
 class ProjectType:
     Prebuilt = 1
     Custom = 2
@@ -0,0 +1,47 @@
+import os
+import shutil
+import tempfile
+import argparse
+
+import mtm.ioc.Container as Container
+
+from mtm.util.Assert import *
+
+import prj.main.SchemaBenchmark as SchemaBenchmark
+from prj.main.SchemaBenchmark import WorkspaceGenerator, addArguments
+
+class SchemaWorkspace:
+    """
+    A synthetic project and set of packages (see SchemaBenchmark) that is written to a temporary
+    directory, for tests that need to load real schemas
+    """
+    def __init__(self, packageCount):
+        self.rootDir = os.path.realpath(tempfile.mkdtemp())
+
+        parser = argparse.ArgumentParser()
+        addArguments(parser)
+        args = parser.parse_args(['--packages', str(packageCount), '--depth', '5', '--seed', '3'])
+
+        WorkspaceGenerator(args).generate(self.rootDir)
+
+    def remove(self):
+        shutil.rmtree(self.rootDir)
+
+    def installBindings(self):
+        """
+        Resets the container with the bindings needed to load the schema
+        """
+        SchemaBenchmark.installBindings(self.rootDir, False)
+
+    def createLoader(self):
+        self.installBindings()
+        return Container.resolve('ProjectSchemaLoader')
+
+    def findPackageConfig(self, packageName):
+        for folderName in os.listdir(self.rootDir):
+            path = os.path.join(self.rootDir, folderName, packageName, 'ProjenyPackage.yaml')
+
+            if os.path.isfile(path):
+                return path
+
+        assertThat(False, "Could not find package '{0}'", packageName)
@@ -0,0 +1,69 @@
+import unittest
+
+from mtm.util.Assert import *
+
+from prj.main.ProjectSchemaLoader import SchemaDiff
+from prj.main.SchemaBenchmark import ProjectName
+from prj.main.tests.SchemaWorkspace import SchemaWorkspace
+
+class TestIncrementalSchemaUpdate(unittest.TestCase):
+    def setUp(self):
+        self._workspace = SchemaWorkspace(200)
+
+    def tearDown(self):
+        self._workspace.remove()
+
+    def _createLoader(self):
+        return self._workspace.createLoader()
+
+    def _findPackageConfig(self, packageName):
+        return self._workspace.findPackageConfig(packageName)
+
+    def _getState(self, schema):
+        return {x.name: (x.isPluginDir, sorted(x.allDependencies), sorted(x.explicitDependencies)) for x in schema.packages.values()}
+
+    def testMatchesFullReload(self):
+        previousSchema = self._createLoader().loadSchema(ProjectName, 'Windows')
+
+        # Packages are numbered by dependency layer, so a dependency on a later package never creates a cycle
+        configPath = self._findPackageConfig('Package00050')
+
+        with open(configPath, 'a') as f:
+            f.write('\nExtras:\n    - Package00199\nForceAssetsDirectory: True\n')
+
+        schema, diff = self._createLoader().updateSchema(previousSchema, [configPath])
+        expectedSchema = self._createLoader().loadSchema(ProjectName, 'Windows')
+
+        assertIsEqual(self._getState(schema), self._getState(expectedSchema))
+
+        expectedDiff = SchemaDiff.create(previousSchema, expectedSchema)
+        assertThat(not diff.isEmpty)
+        assertIsEqual(diff.changedPackages, expectedDiff.changedPackages)
+        assertIsEqual(sorted(diff.addedPackages), sorted(expectedDiff.addedPackages))
+
+    def testPackageRemovedFromSchema(self):
+        previousSchema = self._createLoader().loadSchema(ProjectName, 'Windows')
+
+        # Limiting a package to another platform removes it from the schema, which changes the
+        # dependency lists of every package that depends on it
+        configPath = self._findPackageConfig('Package00040')
+
+        with open(configPath, 'a') as f:
+            f.write('Platforms:\n    - Android\n')
+
+        schema, diff = self._createLoader().updateSchema(previousSchema, [configPath])
+        expectedSchema = self._createLoader().loadSchema(ProjectName, 'Windows')
+
+        assertThat('Package00040' in previousSchema.packages and 'Package00040' not in schema.packages)
+        assertIsEqual(self._getState(schema), self._getState(expectedSchema))
+        assertIsEqual(diff.changedPackages, SchemaDiff.create(previousSchema, expectedSchema).changedPackages)
+
+    def testUnchangedFilesGiveEmptyDiff(self):
+        previousSchema = self._createLoader().loadSchema(ProjectName, 'Windows')
+
+        _, diff = self._createLoader().updateSchema(previousSchema, [self._findPackageConfig('Package00010')])
+
+        assertThat(diff.isEmpty)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import mtm.ioc.Container as Container
+
+import mtm.util.UnitTestUtil as UnitTestUtil
+import mtm.util.YamlSerializer as YamlSerializer
+
+from mtm.util.Assert import *
+
+from prj.main.PackageFolderIndex import IndexedPackageFolder
+from prj.main.ProjenyConstants import InstallInfoFileName
+from prj.main.InstalledPackageIndex import InstalledPackageIndex
+from prj.reg.PackageInfo import PackageInstallInfo
+
+class TestInstalledPackageIndex(unittest.TestCase):
+    def setUp(self):
+        self._tempDir = os.path.realpath(tempfile.mkdtemp())
+        self._folderPath = os.path.join(self._tempDir, 'UnityPackages')
+
+        for name in ['A', 'B', 'C']:
+            os.makedirs(os.path.join(self._folderPath, name))
+
+        self._writeInstallInfo('A', 'id-a')
+        self._writeInstallInfo('B', 'id-b')
+
+        UnitTestUtil.installBindings(pathVars = {'ProjenyCacheDir': os.path.join(self._tempDir, 'Cache')})
+        Container.bind('InstalledPackageIndex').toSingle(InstalledPackageIndex)
+
+    def tearDown(self):
+        shutil.rmtree(self._tempDir)
+
+    def _createInstallInfo(self, releaseId):
+        installInfo = PackageInstallInfo()
+        installInfo.installDate = datetime(2016, 1, 1)
+        installInfo.releaseInfo = releaseId
+        return installInfo
+
+    def _writeInstallInfo(self, packageName, releaseId):
+        with open(os.path.join(self._folderPath, packageName, InstallInfoFileName), 'w') as f:
+            f.write(YamlSerializer.serialize(self._createInstallInfo(releaseId)))
+
+    def _getInstallInfos(self):
+        """
+        Returns the install infos together with the number of install files that were read
+        """
+        index = Container.resolve('InstalledPackageIndex')
+
+        with mock.patch.object(YamlSerializer, 'deserialize', wraps = YamlSerializer.deserialize) as deserialize:
+            infos = index.getInstallInfos(IndexedPackageFolder(self._folderPath, self._folderPath))
+
+        return {x: y.releaseInfo for x, y in infos.items()}, deserialize.call_count
+
+    def testOnlyChangedFilesAreRead(self):
+        assertIsEqual(self._getInstallInfos(), ({'A': 'id-a', 'B': 'id-b'}, 2))
+        assertIsEqual(self._getInstallInfos(), ({'A': 'id-a', 'B': 'id-b'}, 0))
+
+        self._writeInstallInfo('C', 'id-c2')
+        shutil.rmtree(os.path.join(self._folderPath, 'A'))
+
+        assertIsEqual(self._getInstallInfos(), ({'B': 'id-b', 'C': 'id-c2'}, 1))
+
+    def testUpdatePackage(self):
+        self._getInstallInfos()
+
+        self._writeInstallInfo('C', 'id-c')
+        Container.resolve('InstalledPackageIndex').updatePackage(self._folderPath, 'C', self._createInstallInfo('id-c'))
+
+        assertIsEqual(self._getInstallInfos(), ({'A': 'id-a', 'B': 'id-b', 'C': 'id-c'}, 0))
+
+if __name__ == '__main__':
+    unittest.main()
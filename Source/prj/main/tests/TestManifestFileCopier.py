@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import mtm.ioc.Container as Container
+
+import mtm.util.UnitTestUtil as UnitTestUtil
+
+from mtm.util.Assert import *
+
+import prj.main.ManifestFileCopier as ManifestFileCopierModule
+from prj.main.ManifestFileCopier import ManifestFileCopier
+
+class TestManifestFileCopier(unittest.TestCase):
+    def setUp(self):
+        self._tempDir = os.path.realpath(tempfile.mkdtemp())
+
+        self._writeFile('Source/Projeny.dll', 'dll')
+        self._writeFile('Source/Assets/Icon.png', 'icon')
+
+        UnitTestUtil.installBindings(pathVars = {'ProjenyCacheDir': os.path.join(self._tempDir, 'Cache')})
+        Container.bind('ManifestFileCopier').toSingle(ManifestFileCopier)
+
+    def tearDown(self):
+        shutil.rmtree(self._tempDir)
+
+    def _getPath(self, relativePath):
+        return os.path.join(self._tempDir, relativePath)
+
+    def _writeFile(self, relativePath, contents):
+        path = self._getPath(relativePath)
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+
+        with open(path, 'w') as f:
+            f.write(contents)
+
+    def _copy(self):
+        copier = Container.resolve('ManifestFileCopier')
+
+        fileMap = copier.getDirectoryFileMap(self._getPath('Source/Assets'), self._getPath('Dest/Assets'))
+        fileMap[self._getPath('Dest/Projeny.dll')] = self._getPath('Source/Projeny.dll')
+
+        return copier.copyFiles(fileMap, '[ProjenyCacheDir]/Manifest.pickle')
+
+    def testOnlyChangedFilesAreCopied(self):
+        assertIsEqual(self._copy(), 2)
+        assertThat(os.path.isfile(self._getPath('Dest/Assets/Icon.png')))
+
+        assertIsEqual(self._copy(), 0)
+
+        # Rebuilding with identical contents should not cause a copy
+        self._writeFile('Source/Projeny.dll', 'dll')
+        assertIsEqual(self._copy(), 0)
+
+        self._writeFile('Source/Projeny.dll', 'dll2')
+        assertIsEqual(self._copy(), 1)
+
+        os.remove(self._getPath('Dest/Assets/Icon.png'))
+        assertIsEqual(self._copy(), 1)
+
+    def testRefreshedStampsAreSaved(self):
+        self._copy()
+
+        # Rebuilding with identical contents changes the stamp, which should only need to be hashed once
+        os.utime(self._getPath('Source/Projeny.dll'), ns = (0, 0))
+        assertIsEqual(self._copy(), 0)
+
+        with mock.patch.object(ManifestFileCopierModule, '_getFileHash') as hashMock:
+            assertIsEqual(self._copy(), 0)
+            assertIsEqual(hashMock.call_count, 0)
+
+    def testRemovedFilesAreDeleted(self):
+        self._copy()
+
+        os.remove(self._getPath('Source/Assets/Icon.png'))
+
+        assertIsEqual(self._copy(), 0)
+        assertThat(not os.path.exists(self._getPath('Dest/Assets/Icon.png')))
+        assertThat(os.path.isfile(self._getPath('Dest/Projeny.dll')))
+
+    def testCopiesAreCountedInWriteStats(self):
+        sys = Container.resolve('SystemHelper')
+
+        self._copy()
+        assertIsEqual((sys.writtenFileCount, sys.skippedWriteCount), (2, 0))
+
+        self._writeFile('Source/Projeny.dll', 'dll2')
+        self._copy()
+        assertIsEqual((sys.writtenFileCount, sys.skippedWriteCount), (3, 1))
+
+if __name__ == '__main__':
+    unittest.main()
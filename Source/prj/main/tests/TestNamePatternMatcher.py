@@ -0,0 +1,46 @@
+import unittest
+
+from mtm.util.Assert import *
+
+from prj.main.NamePatternMatcher import NamePatternMatcher
+
+class TestNamePatternMatcher(unittest.TestCase):
+    def testExactNamesAndRegexes(self):
+        matcher = NamePatternMatcher(['Foo', '/Bar.*', '/.*Qux$'], 'test')
+
+        assertThat(matcher.matches('Foo'))
+        assertThat(not matcher.matches('Foo2'))
+        assertThat(matcher.matches('BarBaz'))
+        assertThat(matcher.matches('MyQux'))
+        # Regexes are matched from the start of the name only, same as re.match
+        assertThat(not matcher.matches('MyBar'))
+
+    def testFirstPatternWins(self):
+        matcher = NamePatternMatcher(['/Zen.*', 'ZenA', '/.*', 'Other'], 'test')
+
+        assertIsEqual(matcher.tryGetMatchIndex('ZenA'), 0)
+        assertIsEqual(matcher.tryGetMatchIndex('Other'), 2)
+
+        matcher = NamePatternMatcher(['Other', '/O.*', '/.*'], 'test')
+
+        assertIsEqual(matcher.tryGetMatchIndex('Other'), 0)
+        assertIsEqual(matcher.tryGetMatchIndex('Ox'), 1)
+        assertIsEqual(matcher.tryGetMatchIndex('x'), 2)
+
+    def testPatternsThatCannotBeCombined(self):
+        matcher = NamePatternMatcher(['/(?i)foo', '/(a)\\1', '/(?P<x>b)c'], 'test')
+
+        assertIsEqual(matcher.tryGetMatchIndex('FOO'), 0)
+        assertIsEqual(matcher.tryGetMatchIndex('aa'), 1)
+        assertIsEqual(matcher.tryGetMatchIndex('ab'), None)
+        assertIsEqual(matcher.tryGetMatchIndex('bc'), 2)
+
+    def testInvalidPatternNamesSource(self):
+        with self.assertRaises(Exception) as context:
+            NamePatternMatcher(['Foo', '/Bar('], 'SolutionProjects in Test/ProjenyProject.yaml')
+
+        assertThat('/Bar(' in str(context.exception))
+        assertThat('Test/ProjenyProject.yaml' in str(context.exception))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+
+import mtm.util.UnitTestUtil as UnitTestUtil
+
+from mtm.util.Assert import *
+
+from prj.main.ProjectSchemaLoader import ProjectSchemaLoader, PackageInfo, FolderTypes
+from prj.main.DependencyGraph import DependencyGraph
+
+ChainLength = 5000
+
+class CountingDependencyGraph(DependencyGraph):
+    def __init__(self):
+        DependencyGraph.__init__(self)
+        self.lookupCount = 0
+
+    def getDependents(self, name):
+        self.lookupCount += 1
+        return DependencyGraph.getDependents(self, name)
+
+class TestPackagePlacementRules(unittest.TestCase):
+    def setUp(self):
+        UnitTestUtil.installBindings()
+
+    def _createChain(self):
+        # P0 -> P1 -> ... -> P4999, where every package starts out in the plugins folder
+        packageMap = {}
+
+        for i in range(ChainLength):
+            dependencies = ['P{0}'.format(i+1)] if i < ChainLength - 1 else []
+            name = 'P{0}'.format(i)
+            packageMap[name] = PackageInfo(True, name, None, False, dependencies, False, FolderTypes.Normal, None, None, [])
+
+        graph = CountingDependencyGraph()
+
+        for info in packageMap.values():
+            for dependName in info.explicitDependencies:
+                graph.addDependency(info.name, dependName)
+
+        return packageMap, graph
+
+    def testPluginsMovedToAssetsInLinearTime(self):
+        packageMap, graph = self._createChain()
+        packageMap['P{0}'.format(ChainLength-1)].isPluginDir = False
+
+        ProjectSchemaLoader()._ensurePluginPackagesDoNotHaveDependenciesInAssets(packageMap, graph)
+
+        assertThat(not any(x.isPluginDir for x in packageMap.values()))
+        assertThat(graph.lookupCount <= ChainLength, 'Expected at most {0} lookups but found {1}', ChainLength, graph.lookupCount)
+
+    def testVsProjectsPropagateInLinearTime(self):
+        packageMap, graph = self._createChain()
+        packageMap['P{0}'.format(ChainLength-1)].createCustomVsProject = True
+
+        ProjectSchemaLoader()._ensurePackagesThatAreNotProjectsDoNotHaveProjectDependencies(packageMap, graph)
+
+        assertThat(all(x.createCustomVsProject for x in packageMap.values()))
+        assertThat(graph.lookupCount <= ChainLength, 'Expected at most {0} lookups but found {1}', ChainLength, graph.lookupCount)
+
+    def testUnrelatedPackagesAreNotMoved(self):
+        packageMap, graph = self._createChain()
+        packageMap['P10'].isPluginDir = False
+
+        ProjectSchemaLoader()._ensurePluginPackagesDoNotHaveDependenciesInAssets(packageMap, graph)
+
+        assertThat(all(not packageMap['P{0}'.format(i)].isPluginDir for i in range(11)))
+        assertThat(all(packageMap['P{0}'.format(i)].isPluginDir for i in range(11, ChainLength)))
+
+if __name__ == '__main__':
+    unittest.main()
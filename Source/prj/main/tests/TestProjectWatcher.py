@@ -0,0 +1,198 @@
+import os
+import unittest
+
+import mtm.ioc.Container as Container
+from mtm.ioc.Inject import Inject
+
+from mtm.util.Assert import *
+
+from prj.main.ProjectWatcher import ProjectWatcher
+from prj.main.SchemaBenchmark import ProjectName
+from prj.main.tests.SchemaWorkspace import SchemaWorkspace
+
+class PackageManagerStub:
+    _varMgr = Inject('VarManager')
+
+    def __init__(self, solutionPath):
+        self.updatedPlatforms = []
+        self._solutionPath = solutionPath
+
+    def setPathsForProject(self, projectName):
+        pass
+
+    def getProjectPlatformContext(self, projectName, platform):
+        return self._varMgr.withOverrides({'SolutionPath': self._solutionPath})
+
+    def updateProjectJunctions(self, projectName, platform, schema):
+        self.updatedPlatforms.append(platform)
+
+class SolutionGeneratorStub:
+    def __init__(self):
+        self.updatedPlatforms = []
+
+    def updateVisualStudioSolution(self, projectName, platform, schema):
+        self.updatedPlatforms.append(platform)
+
+class TestProjectWatcher(unittest.TestCase):
+    def setUp(self):
+        self._workspace = SchemaWorkspace(100)
+        self._workspace.installBindings()
+
+        self._rootDir = self._workspace.rootDir
+
+        self._solutionPath = os.path.join(self._rootDir, 'Benchmark.sln')
+
+        Container.bind('PackageManager').toSingle(PackageManagerStub, self._solutionPath)
+        Container.bind('VisualStudioSolutionGenerator').toSingle(SolutionGeneratorStub)
+        Container.bind('ProjectWatcher').toSingle(ProjectWatcher)
+
+        self._watcher = Container.resolve('ProjectWatcher')
+        self._watcher.start(ProjectName, ['Windows'])
+
+    def tearDown(self):
+        self._watcher.stop()
+        self._workspace.remove()
+
+    def _getPackageDir(self, packageName):
+        return self._watcher.schemas['Windows'].packages[packageName].dirPath
+
+    def _waitForUpdates(self):
+        return self._watcher.waitAndProcessChanges(5)
+
+    def testPackageConfigChange(self):
+        configPath = os.path.join(self._getPackageDir('Package00010'), 'ProjenyPackage.yaml')
+
+        with open(configPath, 'r') as f:
+            contents = f.read()
+
+        # Packages are numbered by dependency layer, so a dependency on a later package never creates a cycle
+        with open(configPath, 'w') as f:
+            f.write(contents.replace('Dependencies:\n', 'Dependencies:\n    - Package00098\n'))
+
+        updates = self._waitForUpdates()
+
+        assertIsEqual([x.platform for x in updates], ['Windows'])
+        assertThat(updates[0].updatedLinks and not updates[0].updatedSolution)
+        assertThat('Package00010' in updates[0].diff.changedPackages)
+        assertIsEqual(Container.resolve('PackageManager').updatedPlatforms, ['Windows'])
+
+    def testScriptChangesOnlyUpdateSolution(self):
+        with open(self._solutionPath, 'w') as f:
+            f.write('')
+
+        # Files other than scripts and configs are ignored
+        with open(os.path.join(self._getPackageDir('Package00010'), 'ReadMe.txt'), 'w') as f:
+            f.write('')
+
+        assertIsEqual(self._waitForUpdates(), [])
+
+        os.makedirs(os.path.join(self._getPackageDir('Package00010'), 'Scripts'))
+
+        with open(os.path.join(self._getPackageDir('Package00010'), 'Scripts', 'Foo.cs'), 'w') as f:
+            f.write('')
+
+        updates = self._waitForUpdates()
+
+        assertIsEqual(len(updates), 1)
+        assertThat(updates[0].updatedSolution and not updates[0].updatedLinks)
+        assertIsEqual(Container.resolve('PackageManager').updatedPlatforms, [])
+
+    def testEditingScriptsDoesNotUpdateSolution(self):
+        with open(self._solutionPath, 'w') as f:
+            f.write('')
+
+        with open(os.path.join(self._getPackageDir('Package00010'), 'Package00010.cs'), 'w') as f:
+            f.write('class Package00010 {}')
+
+        assertIsEqual(self._waitForUpdates(), [])
+
+    def testMovingScriptsUpdatesSolution(self):
+        with open(self._solutionPath, 'w') as f:
+            f.write('')
+
+        scriptsDir = os.path.join(self._getPackageDir('Package00010'), 'Scripts')
+        os.makedirs(scriptsDir)
+
+        with open(os.path.join(scriptsDir, 'Foo.cs'), 'w') as f:
+            f.write('')
+
+        assertIsEqual(len(self._waitForUpdates()), 1)
+
+        # Only the directory itself is reported when it is moved away
+        os.rename(scriptsDir, os.path.join(self._rootDir, 'Scripts'))
+
+        updates = self._waitForUpdates()
+
+        assertIsEqual(len(updates), 1)
+        assertThat(updates[0].updatedSolution)
+
+    def testMovingPackagesInAddsScripts(self):
+        packageDir = os.path.join(self._rootDir, 'NewPackage')
+        os.makedirs(os.path.join(packageDir, 'Scripts'))
+
+        with open(os.path.join(packageDir, 'Scripts', 'NewPackage.cs'), 'w') as f:
+            f.write('')
+
+        packageFolder = os.path.dirname(self._getPackageDir('Package00010'))
+        os.rename(packageDir, os.path.join(packageFolder, 'NewPackage'))
+
+        # The package is not part of the schema so nothing is updated, but its scripts must be known
+        # so that the solution is updated once they are removed
+        assertIsEqual(self._waitForUpdates(), [])
+
+        scriptPath = os.path.join(packageFolder, 'NewPackage', 'Scripts', 'NewPackage.cs')
+        assertThat(os.path.normcase(scriptPath) in self._watcher._scriptPaths)
+
+    def testMovingDirectoriesIntoPackagesUpdatesSolution(self):
+        with open(self._solutionPath, 'w') as f:
+            f.write('')
+
+        scriptsDir = os.path.join(self._rootDir, 'Scripts')
+        os.makedirs(scriptsDir)
+
+        with open(os.path.join(scriptsDir, 'Foo.cs'), 'w') as f:
+            f.write('')
+
+        os.rename(scriptsDir, os.path.join(self._getPackageDir('Package00010'), 'Scripts'))
+
+        updates = self._waitForUpdates()
+
+        assertIsEqual(len(updates), 1)
+        assertThat(updates[0].updatedSolution and not updates[0].updatedLinks)
+
+    def testProjectConfigChangeWatchesNewPackageFolders(self):
+        packageFolder = os.path.join(self._rootDir, 'ExtraPackages')
+        packageDir = os.path.join(packageFolder, 'ExtraPackage')
+        os.makedirs(packageDir)
+
+        configPath = os.path.join(packageDir, 'ProjenyPackage.yaml')
+
+        with open(configPath, 'w') as f:
+            f.write('')
+
+        projectConfigPath = os.path.join(self._rootDir, 'UnityProjects', ProjectName, 'ProjenyProject.yaml')
+
+        with open(projectConfigPath, 'r') as f:
+            contents = f.read()
+
+        with open(projectConfigPath, 'w') as f:
+            f.write(contents
+                .replace('PackageFolders:\n', "PackageFolders:\n    - '{0}'\n".format(packageFolder))
+                .replace('AssetsFolder:\n', 'AssetsFolder:\n    - ExtraPackage\n'))
+
+        updates = self._waitForUpdates()
+
+        assertIsEqual(len(updates), 1)
+        assertThat('ExtraPackage' in updates[0].diff.addedPackages)
+
+        # Changes inside the new package folder are only seen if it is watched
+        with open(configPath, 'w') as f:
+            f.write('Dependencies:\n    - Package00099\n')
+
+        updates = self._waitForUpdates()
+
+        assertIsEqual(len(updates), 1)
+        assertThat('ExtraPackage' in updates[0].diff.changedPackages)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import mtm.ioc.Container as Container
+
+import mtm.util.UnitTestUtil as UnitTestUtil
+
+from mtm.util.Assert import *
+
+from prj.main.ProjectSchemaCache import ProjectSchemaCache
+from prj.main.ScriptFileScanner import ScriptFileScanner
+
+class TestScriptFileScanner(unittest.TestCase):
+    def setUp(self):
+        self._tempDir = tempfile.mkdtemp()
+        self._packageDir = os.path.join(self._tempDir, 'Package')
+        os.makedirs(os.path.join(self._packageDir, 'Bin'))
+        os.makedirs(os.path.join(self._packageDir, 'obj', 'Debug'))
+        os.makedirs(os.path.join(self._packageDir, 'Data', 'Nested'))
+
+        self._writeFile('Package/obj/Debug/AssemblyAttributes.cs')
+        self._writeFile('Package/Bin/Generated.cs')
+        self._writeFile('Package/Data/Nested/Foo.cs.meta')
+        self._writeFile('Package/Data/Nested/Foo.dll')
+
+        self._installBindings()
+
+    def tearDown(self):
+        shutil.rmtree(self._tempDir)
+
+    def _installBindings(self):
+        UnitTestUtil.installBindings(pathVars = {'ProjenyCacheDir': os.path.join(self._tempDir, 'Cache')})
+        Container.bind('ProjectSchemaCache').toSingle(ProjectSchemaCache)
+        Container.bind('ScriptFileScanner').toSingle(ScriptFileScanner)
+
+    def _writeFile(self, relativePath):
+        with open(os.path.join(self._tempDir, relativePath), 'w') as f:
+            f.write('')
+
+    def testIgnoresBuildOutputAndMetaFiles(self):
+        scanner = Container.resolve('ScriptFileScanner')
+        assertThat(not scanner.hasScripts(self._packageDir))
+
+    def testCachedResultIsInvalidatedByNewScript(self):
+        scanner = Container.resolve('ScriptFileScanner')
+        assertThat(not scanner.hasScripts(self._packageDir))
+        scanner.saveCache()
+
+        # Simulate a new run that only has the cache file
+        self._installBindings()
+        scanner = Container.resolve('ScriptFileScanner')
+
+        assertThat(not scanner.hasScripts(self._packageDir))
+
+        self._writeFile('Package/Data/Nested/Bar.cs')
+        stat = os.stat(os.path.join(self._packageDir, 'Data', 'Nested'))
+        # Make sure the change is visible even on file systems with coarse timestamps
+        os.utime(os.path.join(self._packageDir, 'Data', 'Nested'), ns = (stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+
+        assertThat(scanner.hasScripts(self._packageDir))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+import os
+import shutil
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+from unittest import mock
+
+import mtm.ioc.Container as Container
+
+import mtm.util.UnitTestUtil as UnitTestUtil
+
+from mtm.util.Assert import *
+
+from prj.main.ProjectSchemaCache import ProjectSchemaCache
+from prj.main.VisualStudioSolutionGenerator import VisualStudioSolutionGenerator, CsProjInfo, RefInfo, ProjectType, UnityGeneratedProjInfo
+
+ScriptDir = os.path.dirname(os.path.realpath(__file__))
+
+class TestVisualStudioSolutionGenerator(unittest.TestCase):
+    def setUp(self):
+        self._tempDir = os.path.realpath(tempfile.mkdtemp())
+
+        UnitTestUtil.installBindings({'SolutionGeneration': {'RootNamespace': 'Game'}}, {
+            'ProjectPlatformRoot': os.path.join(self._tempDir, 'Project'),
+            'ProjectAssetsDir': '[ProjectPlatformRoot]/Assets',
+            'PluginsDir': '[ProjectAssetsDir]/Plugins',
+            'IntermediateFilesDir': '[ProjectPlatformRoot]/obj',
+            'ProjenyCacheDir': os.path.join(self._tempDir, 'Cache'),
+            'ProjectName': 'Project',
+            'ShortPlatform': 'Win',
+            'UnityGeneratedProjectPath': '[ProjectPlatformRoot]/Project-Win.CSharp.Plugins.csproj',
+            'UnityGeneratedProjectPath2': '[ProjectPlatformRoot]/Assembly-CSharp-firstpass.csproj',
+            'UnityGeneratedProjectPath3': '[ProjectPlatformRoot]/Project-Windows.Plugins.csproj',
+            'UnityGeneratedProjectEditorPath': '[ProjectPlatformRoot]/Project-Win.CSharp.Editor.Plugins.csproj',
+            'UnityGeneratedProjectEditorPath2': '[ProjectPlatformRoot]/Assembly-CSharp-Editor-firstpass.csproj',
+            'UnityGeneratedProjectEditorPath3': '[ProjectPlatformRoot]/Project-Windows.Editor.Plugins.csproj',
+            'CsProjectTemplate': os.path.join(ScriptDir, '../../../../Templates/CsProjectTemplate.csproj')})
+        Container.bind('ProjectSchemaCache').toSingle(ProjectSchemaCache)
+        Container.bind('VisualStudioSolutionGenerator').toSingle(VisualStudioSolutionGenerator)
+
+    def tearDown(self):
+        shutil.rmtree(self._tempDir)
+
+    def _getPath(self, relativePath):
+        return os.path.join(self._tempDir, relativePath)
+
+    def _writeFile(self, relativePath, contents = ''):
+        path = self._getPath(relativePath)
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+
+        with open(path, 'w') as f:
+            f.write(contents)
+
+    def _writeUnityProject(self, relativePath, references):
+        referencesText = ''.join(
+            '<Reference Include="{0}"><HintPath>{1}</HintPath></Reference>'.format(name, hintPath) for name, hintPath in references)
+
+        self._writeFile(relativePath,
+            '<Project xmlns="http://schemas.microsoft.com/developer/msbuild/2003">'
+            '<PropertyGroup><DefineConstants>UNITY_5;DEBUG</DefineConstants></PropertyGroup>'
+            '<ItemGroup><Reference Include="System" />' + referencesText + '</ItemGroup></Project>')
+
+    def _getRelativePaths(self, paths):
+        return sorted(os.path.relpath(x, self._getPath('Project/Assets')) for x in paths)
+
+    def testFileIndex(self):
+        self._writeFile('Project/Assets/Main.cs')
+        self._writeFile('Project/Assets/Icon.png')
+        self._writeFile('Project/Assets/Plugins/Plugin.cs')
+        self._writeFile('Project/Assets/Plugins/Settings.yaml')
+        self._writeFile('Source/Package1/Package1.cs')
+        self._writeFile('Source/Package1/ProjenyPackage.yaml')
+
+        os.symlink(self._getPath('Source/Package1'), self._getPath('Project/Assets/Plugins/Package1'), target_is_directory = True)
+
+        generator = Container.resolve('VisualStudioSolutionGenerator')
+        fileIndex = generator._createCsFileIndex()
+
+        assetsDir = self._getPath('Project/Assets')
+        pluginsDir = self._getPath('Project/Assets/Plugins')
+        packageDir = self._getPath('Project/Assets/Plugins/Package1')
+
+        assertIsEqual(
+            self._getRelativePaths(fileIndex.getFiles(packageDir, [], False, True)),
+            ['Plugins/Package1/Package1.cs', 'Plugins/Package1/ProjenyPackage.yaml'])
+
+        assertIsEqual(
+            self._getRelativePaths(fileIndex.getFiles(pluginsDir, [packageDir], False, False)),
+            ['Plugins/Plugin.cs'])
+
+        assertIsEqual(
+            self._getRelativePaths(fileIndex.getFiles(assetsDir, [packageDir, pluginsDir], False, False)),
+            ['Main.cs'])
+
+        assertIsEqual(fileIndex.getFiles(pluginsDir, [pluginsDir], False, False), [])
+        assertIsEqual(fileIndex.getFiles(self._getPath('Project/Missing'), [], False, False), [])
+
+    def _createProject(self, name, files, dependencies):
+        projInfo = CsProjInfo(
+            'D3F1C8B2-1111-2222-3333-' + name.upper().ljust(12, '0')[:12], self._getPath('Project/Assets/Plugins/{0}.csproj'.format(name)),
+            name, [self._getPath('Project/Assets/Plugins/' + x) for x in files], False, None, ProjectType.Custom, None)
+
+        projInfo.dependencies = dependencies
+        return projInfo
+
+    def _renderCsProject(self, projInfo, projectMap, refItems, defines):
+        generator = Container.resolve('VisualStudioSolutionGenerator')
+        settings = generator._createCsProjSettings(projectMap, UnityGeneratedProjInfo(defines, refItems, []))
+
+        return generator._renderCsProject(projInfo, False, settings)
+
+    def _assertMatchesExpected(self, actualText, expectedFileName):
+        with open(os.path.join(ScriptDir, expectedFileName), 'r', encoding = 'utf-8') as f:
+            expectedText = f.read()
+
+        # The expected files were generated with forward slashes in the relative paths
+        assertIsEqual(actualText.replace('\\', '/'), expectedText.replace('\\', '/'))
+
+    def testCsProjOutput(self):
+        prebuiltProj = CsProjInfo('AAAA', self._getPath('Prebuilt/Prebuilt.csproj'), 'Prebuilt', [], False, 'Release', ProjectType.Prebuilt, None)
+        ignoredProj = self._createProject('Ignored', [], [])
+        ignoredProj.isIgnored = True
+
+        projInfo = self._createProject('Package1', [
+            'Package1/Package1.cs', 'Package1/Readme.txt', 'Package1/ProjenyPackage.yaml', 'Package1/Save & <Load>.cs'],
+            [self._createProject('PluginsFolder', [], []), ignoredProj])
+
+        refItems = [
+            RefInfo('System', None),
+            RefInfo('UnityEngine', self._getPath('Project/Assets/Plugins/Libs/UnityEngine.dll')),
+            RefInfo('Prebuilt', self._getPath('Prebuilt/Bin/Prebuilt.dll'))]
+
+        self._assertMatchesExpected(
+            self._renderCsProject(projInfo, {'Prebuilt': prebuiltProj}, refItems, 'UNITY_5;"DEBUG"'),
+            'ExpectedCsProject.csproj')
+
+    def testEmptyCsProjOutput(self):
+        self._assertMatchesExpected(
+            self._renderCsProject(self._createProject('Empty', [], []), {}, [], None),
+            'ExpectedEmptyCsProject.csproj')
+
+    def testUnityProjectCache(self):
+        self._writeFile('Project/Lib.dll')
+        self._writeFile('Project/EditorLib.dll')
+
+        self._writeUnityProject('Project/Assembly-CSharp-firstpass.csproj', [('Lib', 'Lib.dll')])
+        self._writeUnityProject('Project/Assembly-CSharp-Editor-firstpass.csproj', [('Lib', 'Lib.dll'), ('EditorLib', 'EditorLib.dll')])
+
+        generator = Container.resolve('VisualStudioSolutionGenerator')
+
+        info = generator._parseGeneratedUnityProject()
+
+        assertIsEqual(info.defines, 'UNITY_5;DEBUG')
+        assertIsEqual([x.name for x in info.references], ['System', 'Lib'])
+        assertIsEqual([x.name for x in info.referencesEditor], ['System', 'Lib', 'EditorLib'])
+        assertIsEqual(info.references[1].hintPath, self._getPath('Project/Lib.dll'))
+
+        with mock.patch.object(ET, 'parse', wraps = ET.parse) as parseMock:
+            info = generator._parseGeneratedUnityProject()
+            assertIsEqual(parseMock.call_count, 0)
+
+        assertIsEqual([x.name for x in info.referencesEditor], ['System', 'Lib', 'EditorLib'])
+
+        # New references are checked when the unity project changes
+        self._writeUnityProject('Project/Assembly-CSharp-firstpass.csproj', [('Lib', 'Lib.dll'), ('Missing', 'Missing.dll')])
+
+        with self.assertRaises(Assertion) as context:
+            generator._parseGeneratedUnityProject()
+
+        assertThat('Missing.dll' in str(context.exception))
+
+    def testUnityProjectCacheDisabled(self):
+        self._writeUnityProject('Project/Assembly-CSharp-firstpass.csproj', [])
+        self._writeUnityProject('Project/Assembly-CSharp-Editor-firstpass.csproj', [])
+
+        # Same as passing --noSchemaCache
+        Container.resolve('ProjectSchemaCache').setEnabled(False)
+
+        generator = Container.resolve('VisualStudioSolutionGenerator')
+        generator._parseGeneratedUnityProject()
+
+        with mock.patch.object(ET, 'parse', wraps = ET.parse) as parseMock:
+            generator._parseGeneratedUnityProject()
+            assertIsEqual(parseMock.call_count, 2)
+
+        assertThat(not os.path.exists(self._getPath('Cache')))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -25,6 +25,7 @@ class ReleaseSourceManager:
     _config = Inject('Config')
     _sys = Inject('SystemHelper')
     _packageManager = Inject('PackageManager')
+    _installedPackageIndex = Inject('InstalledPackageIndex')
 
     def __init__(self):
         self._hasInitialized = False
@@ -180,6 +181,7 @@ def _installReleaseInternal(self, projectName, packageRoot, releaseInfo, release
 
             yamlStr = YamlSerializer.serialize(newInstallInfo)
             self._sys.writeFileAsText(os.path.join(destDir, InstallInfoFileName), yamlStr)
+            self._installedPackageIndex.updatePackage(packageRoot, installDirName, newInstallInfo)
 
             self._log.info("Successfully installed '{0}' (version {1})", releaseInfo.name, releaseInfo.version)
 